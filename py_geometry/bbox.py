@@ -7,6 +7,11 @@ A Bounding Box object and assorted utilities, subclassed from a numpy array
 
 import numpy as np
 
+try:
+    from .cy_bbox import points_in_bbox as _points_in_bbox
+except ImportError: # the compiled code has not been built
+    _points_in_bbox = None
+
 class BBox(np.ndarray):
     """
     A Bounding Box object:
@@ -111,7 +116,33 @@ class BBox(np.ndarray):
             return True
         else:
             return False
-    
+
+    def points_inside(self, points):
+        """
+        points_inside(points):
+
+        :param points: the points to test
+        :type points: NX2 or NX3 numpy array of floats -- the third
+                      coordinate is ignored (so it matches ``points_in_poly``)
+
+        Tests which of the given points are inside this BBox (touching the
+        border counts as inside).
+
+        :returns: a boolean array the same length as points
+
+        This uses the compiled ``cy_bbox.points_in_bbox`` if it's available,
+        so it makes a fast pre-filter for a point in polygon check.
+        """
+        points = np.asarray(points, np.float64)
+        if points.ndim == 1:
+            points = points.reshape(1, -1)
+        if _points_in_bbox is not None:
+            return _points_in_bbox(self, points)
+        x = points[:,0]
+        y = points[:,1]
+        return ( (x >= self[0,0]) & (x <= self[1,0]) &
+                 (y >= self[0,1]) & (y <= self[1,1]) )
+
     def merge(self, BB):
         """
         Joins this bounding box with the one passed in, maybe making this one bigger
@@ -245,7 +276,535 @@ def from_BB_array(BBarray):
    BBarray = np.asarray(BBarray, np.float64).reshape(-1,2,2)
    arr = np.vstack( (BBarray[:,0,:].min(0), BBarray[:,1,:].max(0)) )
    return asBBox(arr)
-   
+
+
+class BBoxAccumulator(object):
+    """
+    Computes the bounding box of a set of points that is passed in a chunk at
+    a time -- so the whole set does not need to be in memory at once.
+
+    Feed it chunks of points with ``add()`` (or an iterable of chunks with
+    ``add_chunks()``), and get the BBox so far at any time from the
+    ``bbox`` attribute.
+
+    Points with a NaN coordinate are skipped, so an accumulator that has not
+    seen any valid points gives a null BBox.
+
+    Accumulators can be combined with ``merge()``, so the pieces of a large data
+    set can be done separately (in different processes, even -- they can be
+    pickled), and then put together.
+    """
+    def __init__(self, points=None):
+        """
+        BBoxAccumulator(points=None)
+
+        :param points: optional first set of points
+        """
+        self._data = np.array(((np.nan, np.nan), (np.nan, np.nan)), np.float64)
+        if points is not None:
+            self.add(points)
+
+    def add(self, points, chunk_size=None):
+        """
+        add(points, chunk_size=None)
+
+        :param points: set of points -- Nx2 numpy array, or something that can be turned into one.
+                       It can be a memory mapped array.
+
+        :param chunk_size: if given, the points are processed chunk_size points
+                           at a time, so that a memory mapped array is never
+                           copied as a whole (if it needs to be converted to float64).
+        """
+        if chunk_size is not None:
+            for start in range(0, len(points), chunk_size):
+                self.add(points[start:start + chunk_size])
+            return None
+        points = np.asarray(points, np.float64).reshape(-1, 2)
+        nan = np.isnan(points).any(axis=1)
+        if nan.any():
+            # a point with a NaN in it is skipped as a whole -- not just
+            # the NaN coordinate
+            points = points[~nan]
+        if len(points) > 0:
+            np.fmin(self._data[0], np.fmin.reduce(points, 0), out=self._data[0])
+            np.fmax(self._data[1], np.fmax.reduce(points, 0), out=self._data[1])
+        return None
+
+    def add_chunks(self, chunks):
+        """
+        add_chunks(chunks)
+
+        :param chunks: any iterable (such as a generator) that yields sets of points
+        """
+        for points in chunks:
+            self.add(points)
+        return None
+
+    def merge(self, other):
+        """
+        merge(other)
+
+        Joins the points seen by the other accumulator into this one.
+
+        :param other: another BBoxAccumulator, or a BBox
+        """
+        if isinstance(other, BBoxAccumulator):
+            other = other._data
+        other = np.asarray(other, np.float64)
+        np.fmin(self._data[0], other[0], out=self._data[0])
+        np.fmax(self._data[1], other[1], out=self._data[1])
+        return None
+
+    def _get_bbox(self):
+        # a copy, so that the BBox is not changed by adding more points
+        return asBBox(self._data.copy())
+    bbox = property(_get_bbox, doc="the BBox of all the points added so far")
+
+    def is_null(self):
+        """
+        :returns: True if no (valid) points have been added
+        """
+        return np.isnan(self._data).all()
+
+
+def from_chunks(chunks):
+    """
+    from_chunks(chunks)
+
+    :param chunks: an iterable of sets of points
+
+    returns the bounding box of all the points in all the chunks -- each chunk
+    can be anything that can be turned into a NX2 array of float64s.
+
+    Points with a NaN coordinate are skipped -- if there are no valid points,
+    a null BBox is returned.
+    """
+    acc = BBoxAccumulator()
+    acc.add_chunks(chunks)
+    return acc.bbox
+
+
+class BBoxArray(np.ndarray):
+    """
+    An array of Bounding Boxes:
+
+    Takes Data as an array. Data is any python sequence that can be turned into a
+    Nx2x2 numpy array of float64s, where BBarray[n] is a 2x2 array that represents
+    a BBox:
+
+    [[MinX, MinY ],
+     [MaxX, MaxY ]]
+
+    This is the same layout used by ``from_BB_array()``. All the tests are done
+    on the whole array at once, returning a boolean array of length N, so they
+    can be used as masks (or passed to ``np.nonzero`` to get indexes).
+
+    Indexing with a single integer returns a BBox (that is a view on the data).
+
+    Null (all NaN) boxes do not overlap or contain anything, and infinite boxes
+    overlap everything, the same as the equivalent BBox objects.
+
+    Usually created by the factory function:
+
+        ``asBBoxArray()``
+
+    """
+    def __new__(subtype, data):
+        """
+        Takes Data as an array. Data is any python sequence that can be turned into a
+        Nx2x2 numpy array of float64s. The data are always copied -- use
+        ``asBBoxArray()`` to get a view of an existing array.
+        """
+        arr = np.array(data, np.float64)
+        arr.shape = (-1, 2, 2)
+        if ( (arr[:,0,0] > arr[:,1,0]) | (arr[:,0,1] > arr[:,1,1]) ).any():
+            # note: zero sized BBs OK -- and NaN compares False, so null BBs OK
+            raise ValueError("BBox values not aligned: \n minimum values must be less that maximum values")
+        return np.ndarray.__new__(BBoxArray, shape=arr.shape, dtype=arr.dtype, buffer=arr)
+
+    def __getitem__(self, index):
+        result = np.ndarray.__getitem__(self, index)
+        if isinstance(index, (int, np.integer)):
+            return result.view(BBox)
+        elif isinstance(result, np.ndarray) and result.ndim != 3:
+            # a slice through the boxes -- not a BBoxArray anymore
+            return result.view(np.ndarray)
+        return result
+
+    def _as_BB_array(self, BB):
+        # so that a single BBox and a BBoxArray (or arrays of either) can be
+        # compared element-wise with this one.
+        BB = np.asarray(BB, np.float64)
+        if BB.ndim == 2:
+            BB = BB.reshape(1, 2, 2)
+        return BB
+
+    def overlaps(self, BB):
+        """
+        overlaps(BB):
+
+        :param BB: another bounding box, or an array of N bounding boxes
+        :type BB: BBox object (or 2x2 ndarray) or BBoxArray (or Nx2x2 ndarray)
+
+        Tests which Bounding Boxes in this array overlap with the given one.
+        If they are just touching, that counts as overlapping.
+
+        If an array of N boxes is passed in, they are tested element-wise.
+
+        :returns: a boolean array of length N
+        """
+        arr = np.asarray(self)
+        BB = self._as_BB_array(BB)
+        result = ( (arr[:,1,0] >= BB[:,0,0]) & (arr[:,0,0] <= BB[:,1,0]) &
+                   (arr[:,1,1] >= BB[:,0,1]) & (arr[:,0,1] <= BB[:,1,1]) )
+        # infinite boxes overlap everything -- even null ones
+        result |= self.is_inf()
+        result |= np.isinf(BB).reshape(-1, 4).all(1)
+        return result
+
+    def inside(self, BB):
+        """
+        inside(BB):
+
+        :param BB: another bounding box, or an array of N bounding boxes
+        :type BB: BBox object (or 2x2 ndarray) or BBoxArray (or Nx2x2 ndarray)
+
+        Tests if the given Bounding Box is entirely inside each of the boxes in
+        this array (touching the border counts as inside).
+
+        If an array of N boxes is passed in, they are tested element-wise.
+
+        :returns: a boolean array of length N
+        """
+        arr = np.asarray(self)
+        BB = self._as_BB_array(BB)
+        return ( (BB[:,0,0] >= arr[:,0,0]) & (BB[:,1,0] <= arr[:,1,0]) &
+                 (BB[:,0,1] >= arr[:,0,1]) & (BB[:,1,1] <= arr[:,1,1]) )
+
+    def within(self, BB):
+        """
+        within(BB):
+
+        :param BB: another bounding box
+        :type BB: BBox object (or 2x2 ndarray)
+
+        Tests which of the boxes in this array are entirely inside the given
+        Bounding Box (touching the border counts as inside).
+
+        This is the reverse of ``inside()``
+
+        :returns: a boolean array of length N
+        """
+        arr = np.asarray(self)
+        BB = self._as_BB_array(BB)
+        return ( (arr[:,0,0] >= BB[:,0,0]) & (arr[:,1,0] <= BB[:,1,0]) &
+                 (arr[:,0,1] >= BB[:,0,1]) & (arr[:,1,1] <= BB[:,1,1]) )
+
+    def point_inside(self, point):
+        """
+        point_inside(point):
+
+        :param point: any length-2 sequence (tuple, list, array)
+
+        Tests which of the boxes contain the given Point (touching the border
+        counts as inside).
+
+        :returns: a boolean array of length N
+        """
+        arr = np.asarray(self)
+        x, y = point[0], point[1]
+        return ( (x >= arr[:,0,0]) & (x <= arr[:,1,0]) &
+                 (y >= arr[:,0,1]) & (y <= arr[:,1,1]) )
+
+    def merge(self, BB):
+        """
+        Joins each of the bounding boxes with the one passed in (or the
+        corresponding one, if an array of boxes is passed in), maybe making
+        them bigger. This is done in place.
+
+        Null boxes are handled the same way as BBox.merge: merging a null box
+        with BB results in BB, and merging with a null box does nothing.
+        """
+        arr = np.asarray(self)
+        BB = self._as_BB_array(BB)
+        # fmin and fmax ignore NaNs, so null boxes "just work"
+        np.fmin(arr[:,0,:], BB[:,0,:], out=arr[:,0,:])
+        np.fmax(arr[:,1,:], BB[:,1,:], out=arr[:,1,:])
+        return None
+
+    def is_null(self):
+        """
+        :returns: a boolean array: True for the boxes that are null (all NaN)
+        """
+        return np.isnan(np.asarray(self)).reshape(-1, 4).all(1)
+
+    def is_inf(self):
+        """
+        :returns: a boolean array: True for the boxes that are infinite
+        """
+        return np.isinf(np.asarray(self)).reshape(-1, 4).all(1)
+
+    def _get_bounding_box(self):
+        arr = np.asarray(self)
+        if len(arr) == 0:
+            return null_BBox()
+        # fmin/fmax reductions skip the null boxes (unless they all are)
+        return asBBox( np.vstack( (np.fmin.reduce(arr[:,0,:], 0),
+                                   np.fmax.reduce(arr[:,1,:], 0)) ) )
+    bounding_box = property(_get_bounding_box,
+                            doc="The BBox that encompasses all the (non-null) boxes")
+
+    def _getLeft(self):
+        return np.asarray(self)[:,0,0]
+    Left = property(_getLeft)
+    def _getRight(self):
+        return np.asarray(self)[:,1,0]
+    Right = property(_getRight)
+    def _getBottom(self):
+        return np.asarray(self)[:,0,1]
+    Bottom = property(_getBottom)
+    def _getTop(self):
+        return np.asarray(self)[:,1,1]
+    Top = property(_getTop)
+
+    def _getWidth(self):
+        arr = np.asarray(self)
+        return arr[:,1,0] - arr[:,0,0]
+    Width = property(_getWidth)
+
+    def _getHeight(self):
+        arr = np.asarray(self)
+        return arr[:,1,1] - arr[:,0,1]
+    Height = property(_getHeight)
+
+    def _getCenter(self):
+        return np.asarray(self).sum(1) / 2.0
+    Center = property(_getCenter)
+
+
+def asBBoxArray(data):
+    """
+    returns a BBoxArray object.
+
+    If object is a BBoxArray, it is returned unaltered
+
+    If object is a numpy array, a BBoxArray object is returned that shares a
+    view of the data with that array. The numpy array should be of the correct
+    format: a Nx2x2 numpy array of float64s (a single 2x2 BB is reshaped to 1x2x2)
+
+    """
+    if isinstance(data, BBoxArray):
+        return data
+    arr = np.asarray(data, np.float64).reshape(-1, 2, 2)
+    return arr.view(BBoxArray)
+
+class ScalarBBox(object):
+    """
+    A lightweight Bounding Box object:
+
+    Holds just the four values as python floats (in __slots__), rather than
+    as a numpy array, so that creating one, and testing a single pair of boxes,
+    is much faster than with a BBox. Use this in loops that deal with one box at
+    a time -- use a BBox, or a BBoxArray, when working with arrays.
+
+    It supports the same API as a BBox: overlaps(), inside(), point_inside(),
+    merge(), is_null(), and the Left, Right, Bottom, Top, Width, Height and
+    Center attributes. Null (all NaN) and infinite boxes work the same way, too.
+
+    The methods accept either another ScalarBBox (fastest), or a BBox or
+    anything else that can be turned into a 2x2 array, and a ScalarBBox can be
+    passed to the BBox methods and to numpy (it can be turned into an array).
+
+    Usually created by the factory function:
+
+        ``asScalarBBox()``
+
+    """
+    __slots__ = ('Left', 'Bottom', 'Right', 'Top')
+
+    def __init__(self, Left, Bottom, Right, Top):
+        """
+        ScalarBBox(Left, Bottom, Right, Top)
+
+        (MinX, MinY, MaxX, MaxY) -- the same order as BBox.flat
+        """
+        if Left > Right or Bottom > Top:
+            # note: zero sized BB OK (and NaNs compare False)
+            raise ValueError("BBox values not aligned: \n minimum values must be less that maximum values")
+        self.Left = float(Left)
+        self.Bottom = float(Bottom)
+        self.Right = float(Right)
+        self.Top = float(Top)
+
+    def _unpack(self, BB):
+        # returns (Left, Bottom, Right, Top) of a ScalarBBox or 2x2 array
+        if type(BB) is ScalarBBox:
+            return BB.Left, BB.Bottom, BB.Right, BB.Top
+        return np.asarray(BB, np.float64).ravel().tolist()
+
+    def overlaps(self, BB):
+        """
+        overlaps(BB):
+
+        :param BB: another bounding box
+        :type BB: ScalarBBox, BBox object (or ndarray)
+
+        Tests if the given Bounding Box overlaps with this one.
+        Returns True if the Bounding boxes overlap, False otherwise
+        If they are just touching, returns True
+        """
+        Left, Bottom, Right, Top = self._unpack(BB)
+        if ( self.Right >= Left and self.Left <= Right and
+             self.Top >= Bottom and self.Bottom <= Top ):
+            return True
+        # infinite boxes even overlap null boxes
+        return self._is_inf() or _all_inf(Left, Bottom, Right, Top)
+
+    def inside(self, BB):
+        """
+        inside(BB):
+
+        Tests if the given Bounding Box is entirely inside this one.
+
+        Returns True if it is entirely inside, or touching the
+        border.
+
+        Returns False otherwise
+        """
+        Left, Bottom, Right, Top = self._unpack(BB)
+        return ( Left >= self.Left and Right <= self.Right and
+                 Bottom >= self.Bottom and Top <= self.Top )
+
+    def point_inside(self, point):
+        """
+        point_inside(point):
+
+        :param point: any length-2 sequence (tuple, list, array)
+
+        Tests if the given Point is inside this one (touching the border
+        counts as inside).
+        """
+        x, y = point[0], point[1]
+        return ( x >= self.Left and x <= self.Right and
+                 y >= self.Bottom and y <= self.Top )
+
+    def merge(self, BB):
+        """
+        Joins this bounding box with the one passed in, maybe making this one bigger
+        """
+        Left, Bottom, Right, Top = self._unpack(BB)
+        if self.is_null():
+            self.Left, self.Bottom, self.Right, self.Top = Left, Bottom, Right, Top
+        elif Left != Left and Bottom != Bottom and Right != Right and Top != Top:
+            pass # merging with a null BB
+        else:
+            if Left < self.Left: self.Left = Left
+            if Bottom < self.Bottom: self.Bottom = Bottom
+            if Right > self.Right: self.Right = Right
+            if Top > self.Top: self.Top = Top
+        return None
+
+    def is_null(self):
+        # NaN is the only value not equal to itself
+        return ( self.Left != self.Left and self.Bottom != self.Bottom and
+                 self.Right != self.Right and self.Top != self.Top )
+
+    def _is_inf(self):
+        return _all_inf(self.Left, self.Bottom, self.Right, self.Top)
+
+    def as_poly(self):
+        """
+        Returns the four corners of the bounding box as polygon:
+
+        An 4X2 array of (x,y) coordinates of the corners
+
+        note: the first/last point is not duplicated
+        """
+        return np.array( ( (self.Left, self.Bottom),
+                           (self.Left, self.Top),
+                           (self.Right, self.Top),
+                           (self.Right, self.Bottom),
+                           ), dtype=np.float64)
+
+    def as_BBox(self):
+        """
+        returns a BBox object with the same values
+        """
+        return np.array( ( (self.Left, self.Bottom),
+                           (self.Right, self.Top) ), np.float64).view(BBox)
+
+    def _getWidth(self):
+        return self.Right - self.Left
+    Width = property(_getWidth)
+
+    def _getHeight(self):
+        return self.Top - self.Bottom
+    Height = property(_getHeight)
+
+    def _getCenter(self):
+        return ( (self.Left + self.Right) / 2.0, (self.Bottom + self.Top) / 2.0 )
+    Center = property(_getCenter)
+
+    def __array__(self, dtype=None):
+        return np.array( ( (self.Left, self.Bottom),
+                           (self.Right, self.Top) ), dtype or np.float64)
+
+    def __getitem__(self, index):
+        # so that it can be indexed like a BBox: BB[0,0], BB[1] etc.
+        return np.asarray(self)[index]
+
+    def __len__(self):
+        return 2
+
+    def __eq__(self, BB):
+        """
+        __eq__(BB) The equality operator
+
+        A == B if and only if all the entries are the same (or both are null)
+        """
+        try:
+            Left, Bottom, Right, Top = self._unpack(BB)
+        except (ValueError, TypeError):
+            return False
+        if self.is_null() and Left != Left and Bottom != Bottom and Right != Right and Top != Top:
+            return True
+        return ( self.Left == Left and self.Bottom == Bottom and
+                 self.Right == Right and self.Top == Top )
+
+    def __ne__(self, BB):
+        return not self.__eq__(BB)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "ScalarBBox(%r, %r, %r, %r)"%(self.Left, self.Bottom, self.Right, self.Top)
+
+
+def _all_inf(Left, Bottom, Right, Top):
+    return ( Left in _INFS and Bottom in _INFS and
+             Right in _INFS and Top in _INFS )
+_INFS = (np.inf, -np.inf)
+
+
+def asScalarBBox(data):
+    """
+    returns a ScalarBBox object.
+
+    If object is a ScalarBBox, it is returned unaltered
+
+    Otherwise, data must be something that can be turned into a 2x2 array
+    of float64s (such as a BBox):
+
+    [[MinX, MinY ],
+     [MaxX, MaxY ]]
+
+    Note that the four values are always copied -- a ScalarBBox can not share
+    data with an array.
+    """
+    if type(data) is ScalarBBox:
+        return data
+    return ScalarBBox(*np.asarray(data, np.float64).ravel().tolist())
+
 def null_BBox():
     """
     :returns BBox: a BBox object with all NaN entries.
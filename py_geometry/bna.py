@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+
+"""
+Reading and writing BNA ("Boundary") files as PolygonSets
+
+A BNA file is a text file of records, each a header line with one or more
+quoted names and the number of points, followed by that many lines of x,y
+coordinates::
+
+    "Name1","Name2", 4
+    -81.531753540039,31.134635925293
+    -81.531150817871,31.134830474854
+    -81.530662536621,31.134492874146
+    -81.531753540039,31.134635925293
+
+A negative number of points means a polyline, rather than a polygon.
+
+The file is read in chunks of records: the header lines are handled one at a
+time, but all the coordinates in a chunk are parsed in one go by numpy, so
+large files can be read quickly, without ever being all in memory as text.
+
+The names of each record are kept as the metadata of the polygon: a tuple of
+strings. Whether it is a polyline is kept in the ``'polyline'`` metadata
+column (see ``PolygonSet.meta``), so it is written back out the same way.
+"""
+
+import io
+import itertools
+import re
+
+import numpy as np
+
+from .polygons import PolygonSet
+
+_NAME_RE = re.compile(r'"([^"]*)"')
+
+
+def _parse_header(line):
+    """
+    returns (names, num_points) from a BNA header line
+    """
+    names, _sep, num_points = line.rpartition(',')
+    try:
+        num_points = int(num_points)
+    except ValueError:
+        raise ValueError("not a valid BNA header line: %r" % line)
+    quoted = _NAME_RE.findall(names)
+    if quoted:
+        names = tuple(quoted)
+    else:
+        names = tuple(name.strip() for name in names.split(','))
+    return names, num_points
+
+
+def _open(source, mode):
+    # a filename or an already open file
+    if hasattr(source, 'read') or hasattr(source, 'write'):
+        return source, False
+    return io.open(source, mode, encoding='latin-1'), True
+
+
+def iter_bna(source, chunk_size=4096, dtype=np.float64):
+    """
+    iter_bna(source, chunk_size=4096, dtype=np.float64)
+
+    Reads a BNA file, yielding it as PolygonSets of up to chunk_size polygons
+    each, so the whole file never has to be in memory.
+
+    :param source: the name of the file, or an open (text) file.
+
+    :param chunk_size: the number of records parsed at once.
+
+    The metadata of each polygon is a tuple of its names, and the
+    ``'polyline'`` metadata column is True for the records that are
+    polylines (a negative number of points).
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    infile, close = _open(source, 'r')
+    try:
+        lines = iter(infile)
+        while True:
+            names = []
+            counts = []
+            polylines = []
+            text = []
+            for line in lines:
+                if not line.strip():
+                    continue
+                record_names, num_points = _parse_header(line)
+                polylines.append(num_points < 0)
+                num_points = abs(num_points)
+                block = list(itertools.islice(lines, num_points))
+                if len(block) != num_points:
+                    raise ValueError("BNA record %r is missing points"%(record_names,))
+                names.append(record_names)
+                counts.append(num_points)
+                text.extend(block)
+                if len(names) == chunk_size:
+                    break
+            if not names:
+                break
+            # one comma on each line, and two numbers per line in all, so the
+            # whole chunk can still be parsed at once
+            if any(line.count(u",") != 1 for line in text):
+                raise ValueError("BNA records must have exactly two coordinates per line")
+            points = np.fromstring(u"".join(text).replace(u",", u" "), dtype=np.float64, sep=u" ")
+            if len(points) != 2 * len(text):
+                raise ValueError("BNA records must have exactly two coordinates per line")
+            offsets = np.zeros((len(counts) + 1,), dtype=np.int)
+            np.cumsum(counts, out=offsets[1:])
+            yield PolygonSet.from_flat(points.astype(dtype), offsets, names, dtype=dtype, copy=False,
+                                       columns={'polyline': np.array(polylines, dtype=np.bool_)})
+    finally:
+        if close:
+            infile.close()
+
+
+def read_bna(source, polygon_set=None, chunk_size=4096, dtype=np.float64):
+    """
+    read_bna(source, polygon_set=None, chunk_size=4096, dtype=np.float64)
+
+    Reads a BNA file into a PolygonSet
+
+    :param source: the name of the file, or an open (text) file.
+
+    :param polygon_set: If given, the polygons are appended to this set --
+                        call its reserve() method first if you know how big
+                        the file is. Otherwise a new set is created.
+
+    :returns: the PolygonSet
+    """
+    if polygon_set is None:
+        polygon_set = PolygonSet(dtype=dtype)
+    for chunk in iter_bna(source, chunk_size, polygon_set.dtype):
+        polygon_set.extend(chunk)
+    return polygon_set
+
+
+def _format_names(metadata):
+    if metadata is None:
+        names = ("",)
+    elif isinstance(metadata, (tuple, list)):
+        names = metadata
+    else:
+        names = (metadata,)
+    return u",".join(u'"%s"' % name for name in names)
+
+
+def write_bna(source, polygons, chunk_size=4096, polyline=None):
+    """
+    write_bna(source, polygons, chunk_size=4096, polyline=None)
+
+    Writes a PolygonSet (or a sequence of PolygonSets, like the chunks from
+    iter_bna) to a BNA file.
+
+    :param source: the name of the file, or an open (text) file.
+
+    :param polyline: If True, the number of points is written as negative,
+                     to mark the records as polylines -- or if False, all
+                     the records are polygons. If None (the default), the
+                     ``'polyline'`` metadata column is used (as set by
+                     iter_bna), with polygons for sets that don't have one.
+
+    The names for each record come from the metadata: a tuple (or list) of
+    names, a single name, or None for an empty name.
+    """
+    if isinstance(polygons, PolygonSet):
+        polygons = (polygons,)
+    outfile, close = _open(source, 'w')
+    try:
+        for polygon_set in polygons:
+            points = np.asarray(polygon_set._PointsArray, dtype=np.float64)
+            indexes = polygon_set._IndexArray
+            metadata = polygon_set._MetaDataList
+            if polyline is None and 'polyline' in polygon_set.meta:
+                signs = np.where(polygon_set.meta['polyline'], -1, 1)
+            else:
+                signs = np.empty((len(polygon_set),), dtype=np.int)
+                signs.fill(-1 if polyline else 1)
+            for start in range(0, len(polygon_set), chunk_size):
+                stop = min(start + chunk_size, len(polygon_set))
+                text = []
+                for i in range(start, stop):
+                    coords = points[indexes[i]:indexes[i+1]]
+                    text.append(u"%s, %i\n" % (_format_names(metadata[i]), signs[i] * len(coords)))
+                    text.append(u"%r,%r\n" * len(coords) % tuple(coords.ravel().tolist()))
+                outfile.write(u"".join(text))
+    finally:
+        if close:
+            outfile.close()
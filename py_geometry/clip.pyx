@@ -0,0 +1,251 @@
+"""
+Clipping of the polygons in a PolygonSet to a bounding box
+
+The Sutherland-Hodgman algorithm is used: each polygon is clipped against
+each of the four sides of the box in turn:
+
+Sutherland and Hodgman, "Reentrant polygon clipping", 1974.
+
+The polygons are worked on in the flat (points, indexes) layout of the
+PolygonSet, and a new one is built the same way -- there is no loop over the
+polygons in Python. Polygons whose bounding box is entirely inside the clip
+box are copied as they are, and those entirely outside are dropped, without
+looking at their points.
+
+Note that a concave polygon that is cut into more than one piece by the box
+comes out as a single polygon, with the pieces joined by edges along the
+side of the box (a limitation of Sutherland-Hodgman).
+"""
+
+import cython
+import numpy as np
+cimport numpy as cnp
+
+from . import bbox
+from .polygons import PolygonSet
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cdef Py_ssize_t _clip_side(double[:, ::1] src, Py_ssize_t m,
+                           double[:, ::1] dst,
+                           int axis, double value, bint keep_above) nogil:
+    """
+    clips the ring src[:m] against one side of the box: the line
+    coordinate[axis] == value, keeping the part above it (or below)
+
+    returns the number of points written to dst
+    """
+    cdef Py_ssize_t i, n
+    cdef double sx, sy, ex, ey, t
+    cdef bint s_in, e_in
+
+    n = 0
+    if m == 0:
+        return 0
+    sx = src[m - 1, 0]
+    sy = src[m - 1, 1]
+    s_in = (src[m - 1, axis] >= value) if keep_above else (src[m - 1, axis] <= value)
+    for i in range(m):
+        ex = src[i, 0]
+        ey = src[i, 1]
+        e_in = (src[i, axis] >= value) if keep_above else (src[i, axis] <= value)
+        if e_in != s_in:
+            # the edge crosses the line -- add the point where it does
+            if axis == 0:
+                t = (value - sx) / (ex - sx)
+                dst[n, 0] = value
+                dst[n, 1] = sy + t * (ey - sy)
+            else:
+                t = (value - sy) / (ey - sy)
+                dst[n, 0] = sx + t * (ex - sx)
+                dst[n, 1] = value
+            n += 1
+        if e_in:
+            dst[n, 0] = ex
+            dst[n, 1] = ey
+            n += 1
+        sx = ex
+        sy = ey
+        s_in = e_in
+    return n
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef Py_ssize_t _clip_ring(const double[:, ::1] points, Py_ssize_t start, Py_ssize_t stop,
+                           double xmin, double ymin, double xmax, double ymax,
+                           double[:, ::1] a, double[:, ::1] b) nogil:
+    """
+    clips the ring points[start:stop] to the box. The result is left in a.
+
+    Each side can add at most one point for each edge, so a and b must have
+    room for 16 times the number of points (plus one).
+
+    returns the number of points
+    """
+    cdef Py_ssize_t i, m
+    cdef bint closed
+
+    m = stop - start
+    # a repeated first point is taken off, and put back at the end
+    closed = m > 1 and (points[start, 0] == points[stop - 1, 0] and
+                        points[start, 1] == points[stop - 1, 1])
+    if closed:
+        m -= 1
+    for i in range(m):
+        a[i, 0] = points[start + i, 0]
+        a[i, 1] = points[start + i, 1]
+    m = _clip_side(a, m, b, 0, xmin, True)
+    m = _clip_side(b, m, a, 0, xmax, False)
+    m = _clip_side(a, m, b, 1, ymin, True)
+    m = _clip_side(b, m, a, 1, ymax, False)
+    if m < 3:
+        return 0
+    if closed:
+        a[m, 0] = a[0, 0]
+        a[m, 1] = a[0, 1]
+        m += 1
+    return m
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef int _clip_run(const double[:, ::1] points, const cnp.int64_t[::1] offsets,
+                   const cnp.int64_t[::1] ids,
+                   double xmin, double ymin, double xmax, double ymax,
+                   double[:, ::1] a, double[:, ::1] b,
+                   double[:, ::1] out, cnp.int64_t[::1] counts,
+                   Py_ssize_t* next_id, Py_ssize_t* num_out) nogil:
+    """
+    clips the polygons ids[next_id:], appending the results to out
+
+    returns 0 when done, or 1 if out is too small -- next_id and num_out are
+    updated, so it can be called again to pick up where it left off.
+    """
+    cdef Py_ssize_t i, j, m, p
+
+    for i in range(next_id[0], ids.shape[0]):
+        p = ids[i]
+        m = _clip_ring(points, offsets[p], offsets[p + 1],
+                       xmin, ymin, xmax, ymax, a, b)
+        if num_out[0] + m > out.shape[0]:
+            next_id[0] = i
+            return 1
+        for j in range(m):
+            out[num_out[0] + j, 0] = a[j, 0]
+            out[num_out[0] + j, 1] = a[j, 1]
+        num_out[0] += m
+        counts[i] = m
+    next_id[0] = ids.shape[0]
+    return 0
+
+
+def _clip_polygons(const double[:, ::1] points, const cnp.int64_t[::1] offsets,
+                   const cnp.int64_t[::1] ids, double xmin, double ymin, double xmax, double ymax):
+    """
+    clips the polygons ids
+
+    returns (points, counts): the points of all the clipped polygons, and
+    the number in each.
+    """
+    cdef Py_ssize_t next_id = 0
+    cdef Py_ssize_t num_out = 0
+    cdef int status
+    cdef double[:, ::1] a, b, out_view
+    cdef cnp.int64_t[::1] counts_view
+
+    counts = np.zeros((ids.shape[0],), dtype=np.int64)
+    counts_view = counts
+    sizes = np.asarray(offsets)[1:][ids] - np.asarray(offsets)[:-1][ids]
+    num_points = sizes.sum() if len(sizes) else 0
+    scratch = 16 * (sizes.max() if len(sizes) else 0) + 1
+    a = np.empty((scratch, 2), dtype=np.float64)
+    b = np.empty((scratch, 2), dtype=np.float64)
+    out = np.empty((num_points + 4 * len(sizes) + 1, 2), dtype=np.float64)
+    out_view = out
+    while True:
+        with nogil:
+            status = _clip_run(points, offsets, ids, xmin, ymin, xmax, ymax,
+                               a, b, out_view, counts_view, &next_id, &num_out)
+        if status == 0:
+            break
+        # out of room: make it bigger and try again
+        out = np.resize(out, (2 * len(out), 2))
+        out_view = out
+    return out[:num_out], counts
+
+
+def _concatenated_ranges(starts, counts):
+    """
+    returns the concatenation of arange(starts[i], starts[i] + counts[i])
+    """
+    ends = np.cumsum(counts)
+    return np.arange(ends[-1] if len(ends) else 0) + np.repeat(starts - (ends - counts), counts)
+
+
+def clip_to_bbox(polygon_set, BB, drop_empty=True):
+    """
+    clip_to_bbox(polygon_set, BB, drop_empty=True)
+
+    Clips all the polygons in a PolygonSet to a bounding box
+
+    :param polygon_set: the polygons to clip
+    :type polygon_set: PolygonSet
+
+    :param BB: the box to clip to
+    :type BB: BBox object (or 2x2 array)
+
+    :param drop_empty: If True (the default), polygons that are entirely
+                       outside the box (or clipped to nothing) are left out
+                       of the result. If False, they are empty polygons in
+                       the result, so it lines up with the original set.
+
+    :returns: a new PolygonSet -- the metadata are the same objects as in
+              the original, and the metadata columns are copied.
+
+    The parts of the polygons exactly on the edge of the box are kept.
+    """
+    BB = bbox.asBBox(BB)
+    boxes = polygon_set.bounding_boxes
+    valid = ~boxes.is_null()
+    inside = valid & boxes.within(BB)
+    partial = valid & ~inside & boxes.overlaps(BB)
+
+    old_offsets = np.asarray(polygon_set._IndexArray, dtype=np.int64)
+    counts = np.diff(old_offsets)
+    counts[~(inside | partial)] = 0
+
+    partial_ids = np.nonzero(partial)[0].astype(np.int64)
+    (xmin, ymin), (xmax, ymax) = BB
+    clipped, counts[partial_ids] = _clip_polygons(
+        np.ascontiguousarray(polygon_set._PointsArray, dtype=np.float64),
+        old_offsets, partial_ids, xmin, ymin, xmax, ymax)
+
+    if drop_empty:
+        ids = np.nonzero(counts > 0)[0]
+    else:
+        ids = np.arange(len(polygon_set))
+    counts = counts[ids]
+    offsets = np.zeros((len(ids) + 1,), dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+
+    points = np.empty((offsets[-1], 2), dtype=polygon_set.dtype)
+    # the polygons entirely inside are copied as they are
+    is_inside = inside[ids]
+    points[_concatenated_ranges(offsets[:-1][is_inside], counts[is_inside])] = \
+        polygon_set._PointsArray[_concatenated_ranges(old_offsets[:-1][ids[is_inside]],
+                                                      counts[is_inside])]
+    # and the clipped ones were done in order
+    is_partial = partial[ids]
+    points[_concatenated_ranges(offsets[:-1][is_partial], counts[is_partial])] = \
+        clipped
+
+    metadata = polygon_set.GetMetaData()
+    return PolygonSet.from_flat(points, offsets,
+                                [metadata[i] for i in ids],
+                                dtype=polygon_set.dtype,
+                                copy=False,
+                                columns=dict((name, column[ids])
+                                             for name, column in polygon_set.meta.items()))
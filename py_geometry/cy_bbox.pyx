@@ -0,0 +1,256 @@
+"""
+Cython code for bounding box checks on lots of points (or boxes) at once
+
+These are used by the methods of the objects in the bbox module, but can be
+called directly as well.
+"""
+
+import cython
+import numpy as np
+cimport numpy as cnp
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def points_in_bbox(bb, const double[:, :] points):
+    """
+    points_in_bbox(bb, points)
+
+    computes whether the points given are in the bounding box bb
+
+    :param bb: the bounding box
+    :type bb: BBox object (or 2x2 array or nested sequence)
+
+    :param points: the points to test
+    :type points: NX2 or NX3 numpy array of float64 -- only the first two
+                  columns are used, and it does not need to be contiguous
+                  (or writeable -- memory mapped or shared points are fine).
+
+    :returns: a boolean array the same length as points
+
+    Points on the border are considered inside, the same as BBox.point_inside.
+    No temporary arrays are created -- the points are checked in place.
+    """
+    cdef double xmin, ymin, xmax, ymax, x, y
+    cdef Py_ssize_t i, npoints
+
+    xmin = bb[0][0]
+    ymin = bb[0][1]
+    xmax = bb[1][0]
+    ymax = bb[1][1]
+
+    if points.shape[1] < 2:
+        raise ValueError("points must have at least two coordinates")
+    npoints = points.shape[0]
+
+    result = np.zeros((npoints,), dtype=np.uint8)
+    cdef cnp.uint8_t[::1] res = result
+
+    with nogil:
+        for i in range(npoints):
+            x = points[i, 0]
+            y = points[i, 1]
+            res[i] = (x >= xmin and x <= xmax and y >= ymin and y <= ymax)
+
+    return result.view(dtype=np.bool_) # make it a np.bool array
+
+
+## The sweep-and-prune join of two sets of boxes
+
+def _sorted_boxes(boxes):
+    """
+    returns the non-null boxes as a contiguous Nx4 array of
+    (xmin, ymin, xmax, ymax), sorted by xmin, and the indexes of those boxes
+    in the original array.
+    """
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    ids = np.nonzero( ~np.isnan(boxes).any(1) )[0]
+    order = ids[np.argsort(boxes[ids, 0], kind='mergesort')]
+    return np.ascontiguousarray(boxes[order]), order
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef Py_ssize_t _sweep_two(double[:, ::1] a,
+                           double[:, ::1] b,
+                           cnp.int64_t[::1] state,
+                           cnp.int64_t[::1] out_a,
+                           cnp.int64_t[::1] out_b) nogil:
+    """
+    finds the overlapping pairs of boxes from a and b (both sorted by xmin)
+
+    Each box is compared with the boxes in the other set that start (in x)
+    after it does, and before it ends. So each overlapping pair is found once,
+    by the box that starts first.
+
+    state holds (i, j, k, side, done), so that the sweep can be picked up where
+    it left off when the output arrays are full.
+
+    returns the number of pairs written to the output arrays
+    """
+    cdef Py_ssize_t i, j, k, side, n, na, nb, cap
+
+    i = state[0]
+    j = state[1]
+    k = state[2]
+    side = state[3]
+    na = a.shape[0]
+    nb = b.shape[0]
+    cap = out_a.shape[0]
+    n = 0
+    while True:
+        if k < 0: # start the scan for the next box
+            if i >= na or j >= nb:
+                break
+            if a[i, 0] <= b[j, 0]:
+                side = 0
+                k = j
+            else:
+                side = 1
+                k = i
+        if side == 0: # scanning b for a[i]
+            while k < nb and b[k, 0] <= a[i, 2]:
+                if b[k, 1] <= a[i, 3] and b[k, 3] >= a[i, 1]:
+                    if n == cap:
+                        state[0], state[1], state[2], state[3] = i, j, k, side
+                        return n
+                    out_a[n] = i
+                    out_b[n] = k
+                    n += 1
+                k += 1
+            i += 1
+        else: # scanning a for b[j]
+            while k < na and a[k, 0] <= b[j, 2]:
+                if a[k, 1] <= b[j, 3] and a[k, 3] >= b[j, 1]:
+                    if n == cap:
+                        state[0], state[1], state[2], state[3] = i, j, k, side
+                        return n
+                    out_a[n] = k
+                    out_b[n] = j
+                    n += 1
+                k += 1
+            j += 1
+        k = -1
+    state[4] = 1 # done
+    return n
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef Py_ssize_t _sweep_self(double[:, ::1] a,
+                            cnp.int64_t[::1] state,
+                            cnp.int64_t[::1] out_a,
+                            cnp.int64_t[::1] out_b) nogil:
+    """
+    finds the overlapping pairs of boxes within a (sorted by xmin)
+
+    state holds (i, k, done) -- see _sweep_two
+    """
+    cdef Py_ssize_t i, k, n, na, cap
+
+    i = state[0]
+    k = state[1]
+    na = a.shape[0]
+    cap = out_a.shape[0]
+    n = 0
+    while i < na:
+        if k < 0:
+            k = i + 1
+        while k < na and a[k, 0] <= a[i, 2]:
+            if a[k, 1] <= a[i, 3] and a[k, 3] >= a[i, 1]:
+                if n == cap:
+                    state[0], state[1] = i, k
+                    return n
+                out_a[n] = i
+                out_b[n] = k
+                n += 1
+            k += 1
+        i += 1
+        k = -1
+    state[2] = 1 # done
+    return n
+
+
+def _next_pairs(double[:, ::1] a, b, cnp.int64_t[::1] state, Py_ssize_t chunk_size):
+    """
+    runs the sweep until it is done or chunk_size pairs have been found
+
+    returns (out_a, out_b): the positions of the pairs in the sorted boxes
+    """
+    cdef Py_ssize_t n
+    cdef double[:, ::1] b_view
+    result_a = np.empty((chunk_size,), dtype=np.int64)
+    result_b = np.empty((chunk_size,), dtype=np.int64)
+    cdef cnp.int64_t[::1] out_a = result_a
+    cdef cnp.int64_t[::1] out_b = result_b
+
+    if b is None:
+        with nogil:
+            n = _sweep_self(a, state, out_a, out_b)
+    else:
+        b_view = b
+        with nogil:
+            n = _sweep_two(a, b_view, state, out_a, out_b)
+    return result_a[:n], result_b[:n]
+
+
+def iter_overlapping_pairs(boxes1, boxes2=None, chunk_size=65536):
+    """
+    iter_overlapping_pairs(boxes1, boxes2=None, chunk_size=65536)
+
+    Generator version of ``overlapping_pairs``: the pairs are yielded as
+    (index1, index2) arrays of up to chunk_size pairs at a time, so that the
+    whole result never has to be in memory.
+
+    The pairs are in no particular order.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    a, order_a = _sorted_boxes(boxes1)
+    if boxes2 is None:
+        b, order_b = None, order_a
+        state = np.array((0, -1, 0), dtype=np.int64)
+    else:
+        b, order_b = _sorted_boxes(boxes2)
+        state = np.array((0, 0, -1, 0, 0), dtype=np.int64)
+    while not state[-1]: # the last entry is the "done" flag
+        out_a, out_b = _next_pairs(a, b, state, chunk_size)
+        if len(out_a) == 0:
+            continue
+        index1 = order_a[out_a]
+        index2 = order_b[out_b]
+        if boxes2 is None:
+            # the lower index first
+            index1, index2 = np.minimum(index1, index2), np.maximum(index1, index2)
+        yield index1, index2
+
+
+def overlapping_pairs(boxes1, boxes2=None):
+    """
+    overlapping_pairs(boxes1, boxes2=None)
+
+    Finds all the pairs of overlapping boxes (touching counts as overlapping)
+    using a sort and sweep: only the boxes that overlap in x are compared,
+    rather than every box with every other box.
+
+    :param boxes1: the first set of boxes
+    :type boxes1: Nx2x2 array of float64s (the ``bbox.from_BB_array`` layout)
+
+    :param boxes2: the second set of boxes. If None, the overlapping pairs
+                   within boxes1 are found (with index1 < index2).
+    :type boxes2: Mx2x2 array of float64s
+
+    :returns: (index1, index2) -- arrays of the indexes of the overlapping
+              boxes in boxes1 and boxes2, sorted by index1, then index2.
+
+    Null (NaN) boxes never overlap anything.
+    """
+    index1 = [np.zeros((0,), dtype=np.int64)]
+    index2 = [np.zeros((0,), dtype=np.int64)]
+    for i1, i2 in iter_overlapping_pairs(boxes1, boxes2):
+        index1.append(i1)
+        index2.append(i2)
+    index1 = np.concatenate(index1)
+    index2 = np.concatenate(index2)
+    order = np.lexsort( (index2, index1) )
+    return index1[order], index2[order]
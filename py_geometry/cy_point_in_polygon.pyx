@@ -11,9 +11,11 @@ import cython
 # import both numpy and the Cython declarations for numpy
 import numpy as np
 cimport numpy as cnp
+from libc.stdint cimport int32_t
+from py_geometry.line_crossings cimport coord_t
 
 # declare the interface to the C code
-cdef extern char c_point_in_poly1(size_t nvert, double *vertices, double *point)
+cdef extern char c_point_in_poly1(size_t nvert, double *vertices, double *point) nogil
 
 @cython.boundscheck(False)
 @cython.wraparound(False)
@@ -84,3 +86,250 @@ def points_in_poly( cnp.ndarray[double, ndim=2, mode="c" ] pgon, points):
         return bool(result[0]) # to make it a regular python bool
     else:
         return result.view(dtype=np.bool) # make it a np.bool array
+
+
+## Multi-ring polygons
+##
+## A polygon made up of more than one ring (separate components and/or
+## holes) is given as a slice of an array of ring offsets into the vertices:
+## ring i is vertices[ring_offsets[i]:ring_offsets[i+1]]. The even-odd rule
+## is used, as c_point_in_poly1 does with its (0,0) separators: a point is
+## inside if it is inside an odd number of the rings. So holes and islands
+## in the holes "just work", whichever way the rings go around.
+##
+## The vertices can be float64, or int32 quantized coordinates (see the
+## quantized module): vertex = origin + scale * stored value. For those, the
+## points are moved into the quantized frame once, and the vertices are
+## converted to doubles as they are read -- they are never decoded into a
+## float64 array.
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cdef char _point_in_rings(const coord_t[:, ::1] vertices,
+                          const cnp.int64_t[::1] ring_offsets,
+                          Py_ssize_t first_ring, Py_ssize_t last_ring,
+                          double x, double y) nogil:
+    """
+    the same algorithm as c_point_in_poly1, with each ring closed on its own
+    """
+    cdef Py_ssize_t ring, i, j
+    cdef double xi, yi, xj, yj
+    cdef char c = 0
+
+    for ring in range(first_ring, last_ring):
+        if ring_offsets[ring + 1] == ring_offsets[ring]:
+            continue
+        j = ring_offsets[ring + 1] - 1
+        xj = <double> vertices[j, 0]
+        yj = <double> vertices[j, 1]
+        for i in range(ring_offsets[ring], ring_offsets[ring + 1]):
+            xi = <double> vertices[i, 0]
+            yi = <double> vertices[i, 1]
+            if ( ((yi > y) != (yj > y)) and
+                 (x < (xj - xi) * (y - yi) / (yj - yi) + xi) ):
+                c = not c
+            xj = xi
+            yj = yi
+    return c
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void _points_in_geometries(const coord_t[:, ::1] vertices,
+                                const cnp.int64_t[::1] ring_offsets,
+                                const cnp.int64_t[::1] geometry_offsets,
+                                const cnp.int64_t[::1] ids,
+                                const double[:, ::1] pts,
+                                cnp.uint8_t[::1] result) nogil:
+    cdef Py_ssize_t i, g
+    for i in range(pts.shape[0]):
+        g = ids[i]
+        result[i] = _point_in_rings(vertices, ring_offsets,
+                                    geometry_offsets[g], geometry_offsets[g + 1],
+                                    pts[i, 0], pts[i, 1])
+
+
+def _as_vertices(vertices):
+    vertices = np.asarray(vertices)
+    if vertices.dtype != np.int32:
+        vertices = vertices.astype(np.float64)
+    return np.ascontiguousarray(vertices).reshape(-1, 2)
+
+
+def _as_points(points, origin=(0.0, 0.0), scale=1.0):
+    points = np.asarray(points, dtype=np.float64)
+    points = points.reshape(-1, points.shape[-1])[:, :2]
+    if scale != 1.0 or tuple(origin) != (0.0, 0.0):
+        points = (points - np.asarray(origin, dtype=np.float64)) / scale
+    return np.ascontiguousarray(points)
+
+
+def _run_points_in_geometries(vertices, ring_offsets, geometry_offsets, ids, points):
+    # (const, so read-only -- memory mapped or shared -- sets work)
+    cdef const double[:, ::1] float_verts
+    cdef const int32_t[:, ::1] int_verts
+    cdef const cnp.int64_t[::1] offsets = np.ascontiguousarray(ring_offsets, dtype=np.int64)
+    cdef const cnp.int64_t[::1] geometries = geometry_offsets
+    cdef const cnp.int64_t[::1] ids_view = ids
+    cdef const double[:, ::1] pts = points
+
+    result = np.zeros((pts.shape[0],), dtype=np.uint8)
+    cdef cnp.uint8_t[::1] res = result
+    if vertices.dtype == np.int32:
+        int_verts = vertices
+        with nogil:
+            _points_in_geometries(int_verts, offsets, geometries, ids_view, pts, res)
+    else:
+        float_verts = vertices
+        with nogil:
+            _points_in_geometries(float_verts, offsets, geometries, ids_view, pts, res)
+    return result.view(dtype=np.bool_)
+
+
+def points_in_rings(vertices, ring_offsets, points, origin=(0.0, 0.0), scale=1.0):
+    """
+    points_in_rings(vertices, ring_offsets, points, origin=(0.0, 0.0), scale=1.0)
+
+    computes whether the points are in a polygon made up of more than one
+    ring -- separate components and/or holes.
+
+    :param vertices: the vertices of all the rings
+    :type vertices: NX2 numpy array of floats, or of int32 quantized
+                    coordinates
+
+    :param ring_offsets: ring i is vertices[ring_offsets[i]:ring_offsets[i+1]]
+    :type ring_offsets: (M+1) array of integers
+
+    :param points: the points to test
+    :type points: NX2 or NX3 array of floats -- the third coordinate is ignored
+
+    :param origin, scale: the vertices are origin + scale * vertices -- for
+                          quantized coordinates.
+
+    :returns: a boolean array the same length as points
+
+    A point is inside if it is inside an odd number of the rings, so there is
+    no need for the (0,0) separators of c_point_in_poly1 -- and points at
+    (0,0) are handled properly.
+    """
+    pts = _as_points(points, origin, scale)
+    num_rings = len(ring_offsets) - 1
+    return _run_points_in_geometries(_as_vertices(vertices),
+                                     ring_offsets,
+                                     np.array((0, num_rings), dtype=np.int64),
+                                     np.zeros((len(pts),), dtype=np.int64),
+                                     pts)
+
+
+def points_in_geometries(vertices, ring_offsets, geometry_offsets, geometry_ids, points,
+                         origin=(0.0, 0.0), scale=1.0):
+    """
+    points_in_geometries(vertices, ring_offsets, geometry_offsets, geometry_ids, points,
+                         origin=(0.0, 0.0), scale=1.0)
+
+    computes whether each point is in a given multi-ring polygon (geometry)
+    of a set of them -- point i is tested against geometry geometry_ids[i].
+
+    :param vertices: the vertices of all the rings (floats, or int32
+                     quantized coordinates)
+    :param ring_offsets: ring i is vertices[ring_offsets[i]:ring_offsets[i+1]]
+    :param geometry_offsets: geometry g is made of rings
+                             geometry_offsets[g] to geometry_offsets[g+1]
+    :param geometry_ids: the geometry to test each point against
+    :param points: NX2 or NX3 array of the points to test
+    :param origin, scale: the vertices are origin + scale * vertices -- for
+                          quantized coordinates.
+
+    :returns: a boolean array the same length as points
+
+    This is the layout of a MultiPolygonSet -- use its methods, rather than
+    calling this directly.
+    """
+    geometry_offsets = np.ascontiguousarray(geometry_offsets, dtype=np.int64)
+    ids = np.ascontiguousarray(geometry_ids, dtype=np.int64).reshape(-1)
+    pts = _as_points(points, origin, scale)
+    if len(ids) != len(pts):
+        raise ValueError("there must be one geometry id for each point")
+    if len(ids) and (ids.min() < 0 or ids.max() >= len(geometry_offsets) - 1):
+        raise IndexError("geometry id out of range")
+    return _run_points_in_geometries(_as_vertices(vertices), ring_offsets,
+                                     geometry_offsets, ids, pts)
+
+
+## Point location against a set of polygons
+##
+## The candidates for each point (usually from a spatial index of the
+## bounding boxes) are given in CSR form: the polygons to test point i
+## against are candidates[candidate_offsets[i]:candidate_offsets[i+1]].
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void _points_in_candidates(const double[:, ::1] vertices,
+                                const cnp.int64_t[::1] offsets,
+                                const double[:, ::1] pts,
+                                const cnp.int64_t[::1] candidate_offsets,
+                                const cnp.int64_t[::1] candidates,
+                                bint first_only,
+                                cnp.uint8_t[::1] inside) nogil:
+    cdef Py_ssize_t i, k
+    cdef cnp.int64_t p
+    for i in range(pts.shape[0]):
+        for k in range(candidate_offsets[i], candidate_offsets[i + 1]):
+            p = candidates[k]
+            # c_point_in_poly1 doesn't write to them -- it just isn't declared const
+            inside[k] = c_point_in_poly1(offsets[p + 1] - offsets[p],
+                                         <double *> &vertices[offsets[p], 0],
+                                         <double *> &pts[i, 0])
+            if inside[k] and first_only:
+                break
+
+
+def points_in_candidates(vertices, offsets, points, candidate_offsets, candidates,
+                         first_only=False):
+    """
+    points_in_candidates(vertices, offsets, points, candidate_offsets, candidates,
+                         first_only=False)
+
+    Tests each point against its candidate polygons, with c_point_in_poly1
+
+    :param vertices: the vertices of all the polygons
+    :type vertices: NX2 numpy array of floats
+
+    :param offsets: polygon i is vertices[offsets[i]:offsets[i+1]]
+    :type offsets: (M+1) array of integers
+
+    :param points: NX2 or NX3 array of the points to test
+
+    :param candidate_offsets, candidates: the polygons to test point i against are
+           candidates[candidate_offsets[i]:candidate_offsets[i+1]] -- as
+           returned by the query_points() method of the spatial indexes.
+
+    :param first_only: If True, the rest of the candidates for a point are
+                       skipped once it is found to be inside one.
+
+    :returns: a boolean array the same length as candidates -- True where the
+              point is inside the candidate polygon. (False for the skipped
+              ones, with first_only)
+
+    This is the guts of ``locate.locate_points`` -- use that, rather than
+    calling this directly.
+    """
+    cdef const double[:, ::1] verts = _as_vertices(np.asarray(vertices, dtype=np.float64))
+    cdef const cnp.int64_t[::1] offs = np.ascontiguousarray(offsets, dtype=np.int64)
+    cdef const double[:, ::1] pts = _as_points(points)
+    cdef const cnp.int64_t[::1] cand_offs = np.ascontiguousarray(candidate_offsets, dtype=np.int64)
+    cdef const cnp.int64_t[::1] cands = np.ascontiguousarray(candidates, dtype=np.int64)
+    cdef bint first = first_only
+
+    if cand_offs.shape[0] != pts.shape[0] + 1:
+        raise ValueError("there must be candidate offsets for each point")
+    if cand_offs[cand_offs.shape[0] - 1] != cands.shape[0]:
+        raise ValueError("the last candidate offset must be the number of candidates")
+    if cands.shape[0] and (np.min(cands) < 0 or np.max(cands) >= offs.shape[0] - 1):
+        raise IndexError("candidate polygon out of range")
+    result = np.zeros((cands.shape[0],), dtype=np.uint8)
+    cdef cnp.uint8_t[::1] inside = result
+    with nogil:
+        _points_in_candidates(verts, offs, pts, cand_offs, cands, first, inside)
+    return result.view(dtype=np.bool_)
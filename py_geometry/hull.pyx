@@ -0,0 +1,216 @@
+"""
+Convex hulls of all the polygons in a PolygonSet at once
+
+Andrew's monotone chain algorithm is used: the points of each polygon are
+sorted by x (then y), and the lower and upper hulls are built in one pass
+each over the sorted points.
+
+The points of each polygon are sorted (with a heapsort) and the hull built
+in one compiled loop over all the polygons, without the GIL.
+
+The hulls go counter-clockwise, starting at the point with the smallest x
+(and smallest y of those), and the first point is not repeated at the end.
+Points on the edges of the hull are not included. A polygon with only one
+(distinct) point has a hull of that point, one with two has a hull of the
+two points, and an empty polygon has an empty hull.
+"""
+
+import cython
+import numpy as np
+cimport numpy as cnp
+
+from .polygons import PolygonSet
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef inline double _turn(const double[:, ::1] pts,
+                         cnp.int64_t a, cnp.int64_t b, cnp.int64_t c) nogil:
+    """
+    the cross product of a->b and a->c -- positive for a left turn
+    """
+    return ( (pts[b, 0] - pts[a, 0]) * (pts[c, 1] - pts[a, 1]) -
+             (pts[b, 1] - pts[a, 1]) * (pts[c, 0] - pts[a, 0]) )
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef inline bint _less(const double[:, ::1] pts, cnp.int64_t a, cnp.int64_t b) nogil:
+    """
+    ordering by x, then y
+    """
+    return pts[a, 0] < pts[b, 0] or (pts[a, 0] == pts[b, 0] and pts[a, 1] < pts[b, 1])
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void _sort_points(const double[:, ::1] pts, cnp.int64_t[::1] order,
+                       Py_ssize_t start, Py_ssize_t n) nogil:
+    """
+    heapsorts order[start:start+n] by the points they index
+    """
+    cdef Py_ssize_t first, end, root, child
+    cdef cnp.int64_t tmp
+
+    for first in range(n // 2 - 1, -1, -1):
+        root = first
+        while 2 * root + 1 < n:
+            child = 2 * root + 1
+            if child + 1 < n and _less(pts, order[start + child], order[start + child + 1]):
+                child += 1
+            if not _less(pts, order[start + root], order[start + child]):
+                break
+            tmp = order[start + root]
+            order[start + root] = order[start + child]
+            order[start + child] = tmp
+            root = child
+    for end in range(n - 1, 0, -1):
+        tmp = order[start]
+        order[start] = order[start + end]
+        order[start + end] = tmp
+        root = 0
+        while 2 * root + 1 < end:
+            child = 2 * root + 1
+            if child + 1 < end and _less(pts, order[start + child], order[start + child + 1]):
+                child += 1
+            if not _less(pts, order[start + root], order[start + child]):
+                break
+            tmp = order[start + root]
+            order[start + root] = order[start + child]
+            order[start + child] = tmp
+            root = child
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void _hulls(const double[:, ::1] points,
+                 const cnp.int64_t[::1] offsets,
+                 cnp.int64_t[::1] order,
+                 cnp.int64_t[::1] hull,
+                 cnp.int64_t[::1] counts) nogil:
+    """
+    builds the hull of each polygon p -- order is scratch space for the
+    indexes of the points, sorted
+
+    The indexes of the hull points are put in hull[2*offsets[p]:], and the
+    number of them in counts[p].
+    """
+    cdef Py_ssize_t p, i, n, k, t, start, out
+    cdef cnp.int64_t prev, this
+
+    for p in range(offsets.shape[0] - 1):
+        start = offsets[p]
+        out = 2 * start
+        for i in range(start, offsets[p + 1]):
+            order[i] = i
+        _sort_points(points, order, start, offsets[p + 1] - start)
+        # drop repeated points (they are next to each other once sorted)
+        n = 0
+        for i in range(start, offsets[p + 1]):
+            this = order[i]
+            if n > 0:
+                prev = order[start + n - 1]
+                if points[this, 0] == points[prev, 0] and points[this, 1] == points[prev, 1]:
+                    continue
+            order[start + n] = this
+            n += 1
+        if n < 3:
+            for i in range(n):
+                hull[out + i] = order[start + i]
+            counts[p] = n
+            continue
+        # lower hull
+        k = 0
+        for i in range(n):
+            while k >= 2 and _turn(points, hull[out + k - 2], hull[out + k - 1],
+                                   order[start + i]) <= 0.0:
+                k -= 1
+            hull[out + k] = order[start + i]
+            k += 1
+        # upper hull
+        t = k + 1
+        for i in range(n - 2, -1, -1):
+            while k >= t and _turn(points, hull[out + k - 2], hull[out + k - 1],
+                                   order[start + i]) <= 0.0:
+                k -= 1
+            hull[out + k] = order[start + i]
+            k += 1
+        counts[p] = k - 1 # the last point is the first again
+
+
+def convex_hulls_flat(points, offsets):
+    """
+    convex_hulls_flat(points, offsets)
+
+    Computes the convex hulls of groups of points
+
+    :param points: the points of all the groups
+    :type points: NX2 array of floats
+
+    :param offsets: group i is points[offsets[i]:offsets[i+1]]
+    :type offsets: (M+1) array of integers
+
+    :returns: (hull_points, hull_offsets) -- in the same form, with hull i
+              being hull_points[hull_offsets[i]:hull_offsets[i+1]]
+    """
+    points = np.ascontiguousarray(points, dtype=np.float64).reshape(-1, 2)
+    offsets = np.ascontiguousarray(offsets, dtype=np.int64).reshape(-1)
+    if ( len(offsets) == 0 or offsets[0] != 0 or
+         offsets[-1] != len(points) or (np.diff(offsets) < 0).any() ):
+        raise ValueError("offsets must start at 0, end at the number of points, and never decrease")
+    num_groups = len(offsets) - 1
+    order = np.empty((len(points),), dtype=np.int64)
+    hull = np.empty((2 * len(points),), dtype=np.int64)
+    counts = np.zeros((num_groups,), dtype=np.int64)
+
+    cdef const double[:, ::1] pts = points
+    cdef const cnp.int64_t[::1] offs = offsets
+    cdef cnp.int64_t[::1] order_view = order
+    cdef cnp.int64_t[::1] hull_view = hull
+    cdef cnp.int64_t[::1] counts_view = counts
+    with nogil:
+        _hulls(pts, offs, order_view, hull_view, counts_view)
+
+    hull_offsets = np.zeros((num_groups + 1,), dtype=np.int64)
+    np.cumsum(counts, out=hull_offsets[1:])
+    # the hull of group i starts at 2 * offsets[i] in hull
+    taken = np.arange(hull_offsets[-1]) - np.repeat(hull_offsets[:-1] - 2 * offsets[:-1], counts)
+    return points[hull[taken]], hull_offsets
+
+
+def convex_hull_points(points):
+    """
+    convex_hull_points(points)
+
+    Computes the convex hull of a single group of points
+
+    :param points: NX2 array of points
+
+    :returns: the points of the hull, as a new NX2 array of float64
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    return convex_hulls_flat(points, (0, len(points)))[0]
+
+
+def convex_hulls(polygon_set):
+    """
+    convex_hulls(polygon_set)
+
+    Computes the convex hull of every polygon in a PolygonSet
+
+    :param polygon_set: the polygons
+    :type polygon_set: PolygonSet
+
+    :returns: a new PolygonSet of the hulls, in the same order -- the
+              metadata are the same objects as in the original, and the
+              metadata columns are copied.
+    """
+    hull_points, hull_offsets = convex_hulls_flat(polygon_set._PointsArray,
+                                                  polygon_set._IndexArray)
+    return PolygonSet.from_flat(hull_points,
+                                hull_offsets,
+                                polygon_set.GetMetaData(),
+                                dtype=polygon_set.dtype,
+                                copy=False,
+                                columns=dict((name, column.copy())
+                                             for name, column in polygon_set.meta.items()))
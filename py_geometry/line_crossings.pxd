@@ -0,0 +1,46 @@
+"""
+declarations for the line crossing functions, so they can be cimported
+by other Cython modules
+"""
+
+from libc.stdint cimport int32_t
+cimport numpy as cnp
+
+# coordinates can be doubles, or int32 quantized values (see the quantized
+# module) -- those are converted to doubles as they are read.
+ctypedef fused coord_t:
+    double
+    int32_t
+
+cpdef double cross_product(double x1, double x2, double y1, double y2) nogil
+
+cpdef double side_of_line(double x1, double y1,
+                          double x2, double y2,
+                          double Px, double Py) nogil
+
+cdef int32_t c_segment_cross(double px1, double py1,
+                             double px2, double py2,
+                             double px3, double py3,
+                             double px4, double py4,
+                             ) nogil
+
+cdef int32_t c_segment_intersect(double px1, double py1,
+                                 double px2, double py2,
+                                 double px3, double py3,
+                                 double px4, double py4,
+                                 ) nogil
+
+cdef int32_t c_adjacent_overlap(double px1, double py1,
+                                double px2, double py2,
+                                double px3, double py3,
+                                double px4, double py4,
+                                ) nogil
+
+cdef void _heapsort(double[::1] keys, cnp.int64_t[::1] order, Py_ssize_t n) nogil
+
+cdef bint _ring_intersections(const double[:, ::1] points,
+                              cnp.int64_t[::1] verts, Py_ssize_t m,
+                              cnp.int64_t[::1] edge, double[::1] lo,
+                              cnp.int64_t[::1] order,
+                              bint first_only, list found,
+                              Py_ssize_t polygon, Py_ssize_t base) nogil
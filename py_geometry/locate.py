@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+
+"""
+locate module, part of the geometry package
+
+Point location: finding the polygon(s) in a PolygonSet that contain each of
+a (large) set of points.
+
+The bounding boxes of the polygons are put in a spatial index (a
+``rtree.PackedRTree`` by default), so each point is only tested against the
+polygons whose boxes contain it -- with the same exact point in polygon test
+(``c_point_in_poly1``) as ``cy_point_in_polygon.points_in_poly``, in one
+compiled loop over all the points.
+"""
+
+import numpy as np
+
+from .rtree import PackedRTree
+from .cy_point_in_polygon import points_in_candidates
+
+
+def locate_points(polygon_set, points, all_matches=False, index=None):
+    """
+    locate_points(polygon_set, points, all_matches=False, index=None)
+
+    Finds the polygon that contains each point
+
+    :param polygon_set: the polygons to look in
+    :type polygon_set: PolygonSet
+
+    :param points: the points to locate
+    :type points: NX2 or NX3 array of floats -- the third coordinate is ignored
+
+    :param all_matches: If True, all the polygons that contain each point are
+                        found (where polygons overlap), rather than the first.
+
+    :param index: a spatial index of ``polygon_set.bounding_boxes``, with a
+                  query_points() method -- a ``PackedRTree`` or a
+                  ``SpatialHash``. One is built if not given: pass one in
+                  to re-use it when locating more than one batch of points.
+
+    :returns: an int array with the index of the (first) polygon that
+              contains each point, or -1 if none do (or the point has a
+              NaN or infinite coordinate).
+
+              With all_matches: (offsets, indexes) -- the indexes of the
+              polygons that contain point i are indexes[offsets[i]:offsets[i+1]],
+              in order.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    points = np.ascontiguousarray(points.reshape(-1, points.shape[-1])[:, :2])
+    if index is None:
+        index = PackedRTree(polygon_set.bounding_boxes)
+    # points with a NaN or inf coordinate aren't in any polygon -- they
+    # aren't passed to the index, and get no candidates
+    finite = np.isfinite(points).all(axis=1)
+    if finite.all():
+        candidate_offsets, candidates = index.query_points(points)
+    else:
+        finite_offsets, candidates = index.query_points(points[finite])
+        counts = np.zeros((len(points),), dtype=np.int64)
+        counts[finite] = np.diff(finite_offsets)
+        candidate_offsets = np.zeros((len(points) + 1,), dtype=np.int64)
+        np.cumsum(counts, out=candidate_offsets[1:])
+    inside = points_in_candidates(polygon_set._PointsArray,
+                                  polygon_set._IndexArray,
+                                  points,
+                                  candidate_offsets,
+                                  candidates,
+                                  first_only=not all_matches)
+    point_ids = np.repeat(np.arange(len(points)), np.diff(candidate_offsets))[inside]
+    found = candidates[inside].astype(np.int64)
+    if all_matches:
+        offsets = np.zeros((len(points) + 1,), dtype=np.int64)
+        np.cumsum(np.bincount(point_ids, minlength=len(points)), out=offsets[1:])
+        return offsets, found
+    # the candidates are in order, and the search stopped at the first hit
+    result = np.empty((len(points),), dtype=np.int64)
+    result.fill(-1)
+    result[point_ids] = found
+    return result
@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+
+"""
+multipolygons module, part of the geometry package
+
+A MultiPolygonSet is a set of geometries, each made up of one or more rings:
+separate components and/or holes -- a continent with lakes, with islands in
+the lakes, for instance.
+
+It is stored in two levels of offsets: the rings are a PolygonSet (one
+polygon for each ring), and each geometry is a run of rings in it:
+
+  geometry g is rings geometry_offsets[g] to geometry_offsets[g+1]
+
+The even-odd rule is used to decide what is inside: a point is inside a
+geometry if it is inside an odd number of its rings, so it doesn't matter
+which rings are holes, or which way they go around.
+"""
+
+import copy
+
+import numpy as np
+
+from . import bbox
+from .polygons import PolygonSet
+from .cy_point_in_polygon import points_in_rings, points_in_geometries
+
+
+class MultiPolygonSet(object):
+    """
+    A set of geometries, each made up of one or more rings (polygons)
+
+    The rings are a PolygonSet: ``MultiPolygonSet.rings``
+    """
+    def __init__(self, rings=None, geometry_offsets=None, metadata=None):
+        """
+        MultiPolygonSet(rings=None, geometry_offsets=None, metadata=None)
+
+        :param rings: all the rings of all the geometries (it is not copied)
+        :type rings: PolygonSet
+
+        :param geometry_offsets: geometry g is rings geometry_offsets[g] to
+                                 geometry_offsets[g+1]. If not given, each
+                                 ring is a geometry.
+        :type geometry_offsets: (G+1) array of integers
+
+        :param metadata: optional sequence of G metadata objects (one for each
+                         geometry) -- the metadata of the rings is separate.
+
+        If nothing is passed in, an empty set is created.
+        """
+        if rings is None:
+            rings = PolygonSet()
+        self.rings = rings
+        if geometry_offsets is None:
+            geometry_offsets = np.arange(len(rings) + 1)
+        geometry_offsets = np.array(geometry_offsets, dtype=np.int64).reshape(-1)
+        if ( len(geometry_offsets) == 0 or geometry_offsets[0] != 0 or
+             geometry_offsets[-1] != len(rings) or (np.diff(geometry_offsets) < 0).any() ):
+            raise ValueError("geometry_offsets must start at 0, end at the number of rings, and never decrease")
+        self._geometry_buffer = geometry_offsets
+        self._num_geometries = len(geometry_offsets) - 1
+        if metadata is None:
+            metadata = [None] * self._num_geometries
+        else:
+            metadata = list(metadata)
+            if len(metadata) != self._num_geometries:
+                raise ValueError("there must be one metadata object for each geometry")
+        self._MetaDataList = metadata
+
+    @classmethod
+    def from_polygons(cls, geometries, metadata=None, dtype=np.float64):
+        """
+        MultiPolygonSet.from_polygons(geometries, metadata=None, dtype=np.float64)
+
+        Create a new MultiPolygonSet from a sequence of geometries, each a
+        sequence of rings (NX2 arrays, Polygons, or anything that can be turned
+        into NX2 arrays).
+        """
+        geometries = [list(rings) for rings in geometries]
+        offsets = np.zeros((len(geometries) + 1,), dtype=np.int64)
+        np.cumsum([len(rings) for rings in geometries], out=offsets[1:])
+        rings = PolygonSet.from_arrays([ring for rings in geometries for ring in rings],
+                                       dtype=dtype)
+        return cls(rings, offsets, metadata)
+
+    def _get_geometry_offsets(self):
+        return self._geometry_buffer[:self._num_geometries + 1]
+    geometry_offsets = property(_get_geometry_offsets,
+                                doc="geometry g is rings geometry_offsets[g] to geometry_offsets[g+1]")
+
+    def __len__(self):
+        return self._num_geometries
+
+    def append(self, rings, metadata=None):
+        """
+        append(rings, metadata=None)
+
+        Adds a geometry made up of the rings -- a PolygonSet, or a sequence
+        of Polygons or NX2 arrays.
+        """
+        self.rings.extend(rings)
+        if self._num_geometries + 2 > len(self._geometry_buffer):
+            # grow the same way as the PolygonSet buffers
+            offsets = np.empty((2 * len(self._geometry_buffer),), dtype=np.int64)
+            offsets[:self._num_geometries + 1] = self.geometry_offsets
+            self._geometry_buffer = offsets
+        self._num_geometries += 1
+        self._geometry_buffer[self._num_geometries] = len(self.rings)
+        self._MetaDataList.append(metadata)
+
+    def __getitem__(self, index):
+        """
+        returns the rings of a geometry, as a PolygonSet
+
+        The PolygonSet is a (read-only) view on the rings in the
+        MultiPolygonSet -- the points are not copied.
+        """
+        if index >= len(self):
+            raise IndexError
+        if index < 0:
+            if index < - len(self):
+                raise IndexError
+            index = len(self) + index
+        offsets = self.geometry_offsets
+        return self.rings[offsets[index]:offsets[index + 1]]
+
+    def __iter__(self):
+        """
+        iterates through the geometries in the set -- each one is a
+        PolygonSet view on the rings (see __getitem__)
+        """
+        for index in range(len(self)):
+            yield self[index]
+
+    def GetMetaData(self):
+        """
+        returns a (shallow) copy of the metadata list of the geometries
+        """
+        return copy.copy(self._MetaDataList)
+
+    def _get_bounding_boxes(self):
+        ring_boxes = np.asarray(self.rings.bounding_boxes)
+        boxes = np.empty((len(self), 2, 2), np.float64)
+        boxes.fill(np.nan)
+        offsets = self.geometry_offsets
+        non_empty = np.diff(offsets) > 0
+        if non_empty.any():
+            # fmin and fmax skip the null boxes of empty rings
+            starts = offsets[:-1][non_empty]
+            boxes[non_empty, 0, :] = np.fmin.reduceat(ring_boxes[:, 0, :], starts, axis=0)
+            boxes[non_empty, 1, :] = np.fmax.reduceat(ring_boxes[:, 1, :], starts, axis=0)
+        return bbox.asBBoxArray(boxes)
+    bounding_boxes = property(_get_bounding_boxes,
+                              doc="The bounding box of each geometry, as a BBoxArray")
+
+    def _get_bounding_box(self):
+        return self.rings.bounding_box
+    bounding_box = property(_get_bounding_box)
+
+    def points_inside(self, index, points):
+        """
+        points_inside(index, points)
+
+        computes whether the points are inside geometry number index
+
+        :param points: NX2 or NX3 array of the points to test
+
+        :returns: a boolean array the same length as points
+        """
+        rings = self[index]
+        return points_in_rings(rings._PointsArray, rings._IndexArray, points)
+
+    def points_in_geometries(self, points, geometry_ids):
+        """
+        points_in_geometries(points, geometry_ids)
+
+        computes whether each point is inside a geometry -- point i is tested
+        against geometry geometry_ids[i] -- all in one compiled pass.
+
+        :param points: NX2 or NX3 array of the points to test
+        :param geometry_ids: array of N geometry indexes
+
+        :returns: a boolean array the same length as points
+        """
+        return points_in_geometries(self.rings._PointsArray,
+                                    self.rings._IndexArray,
+                                    self.geometry_offsets,
+                                    geometry_ids,
+                                    points)
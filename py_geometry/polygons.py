@@ -10,11 +10,34 @@ ndarray, but can hold additional metadata, and a few extra methods.
 """
 
 import copy
+import json
+from multiprocessing.pool import ThreadPool
 
 import numpy as np
 
 from . import bbox
 
+## The binary file format for PolygonSets (see PolygonSet.save):
+##
+## A fixed-size header, then the points (float64, Nx2), the indexes
+## (int64, M+1), the bounding boxes (float64, Mx2x2), and the metadata as
+## utf-8 encoded JSON. All little-endian, with each section starting on a
+## multiple of _FILE_ALIGN bytes, so they can be memory mapped.
+_FILE_MAGIC = b"PYGEOSET"
+_FILE_VERSION = 1
+_FILE_ALIGN = 64
+_FILE_HEADER = np.dtype([('magic', 'S8'),
+                         ('version', '<u4'),
+                         ('reserved', '<u4'),
+                         ('num_polygons', '<u8'),
+                         ('num_points', '<u8'),
+                         ('points_start', '<u8'),
+                         ('index_start', '<u8'),
+                         ('bbox_start', '<u8'),
+                         ('metadata_start', '<u8'),
+                         ('metadata_length', '<u8'),
+                         ])
+
 class Polygon(np.ndarray):
     """
     A Polygon class
@@ -76,11 +99,92 @@ class Polygon(np.ndarray):
         return bbox.from_points(self)
     bounding_box = property(_get_bounding_box)
 
-   
-class PolygonSet:
+    def copy(self, order='C'):
+        """
+        returns a copy of the Polygon that does not share any data with the
+        original -- including a (deep) copy of the metadata.
+        """
+        cp = np.ndarray.copy(self, order)
+        cp.metadata = copy.deepcopy(self.metadata)
+        return cp
+
+
+def _fill_value(dtype):
+    """
+    the value used for polygons that have no value in a metadata column
+    """
+    dtype = np.dtype(dtype)
+    if dtype.kind in 'fc':
+        return np.nan
+    return np.zeros((), dtype)[()]
+
+
+class MetaColumns(object):
+    """
+    The columnar metadata of a PolygonSet: a dict-like set of named, typed
+    arrays, with one value for each polygon.
+
+    You get one from ``PolygonSet.meta``::
+
+        set.meta['type'] = type_array # add (or replace) a column
+        set.meta['type']              # the values, as an array
+        set.where(set.meta['type'] == 2)
+
+    The arrays are views on the data in the set, so they can be changed in
+    place. A single value can be assigned to set the whole column.
+
+    Appending or extending widens a column if the new values don't fit its
+    type: a float appended to an int column makes it a float column, and a
+    longer string makes a string column wider.
+
+    This takes a lot less memory than a dict for each polygon (in the
+    metadata list), and can be searched without a Python loop.
+    """
+    def __init__(self, polygon_set):
+        self._set = polygon_set
+
+    def __getitem__(self, name):
+        return self._set._columns[name][:len(self._set)]
+
+    def __setitem__(self, name, values):
+        num_polygons = len(self._set)
+        values = np.asarray(values)
+        if values.ndim > 1 or (values.ndim == 1 and len(values) != num_polygons):
+            raise ValueError("a metadata column must have one value for each polygon")
+        column = np.empty((max(len(self._set._index_buffer) - 1, num_polygons),), dtype=values.dtype)
+        column[:num_polygons] = values
+        self._set._columns[name] = column
+
+    def __delitem__(self, name):
+        del self._set._columns[name]
+
+    def __contains__(self, name):
+        return name in self._set._columns
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self._set._columns)
+
+    def keys(self):
+        return sorted(self._set._columns)
+
+    def items(self):
+        return [(name, self[name]) for name in self.keys()]
+
+    def __repr__(self):
+        return "MetaColumns(%s)" % ", ".join("%s: %s" % (name, self[name].dtype)
+                                             for name in self.keys())
+
+
+class PolygonSet(object):
     """
     A set of polygons (or polylines) stored as a single array of vertex data,
     and indexes into that array.
+
+    Each polygon can have a metadata object (in a list), and there can also
+    be columns of typed metadata -- see ``PolygonSet.meta``
     """
      
     def __init__(self, data = None, dtype=np.float64):
@@ -94,6 +198,7 @@ class PolygonSet:
 
         """
         self.dtype = dtype
+        self._columns = {}
         if data is  None:
             self._PointsArray = np.zeros((0,2), self.dtype)
             self._IndexArray = np.array( (0,), dtype=np.int)
@@ -101,9 +206,158 @@ class PolygonSet:
         else:
             self._PointsArray = np.array(data[0])
             self._IndexArray  = np.array(data[1])
-            self._MetaDataList  = np.array(data[2])
-        
-    def append(self, polygon, metadata=None):
+            self._MetaDataList  = list(data[2])
+
+    @classmethod
+    def from_flat(cls, points, offsets, metadata=None, dtype=np.float64, copy=True,
+                  columns=None):
+        """
+        PolygonSet.from_flat(points, offsets, metadata=None, dtype=np.float64, copy=True,
+                             columns=None)
+
+        Create a new PolygonSet from the points of all the polygons in one
+        array, and the offsets to the start of each:
+
+        polygon i is points[offsets[i]:offsets[i+1]]
+
+        :param points: NX2 array of the points of all the polygons
+        :param offsets: (M+1) array of integer offsets into points -- the first
+                        must be 0 and the last len(points)
+        :param metadata: optional sequence of M metadata objects (None for each
+                         polygon if not given)
+        :param copy: If False, the arrays are used directly if they are already
+                     of the right type.
+        :param columns: optional columnar metadata (see ``meta``): a dict of
+                        arrays, or a structured array, of length M
+        """
+        points = np.array(points, dtype, copy=copy).reshape(-1, 2)
+        offsets = np.array(offsets, np.int, copy=copy).reshape(-1)
+        if ( len(offsets) == 0 or offsets[0] != 0 or
+             offsets[-1] != len(points) or (np.diff(offsets) < 0).any() ):
+            raise ValueError("offsets must start at 0, end at the number of points, and never decrease")
+        num_polygons = len(offsets) - 1
+        if metadata is None:
+            metadata = [None] * num_polygons
+        else:
+            metadata = list(metadata)
+            if len(metadata) != num_polygons:
+                raise ValueError("there must be one metadata object for each polygon")
+        ps = cls(dtype=dtype)
+        ps._PointsArray = points
+        ps._IndexArray = offsets
+        ps._MetaDataList = metadata
+        if columns is not None:
+            ps._set_columns(columns, copy)
+        return ps
+
+    @classmethod
+    def from_arrays(cls, arrays, metadata=None, dtype=np.float64, columns=None):
+        """
+        PolygonSet.from_arrays(arrays, metadata=None, dtype=np.float64, columns=None)
+
+        Create a new PolygonSet from a sequence of NX2 arrays (or Polygons,
+        or anything that can be turned into NX2 arrays). It can be a
+        generator -- it is only iterated once.
+
+        All the points are copied in one go, rather than one polygon at a time.
+
+        :param metadata: optional sequence of metadata objects, one for each
+                         polygon. If not given, the metadata attribute of
+                         each array is used, if it has one.
+        :param columns: optional columnar metadata (see ``meta``)
+        """
+        arrays = list(arrays)
+        if metadata is None:
+            metadata = [getattr(arr, 'metadata', None) for arr in arrays]
+        # (no copy for arrays that are already the right type)
+        arrays = [np.asarray(arr, dtype=dtype).reshape(-1, 2) for arr in arrays]
+        offsets = np.zeros((len(arrays) + 1,), dtype=np.int)
+        np.cumsum([len(arr) for arr in arrays], out=offsets[1:])
+        if arrays:
+            points = np.concatenate(arrays)
+        else:
+            points = np.zeros((0, 2), dtype=dtype)
+        return cls.from_flat(points, offsets, metadata, dtype, copy=False, columns=columns)
+
+    @classmethod
+    def from_polygons(cls, polygons, dtype=np.float64):
+        """
+        PolygonSet.from_polygons(polygons, dtype=np.float64)
+
+        Create a new PolygonSet from an iterable of Polygon objects (or NX2
+        arrays). It can be a generator -- it is only iterated once.
+
+        The metadata of each polygon is kept.
+        """
+        return cls.from_arrays(list(polygons), dtype=dtype)
+
+    ## The points and indexes are kept in buffers that are bigger than
+    ## needed, so that append doesn't need to re-allocate every time.
+    ## _PointsArray and _IndexArray are views on the part in use.
+    def _get_points_array(self):
+        return self._points_buffer[:self._num_points]
+    def _set_points_array(self, points):
+        self._points_buffer = points
+        self._num_points = len(points)
+        self.clear_cache()
+    _PointsArray = property(_get_points_array, _set_points_array)
+
+    def _get_index_array(self):
+        return self._index_buffer[:self._num_indexes]
+    def _set_index_array(self, indexes):
+        self._index_buffer = indexes
+        self._num_indexes = len(indexes)
+        self.clear_cache()
+    _IndexArray = property(_get_index_array, _set_index_array)
+
+    def _grow(self, num_points, num_polygons, exact=False):
+        """
+        makes sure there is room in the buffers for num_points points and
+        num_polygons polygons in total.
+
+        Unless exact is True, the buffers are at least doubled in size when
+        they are re-allocated, so that appending is amortized O(N)
+        """
+        if num_points > len(self._points_buffer):
+            if not exact:
+                num_points = max(num_points, 2 * len(self._points_buffer))
+            points = np.empty((num_points, 2), dtype=self._points_buffer.dtype)
+            points[:self._num_points] = self._PointsArray
+            self._points_buffer = points
+        if num_polygons + 1 > len(self._index_buffer):
+            num_indexes = num_polygons + 1
+            if not exact:
+                num_indexes = max(num_indexes, 2 * len(self._index_buffer))
+            indexes = np.empty((num_indexes,), dtype=self._index_buffer.dtype)
+            indexes[:self._num_indexes] = self._IndexArray
+            self._index_buffer = indexes
+        for name, column in self._columns.items():
+            if len(column) < num_polygons:
+                new_column = np.empty((len(self._index_buffer) - 1,), dtype=column.dtype)
+                new_column[:len(self)] = column[:len(self)]
+                self._columns[name] = new_column
+
+    def reserve(self, num_points, num_polygons=0):
+        """
+        reserve(num_points, num_polygons=0)
+
+        Makes room for a total of num_points points and num_polygons polygons,
+        so that they can be appended without re-allocating the data.
+
+        This is only an optimization -- the PolygonSet grows as needed anyway.
+        """
+        self._grow(num_points, num_polygons, exact=True)
+
+    def trim(self):
+        """
+        Releases any extra memory that was allocated for appending
+        """
+        self._PointsArray = self._PointsArray.copy()
+        self._IndexArray = self._IndexArray.copy()
+        for name, column in self._columns.items():
+            self._columns[name] = column[:len(self)].copy()
+
+    def append(self, polygon, metadata=None, columns=None):
 
         """
         polygon should be a Polygon object or a  NX2 array (or something that
@@ -112,18 +366,247 @@ class PolygonSet:
         So that polygon[n,0] is the x coordinate of the nth point and 
                 polygon[n,1] is the y coordinate of the nth point 
 
+        columns is an optional dict of the values for the metadata columns
+        (see ``meta``). Columns that are not given get 0 (or NaN).
         """
         if metadata is None:
             metadata = getattr(polygon, 'metadata', None)
         polygon = np.asarray(polygon, dtype=self.dtype).reshape((-1, 2))
-        self._PointsArray = np.r_[self._PointsArray, polygon]
-        self._IndexArray  = np.r_[self._IndexArray, (self._PointsArray.shape[0],) ]
+        num_points = self._num_points + len(polygon)
+        self._grow(num_points, len(self) + 1)
+        if len(polygon): # the buffer may be a read-only view, if it didn't grow
+            self._points_buffer[self._num_points:num_points] = polygon
+        self._num_points = num_points
+        self._index_buffer[self._num_indexes] = num_points
+        self._num_indexes += 1
         self._MetaDataList.append(metadata)
+        self._append_columns(len(self) - 1, columns or {})
+        if self._bbox_buffer is not None:
+            # keep the cached bounding boxes up to date
+            if len(self._bbox_buffer) < len(self):
+                boxes = np.empty((2 * len(self._bbox_buffer) + 1, 2, 2), np.float64)
+                boxes[:len(self) - 1] = self._bbox_buffer[:len(self) - 1]
+                self._bbox_buffer = boxes
+            if len(polygon):
+                self._bbox_buffer[len(self) - 1] = (polygon.min(0), polygon.max(0))
+            else:
+                self._bbox_buffer[len(self) - 1] = np.nan
+
+    def extend(self, polygons):
+        """
+        extend(polygons)
+
+        Appends all the polygons in another PolygonSet (or a sequence of
+        Polygons or NX2 arrays) in one go, along with their metadata.
+        """
+        if not isinstance(polygons, PolygonSet):
+            polygons = PolygonSet.from_arrays(list(polygons), dtype=self.dtype)
+        first = len(self)
+        # everything is taken from polygons before anything is changed, in
+        # case it is this set
+        points = polygons._PointsArray
+        indexes = polygons._IndexArray[1:].copy()
+        metadata = list(polygons._MetaDataList)
+        columns = dict((name, column.copy()) for name, column in polygons.meta.items())
+        start = self._num_points
+        num_points = start + len(points)
+        num_indexes = self._num_indexes + len(indexes)
+        if len(indexes) == 0:
+            return
+        self._grow(num_points, len(self) + len(indexes))
+        if len(points): # the buffer may be a read-only view, if it didn't grow
+            self._points_buffer[start:num_points] = points
+        self._index_buffer[self._num_indexes:num_indexes] = indexes + start
+        self._num_points = num_points
+        self._num_indexes = num_indexes
+        self._MetaDataList.extend(metadata)
+        self._append_columns(first, columns)
+        self.clear_cache()
+
+    ## The columnar metadata are kept in buffers the same size as the index
+    ## buffer (less one), so they can be appended to in the same way.
+    def _get_meta(self):
+        return MetaColumns(self)
+    meta = property(_get_meta,
+                    doc="The columnar metadata -- a dict-like MetaColumns object")
+
+    def _set_columns(self, columns, copy=True):
+        """
+        sets all the columns, from a dict of arrays or a structured array
+        """
+        names = getattr(getattr(columns, 'dtype', None), 'names', None)
+        if names is None:
+            names = list(columns.keys())
+        self._columns = {}
+        for name in names:
+            values = np.array(columns[name], copy=copy)
+            if values.shape != (len(self),):
+                raise ValueError("a metadata column must have one value for each polygon")
+            self._columns[name] = values
+
+    def _append_columns(self, first, columns):
+        """
+        sets the column values of the polygons from first on -- columns is a
+        dict (or MetaColumns) of scalars or arrays. Missing columns are
+        filled, and new ones are added. A column is widened (with
+        np.result_type) if the values don't fit in its type.
+        """
+        for name in columns:
+            if name not in self._columns:
+                values = np.asarray(columns[name])
+                self.meta[name] = _fill_value(values.dtype)
+        for name, column in list(self._columns.items()):
+            if name in columns:
+                values = np.asarray(columns[name])
+                dtype = np.result_type(column.dtype, values)
+                if dtype != column.dtype:
+                    # widen the column, so the values are not cut short
+                    column = column.astype(dtype)
+                    self._columns[name] = column
+                column[first:len(self)] = values
+            else:
+                column[first:len(self)] = _fill_value(column.dtype)
+
+    def where(self, condition):
+        """
+        where(condition)
+
+        returns a new PolygonSet of the polygons for which condition is True
+
+        :param condition: a boolean array, one for each polygon -- usually
+                          computed from the metadata columns, e.g.:
+                          ``set.where(set.meta['type'] == 2)``
+        """
+        condition = np.asarray(condition)
+        if condition.dtype != np.bool_:
+            raise ValueError("condition must be a boolean array")
+        return self.take(condition)
+
+    def clear_cache(self):
+        """
+        Clears the data computed from the points (such as the bounding boxes
+        of the polygons), so it will be re-computed when next needed.
+
+        This is done for you when the data are replaced (SetPointsData,
+        TransformData, etc), but call it if you change the points in place
+        (e.g. through a Polygon view from the set).
+        """
+        self._bbox_buffer = None
+
+    def _compute_bounding_boxes(self):
+        points = self._PointsArray
+        boxes = np.empty((len(self), 2, 2), np.float64)
+        boxes.fill(np.nan) # empty polygons get null boxes
+        # reduceat can't do empty segments, so just skip them -- each
+        # segment then runs to the start of the next non-empty one.
+        non_empty = np.diff(self._IndexArray) > 0
+        if non_empty.any():
+            starts = self._IndexArray[:-1][non_empty]
+            boxes[non_empty, 0, :] = np.minimum.reduceat(points, starts, axis=0)
+            boxes[non_empty, 1, :] = np.maximum.reduceat(points, starts, axis=0)
+        return boxes
+
+    def _get_bounding_boxes(self):
+        if self._bbox_buffer is None:
+            self._bbox_buffer = self._compute_bounding_boxes()
+        boxes = self._bbox_buffer[:len(self)]
+        boxes.flags.writeable = False # it's a cache -- don't change it!
+        return bbox.asBBoxArray(boxes)
+    bounding_boxes = property(_get_bounding_boxes,
+                              doc="The bounding box of each polygon, as a read-only BBoxArray")
 
     def _get_bounding_box(self):
-        return bbox.from_points(self._PointsArray)
+        return self.bounding_boxes.bounding_box
     bounding_box = property(_get_bounding_box)
 
+    ## Geometric properties of all the polygons at once
+    ##
+    ## Each polygon is treated as a closed ring: the last point is joined to
+    ## the first. If the first point is repeated at the end, as CrossingsTest
+    ## allows, that adds a zero-length edge, which doesn't change anything.
+
+    def _segment_sums(self, values):
+        """
+        sums values (one for each point) over each polygon, with a zero sum for
+        empty polygons
+        """
+        sums = np.zeros((len(self),) + values.shape[1:], np.float64)
+        non_empty = np.diff(self._IndexArray) > 0
+        if non_empty.any():
+            sums[non_empty] = np.add.reduceat(values, self._IndexArray[:-1][non_empty], axis=0)
+        return sums
+
+    def _edges(self):
+        """
+        returns (start, end, owner): the start and end point of every edge of
+        every polygon (relative to the first point of the polygon, to reduce
+        round-off), and the index of the polygon each is in.
+        """
+        points = np.asarray(self._PointsArray, np.float64)
+        counts = np.diff(self._IndexArray)
+        owner = np.repeat(np.arange(len(self)), counts)
+        first = points[self._IndexArray[:-1][owner]]
+        following = np.arange(1, len(points) + 1)
+        # the last point of each polygon joins back to the first
+        following[self._IndexArray[1:][counts > 0] - 1] = self._IndexArray[:-1][counts > 0]
+        return points - first, points[following] - first, owner
+
+    def signed_areas(self):
+        """
+        returns the signed area of each polygon, as an array of length N
+
+        The area is positive if the points go around the polygon
+        counter-clockwise, and negative if they go clockwise.
+        """
+        start, end, owner = self._edges()
+        cross = start[:, 0] * end[:, 1] - end[:, 0] * start[:, 1]
+        return self._segment_sums(cross) / 2.0
+
+    def areas(self):
+        """
+        returns the area of each polygon, as an array of length N
+        """
+        return np.abs(self.signed_areas())
+
+    def perimeters(self):
+        """
+        returns the perimeter of each polygon (including the edge from the last
+        point back to the first), as an array of length N
+        """
+        start, end, owner = self._edges()
+        return self._segment_sums(np.hypot(*(end - start).T))
+
+    def centroids(self):
+        """
+        returns the centroid (center of area) of each polygon, as an Nx2 array
+
+        For polygons with no area (fewer than three points, or all in a line),
+        the mean of the points is used. Empty polygons get NaN.
+        """
+        start, end, owner = self._edges()
+        cross = start[:, 0] * end[:, 1] - end[:, 0] * start[:, 1]
+        area = self._segment_sums(cross) / 2.0
+        moments = self._segment_sums( (start + end) * cross[:, None] )
+        points = np.asarray(self._PointsArray, np.float64)
+        firsts = np.empty((len(self), 2), np.float64)
+        firsts.fill(np.nan)
+        counts = np.diff(self._IndexArray)
+        firsts[counts > 0] = points[self._IndexArray[:-1][counts > 0]]
+
+        centroids = np.empty((len(self), 2), np.float64)
+        has_area = area != 0.0
+        centroids[has_area] = moments[has_area] / (6.0 * area[has_area, None])
+
+        # the mean of the points -- without a repeated last point
+        sums = self._segment_sums(start)
+        closed = np.zeros((len(self),), np.bool_)
+        multi = counts > 1
+        closed[multi] = (start[self._IndexArray[1:][multi] - 1] == 0.0).all(1)
+        counts = counts - closed
+        with np.errstate(invalid='ignore', divide='ignore'):
+            centroids[~has_area] = sums[~has_area] / counts[~has_area, None]
+        return centroids + firsts
+
     def _get_total_num_points(self):
         return len(self._PointsArray)
     total_num_points = property(_get_total_num_points)
@@ -164,10 +647,176 @@ class PolygonSet:
         self._PointsArray = np.array(PointData[0], self.dtype)
         self._IndexArray = np.array(PointData[1], dtype=np.int)
         if MetaData is not None:
-            self._DataArray = MetaData
+            self._MetaDataList = list(MetaData)
         else:
-            self._DataArray = [None] * len(self.PointsArray)
+            self._MetaDataList = [None] * len(self)
+        self._columns = {}
     
+    def _file_layout(self):
+        """
+        returns (header, sections, metadata) for the binary file format:
+        sections is a list of (offset, array) of the arrays to write
+        """
+        points = np.ascontiguousarray(self._PointsArray, dtype='<f8')
+        indexes = np.ascontiguousarray(self._IndexArray, dtype='<i8')
+        boxes = np.ascontiguousarray(self.bounding_boxes, dtype='<f8')
+        metadata = json.dumps(list(self._MetaDataList)).encode('utf-8')
+
+        def aligned(position):
+            return -(-position // _FILE_ALIGN) * _FILE_ALIGN
+
+        header = np.zeros((1,), dtype=_FILE_HEADER)
+        header['magic'] = _FILE_MAGIC
+        header['version'] = _FILE_VERSION
+        header['num_polygons'] = len(self)
+        header['num_points'] = len(points)
+        header['points_start'] = aligned(_FILE_HEADER.itemsize)
+        header['index_start'] = aligned(header['points_start'][0] + points.nbytes)
+        header['bbox_start'] = aligned(header['index_start'][0] + indexes.nbytes)
+        header['metadata_start'] = aligned(header['bbox_start'][0] + boxes.nbytes)
+        header['metadata_length'] = len(metadata)
+        sections = [ (int(header['points_start'][0]), points),
+                     (int(header['index_start'][0]), indexes),
+                     (int(header['bbox_start'][0]), boxes),
+                     ]
+        return header, sections, metadata
+
+    @staticmethod
+    def _check_header(header, name):
+        """
+        checks the header read from a file (or buffer), and returns the
+        (offset, dtype, shape) of each of the arrays
+        """
+        if len(header) != 1 or header['magic'][0] != _FILE_MAGIC:
+            raise ValueError("%s is not a PolygonSet file"%name)
+        header = header[0]
+        if header['version'] > _FILE_VERSION:
+            raise ValueError("%s is version %i of the PolygonSet file format: "
+                             "only up to %i is supported"%(name, header['version'], _FILE_VERSION))
+        num_polygons = int(header['num_polygons'])
+        num_points = int(header['num_points'])
+        return [ (int(header['points_start']), '<f8', (num_points, 2)),
+                 (int(header['index_start']), '<i8', (num_polygons + 1,)),
+                 (int(header['bbox_start']), '<f8', (num_polygons, 2, 2)),
+                 ]
+
+    def file_size(self):
+        """
+        returns the number of bytes that save() would write -- or that
+        write_buffer() needs.
+        """
+        header, sections, metadata = self._file_layout()
+        return int(header['metadata_start'][0]) + len(metadata)
+
+    def save(self, filename):
+        """
+        save(filename)
+
+        Saves the PolygonSet in a simple binary file, that can be opened
+        (and memory mapped) with PolygonSet.open()
+
+        The points are saved as float64, and the metadata as JSON, so it
+        must be something that can be converted to JSON (dicts, lists,
+        strings, numbers and None). The metadata columns are not saved.
+        """
+        header, sections, metadata = self._file_layout()
+        with open(filename, 'wb') as outfile:
+            outfile.write(header.tostring())
+            for start, data in sections:
+                outfile.seek(start)
+                data.tofile(outfile)
+            outfile.seek(header['metadata_start'][0])
+            outfile.write(metadata)
+
+    def write_buffer(self, buffer):
+        """
+        write_buffer(buffer)
+
+        Writes the PolygonSet into a writable buffer (a bytearray, mmap,
+        shared memory block, etc), in the same format as save(). It must be
+        at least file_size() bytes long.
+
+        The set can then be used from the buffer with PolygonSet.from_buffer()
+        """
+        header, sections, metadata = self._file_layout()
+        size = int(header['metadata_start'][0]) + len(metadata)
+        data = np.frombuffer(buffer, dtype=np.uint8)
+        if len(data) < size:
+            raise ValueError("the buffer must be at least %i bytes"%size)
+        data[:_FILE_HEADER.itemsize] = header.view(np.uint8)
+        for start, array in sections:
+            data[start:start + array.nbytes] = array.reshape(-1).view(np.uint8)
+        start = int(header['metadata_start'][0])
+        data[start:size] = np.frombuffer(metadata, dtype=np.uint8)
+
+    @classmethod
+    def from_buffer(cls, buffer):
+        """
+        PolygonSet.from_buffer(buffer)
+
+        Creates a PolygonSet from a buffer written by write_buffer() (or
+        the contents of a file written by save())
+
+        The points, indexes and bounding boxes are views on the buffer -- they
+        are not copied, and they are read-only. The metadata are read.
+        """
+        data = np.frombuffer(buffer, dtype=np.uint8)
+        header = data[:_FILE_HEADER.itemsize].view(_FILE_HEADER)
+        arrays = []
+        for start, dtype, shape in cls._check_header(header, "buffer"):
+            dtype = np.dtype(dtype)
+            array = data[start:start + dtype.itemsize * int(np.prod(shape))]
+            array = array.view(dtype).reshape(shape)
+            array.flags.writeable = False
+            arrays.append(array)
+        header = header[0]
+        start = int(header['metadata_start'])
+        metadata = json.loads(data[start:start + int(header['metadata_length'])].tostring().decode('utf-8'))
+
+        points, indexes, boxes = arrays
+        ps = cls.from_flat(points, indexes, metadata, dtype=np.float64, copy=False)
+        ps._bbox_buffer = boxes
+        return ps
+
+    @classmethod
+    def open(cls, filename, mmap=True, mode='r'):
+        """
+        PolygonSet.open(filename, mmap=True, mode='r')
+
+        Opens a PolygonSet saved with PolygonSet.save()
+
+        :param mmap: If True, the points, indexes and bounding boxes are
+                     memory-mapped (with numpy.memmap), rather than read, so
+                     only the parts that are used get loaded -- and the
+                     operating system can share them between processes.
+
+        :param mode: the mode for numpy.memmap -- the default, 'r', is
+                     read-only, 'c' allows changes in memory only, and 'r+'
+                     writes changes back to the file.
+
+        The metadata are always read.
+        """
+        with open(filename, 'rb') as infile:
+            header = np.fromfile(infile, dtype=_FILE_HEADER, count=1)
+            sections = cls._check_header(header, filename)
+            header = header[0]
+            arrays = []
+            for start, dtype, shape in sections:
+                if mmap and np.prod(shape) > 0:
+                    arrays.append(np.memmap(filename, dtype=dtype, mode=mode,
+                                            offset=start, shape=shape))
+                else:
+                    infile.seek(start)
+                    arrays.append(np.fromfile(infile, dtype=dtype,
+                                              count=int(np.prod(shape))).reshape(shape))
+            infile.seek(int(header['metadata_start']))
+            metadata = json.loads(infile.read(int(header['metadata_length'])).decode('utf-8'))
+
+        points, indexes, boxes = arrays
+        ps = cls.from_flat(points, indexes, metadata, dtype=np.float64, copy=False)
+        ps._bbox_buffer = boxes
+        return ps
+
     def Copy(self):
         """
         returns a "deep copy" of the PolygonSet Object -- 
@@ -177,14 +826,17 @@ class PolygonSet:
         cp._PointsArray = self._PointsArray.copy()
         cp._IndexArray = self._IndexArray.copy()
         cp._MetaDataList = copy.deepcopy(self._MetaDataList)  
+        cp._set_columns(self.meta)
         
         return cp      
         
-    def TransformData(self, TransformFunction, args=(), kwargs={}):
+    def TransformData(self, TransformFunction, args=(), kwargs={},
+                      chunk_size=None, threads=None, out=None):
         ## fixme: if this was a ndarray subclass, it would "just work"
         """
 
-        TransformData(Transform Function, args=(), kwargs={})
+        TransformData(Transform Function, args=(), kwargs={},
+                      chunk_size=None, threads=None, out=None)
 
         Transforms the data for a polygon set. It applies the passed in
         Transform Function to all the points in the polygon set. The
@@ -196,8 +848,66 @@ class PolygonSet:
 
         NewPoints = TransformFunction(OldPoints, *args, **kwargs)
 
+        :param chunk_size: If given, the function is called on blocks of
+                           chunk_size points at a time, and the results are
+                           written back in place (or into out), so a full
+                           second copy of the points is never needed. The
+                           function must then return the same number of
+                           points it is passed.
+
+        :param threads: If given, the blocks are transformed by a pool of
+                        this many threads. That only helps if the function
+                        releases the GIL (as most numpy ufuncs do). Implies
+                        chunking -- if no chunk_size is given, the points are
+                        split evenly between the threads.
+
+        :param out: An NX2 array to write the results into, which then
+                    becomes the points of the set (for instance, a buffer
+                    in shared memory). Implies chunking.
+
+        The cached bounding boxes are cleared either way.
         """
-        self._PointsArray = TransformFunction(self._PointsArray, *args, **kwargs)
+        if chunk_size is None and threads is None and out is None:
+            self._PointsArray = TransformFunction(self._PointsArray, *args, **kwargs)
+            return
+
+        points = self._PointsArray
+        num_points = len(points)
+        if out is not None:
+            if out.shape != points.shape:
+                raise ValueError("out must be the same shape as the points: %s"%(points.shape,))
+            target = out
+        elif points.flags.writeable:
+            target = points
+        else: # a read-only memmap, for instance
+            target = np.empty_like(points)
+        if chunk_size is None:
+            chunk_size = -(-num_points // (threads or 1)) # ceiling division
+        chunk_size = max(int(chunk_size), 1)
+
+        def transform_block(start):
+            stop = min(start + chunk_size, num_points)
+            result = np.asarray(TransformFunction(points[start:stop], *args, **kwargs))
+            if result.shape != (stop - start, 2):
+                raise ValueError("TransformFunction must return the same number of points it is passed")
+            target[start:stop] = result
+
+        starts = range(0, num_points, chunk_size)
+        if threads is not None and threads > 1 and len(starts) > 1:
+            pool = ThreadPool(min(threads, len(starts)))
+            try:
+                pool.map(transform_block, starts)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            for start in starts:
+                transform_block(start)
+
+        if target is points:
+            self.clear_cache()
+        else:
+            self._PointsArray = target
     
     def __len__(self):
         return len(self._IndexArray) - 1 # there is an extra index at the end, so that IndexArray[i+1] works
@@ -205,17 +915,112 @@ class PolygonSet:
     def __getitem__(self,index):
         """
         returns a Polygon object
+
+        The Polygon is a view on the data in the PolygonSet -- it is not
+        copied, so changing the Polygon changes the PolygonSet. Use
+        ``Polygon.copy()`` if you need an independent copy.
+
+        Note: if polygons are appended to the set after this, the view may no
+        longer refer to the data in the set.
+
+        Indexing with a slice returns a new PolygonSet. If the step is 1, the
+        points and metadata columns are not copied: they are read-only views
+        on the data in this set. Appending to it is fine -- that makes a copy
+        -- but use ``take()`` or ``Copy()`` if you need to change the points
+        or columns in place. Changes made to the points through this set
+        show up in the slice: call ``clear_cache()`` on the slice too, if
+        it has already computed its bounding boxes.
+
+        Indexing with an array of indexes, or a boolean mask, returns a new
+        PolygonSet with a copy of the selected polygons -- see ``take()``
         """
-        if index > (len(self._IndexArray) - 1):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return self.take(np.arange(start, stop, step))
+            return self._slice(start, max(start, stop))
+        if np.ndim(index) > 0:
+            return self.take(index)
+        if index >= len(self):
             raise IndexError
         if  index < 0:
-             if index < - (len(self._IndexArray) -1 ):
+             if index < - len(self):
                  raise IndexError
-             index = len(self._IndexArray) -1 + index
-        poly = Polygon(self._PointsArray[self._IndexArray[index]:self._IndexArray[index+1]],
+             index = len(self) + index
+        return self._polygon(index)
+
+    def _slice(self, start, stop):
+        # the points and columns are read-only views, the offsets have to be
+        # new. The bounding boxes are not shared: the points can still be
+        # changed through this set, so the slice works out its own.
+        offsets = self._IndexArray[start:stop + 1]
+        points = self._PointsArray[offsets[0]:offsets[-1]]
+        points.flags.writeable = False
+        columns = {}
+        for name, column in self.meta.items():
+            columns[name] = column[start:stop]
+            columns[name].flags.writeable = False
+        return PolygonSet.from_flat(points,
+                                    offsets - offsets[0],
+                                    self._MetaDataList[start:stop],
+                                    dtype=self.dtype,
+                                    copy=False,
+                                    columns=columns)
+
+    def take(self, indices):
+        """
+        take(indices)
+
+        returns a new PolygonSet with a copy of the polygons selected by indices
+
+        :param indices: array of the indexes of the polygons to take (in any
+                        order, negative ones count from the end), or a boolean
+                        mask the same length as the set.
+
+        All the points are gathered in one go, so this is fast even for lots
+        of polygons. The metadata objects are not copied.
+        """
+        indices = np.asarray(indices)
+        if indices.dtype == np.bool_:
+            if indices.shape != (len(self),):
+                raise IndexError("a boolean mask must be the same length as the PolygonSet")
+            indices = np.nonzero(indices)[0]
+        indices = indices.reshape(-1).astype(np.intp)
+        if ( (indices >= len(self)) | (indices < -len(self)) ).any():
+            raise IndexError("polygon index out of range")
+        indices = np.where(indices < 0, indices + len(self), indices)
+
+        starts = self._IndexArray[:-1][indices]
+        counts = self._IndexArray[1:][indices] - starts
+        offsets = np.zeros((len(indices) + 1,), dtype=np.int)
+        np.cumsum(counts, out=offsets[1:])
+        # the index of each point in the original array
+        gather = np.arange(offsets[-1]) + np.repeat(starts - offsets[:-1], counts)
+        ps = PolygonSet.from_flat(self._PointsArray[gather],
+                                  offsets,
+                                  [self._MetaDataList[i] for i in indices],
+                                  dtype=self.dtype,
+                                  copy=False,
+                                  columns=dict((name, column[indices])
+                                               for name, column in self.meta.items()))
+        if self._bbox_buffer is not None:
+            ps._bbox_buffer = self._bbox_buffer[indices]
+        return ps
+
+    def _polygon(self, index):
+        # no checking of the index here
+        return Polygon(self._PointsArray[self._IndexArray[index]:self._IndexArray[index+1]],
                        metadata = self._MetaDataList[index],
+                       copy = False,
                        dtype = self.dtype)
-        return poly
+
+    def __iter__(self):
+        """
+        iterates through the polygons in the set -- each one is a view
+        on the data (see __getitem__)
+        """
+        for index in range(len(self)):
+            yield self._polygon(index)
 
 def test():
     #  a test function
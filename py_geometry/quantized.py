@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+
+"""
+quantized module, part of the geometry package
+
+Compact storage of a set of polygons: the vertices are kept as int32 offsets
+from an origin for the whole set, in units of a fixed scale:
+
+  vertex = origin + scale * stored value
+
+That is half the memory of float64 (the same as float32, but with the same
+precision everywhere in the set, rather than less the further you are from
+(0,0)). With the default scale, the extent of the set is spread over the
+whole int32 range: about 1.7e-7 degrees (under 2cm) for a global data set in
+lon-lat.
+
+The point in polygon and crossing kernels work on the int32 values directly,
+so the vertices are never decoded into a float64 array.
+"""
+
+import numpy as np
+
+from . import bbox
+from .polygons import Polygon, PolygonSet
+from .cy_point_in_polygon import points_in_rings, points_in_geometries
+
+_INT32_MIN = np.iinfo(np.int32).min
+_INT32_MAX = np.iinfo(np.int32).max
+
+
+def quantize(points, origin, scale):
+    """
+    quantize(points, origin, scale)
+
+    returns the points as int32 offsets from origin, in units of scale --
+    rounded to the nearest unit.
+
+    :param points: NX2 array of points
+    :param origin: (x, y) of the origin
+    :param scale: the size of one unit
+
+    Raises a ValueError if any of the points are too far from the origin
+    to fit in an int32.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    values = np.rint((points - np.asarray(origin, dtype=np.float64)) / scale)
+    if len(values) and (values.min() < _INT32_MIN or values.max() > _INT32_MAX):
+        raise ValueError("points are too far from the origin to quantize with a scale of %r" % scale)
+    return values.astype(np.int32)
+
+
+def dequantize(values, origin, scale):
+    """
+    dequantize(values, origin, scale)
+
+    returns the float64 points for int32 quantized values -- the reverse
+    of quantize()
+    """
+    return np.asarray(origin, dtype=np.float64) + scale * np.asarray(values, dtype=np.float64)
+
+
+class QuantizedPolygonSet(object):
+    """
+    A set of polygons, with the vertices stored as quantized int32 values --
+    see the module docs.
+
+    It is built from a PolygonSet, and has the same layout: all the points
+    in one array, with polygon i being _PointsArray[_IndexArray[i]:_IndexArray[i+1]].
+    Indexing it returns decoded (float64) Polygons.
+    """
+    def __init__(self, points, offsets, origin, scale, metadata=None):
+        """
+        QuantizedPolygonSet(points, offsets, origin, scale, metadata=None)
+
+        :param points: NX2 array of the int32 quantized points of all the polygons
+        :param offsets: (M+1) array of integer offsets into points -- the first
+                        must be 0 and the last len(points)
+        :param origin: (x, y) of the origin of the quantized values
+        :param scale: the size of one unit of the quantized values
+        :param metadata: optional sequence of M metadata objects (None for each
+                         polygon if not given)
+        """
+        points = np.ascontiguousarray(points, dtype=np.int32).reshape(-1, 2)
+        offsets = np.array(offsets, dtype=np.int64).reshape(-1)
+        if ( len(offsets) == 0 or offsets[0] != 0 or
+             offsets[-1] != len(points) or (np.diff(offsets) < 0).any() ):
+            raise ValueError("offsets must start at 0, end at the number of points, and never decrease")
+        if not scale > 0:
+            raise ValueError("scale must be positive")
+        num_polygons = len(offsets) - 1
+        if metadata is None:
+            metadata = [None] * num_polygons
+        else:
+            metadata = list(metadata)
+            if len(metadata) != num_polygons:
+                raise ValueError("there must be one metadata object for each polygon")
+        self._PointsArray = points
+        self._IndexArray = offsets
+        self._MetaDataList = metadata
+        self.origin = tuple(float(c) for c in origin)
+        self.scale = float(scale)
+
+    @classmethod
+    def from_polygon_set(cls, polygon_set, scale=None, origin=None):
+        """
+        QuantizedPolygonSet.from_polygon_set(polygon_set, scale=None, origin=None)
+
+        Create a QuantizedPolygonSet from a PolygonSet.
+
+        :param scale: the size of one unit of the quantized values. If not
+                      given, the set is spread over the whole int32 range.
+        :param origin: (x, y) of the origin. If not given, the center of the
+                       bounding box of the set is used.
+
+        Raises a ValueError if the scale is too small to fit the set in int32.
+        """
+        points = polygon_set._PointsArray
+        if origin is None or scale is None:
+            if len(points):
+                lower = points.min(axis=0).astype(np.float64)
+                upper = points.max(axis=0).astype(np.float64)
+            else:
+                lower = upper = np.zeros((2,), np.float64)
+            if origin is None:
+                origin = (lower + upper) / 2.0
+            if scale is None:
+                # the largest distance from the origin should fit, with a
+                # unit to spare for the rounding
+                extent = np.maximum(upper - origin, origin - lower).max()
+                scale = extent / (_INT32_MAX - 1) if extent > 0 else 1.0
+        return cls(quantize(points, origin, scale),
+                   polygon_set._IndexArray,
+                   origin,
+                   scale,
+                   polygon_set.GetMetaData())
+
+    def to_polygon_set(self):
+        """
+        returns a (float64) PolygonSet with the decoded points
+        """
+        return PolygonSet.from_flat(dequantize(self._PointsArray, self.origin, self.scale),
+                                    self._IndexArray,
+                                    self.GetMetaData(),
+                                    copy=False)
+
+    def _get_nbytes(self):
+        return self._PointsArray.nbytes + self._IndexArray.nbytes
+    nbytes = property(_get_nbytes,
+                      doc="the memory used by the points and indexes, in bytes")
+
+    def __len__(self):
+        return len(self._IndexArray) - 1
+
+    def __getitem__(self, index):
+        """
+        returns a polygon from the set, as a Polygon of decoded (float64)
+        points -- a copy, not a view on the set.
+        """
+        if index >= len(self):
+            raise IndexError
+        if index < 0:
+            if index < - len(self):
+                raise IndexError
+            index = len(self) + index
+        points = self._PointsArray[self._IndexArray[index]:self._IndexArray[index + 1]]
+        return Polygon(dequantize(points, self.origin, self.scale),
+                       metadata=self._MetaDataList[index],
+                       copy=False)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def GetMetaData(self):
+        """
+        returns a (shallow) copy of the metadata list
+        """
+        return list(self._MetaDataList)
+
+    def _get_bounding_boxes(self):
+        # computed on the int32 values, and only the boxes decoded
+        boxes = np.empty((len(self), 2, 2), np.float64)
+        boxes.fill(np.nan) # empty polygons get null boxes
+        non_empty = np.diff(self._IndexArray) > 0
+        if non_empty.any():
+            starts = self._IndexArray[:-1][non_empty]
+            boxes[non_empty, 0, :] = np.minimum.reduceat(self._PointsArray, starts, axis=0)
+            boxes[non_empty, 1, :] = np.maximum.reduceat(self._PointsArray, starts, axis=0)
+        return bbox.asBBoxArray(dequantize(boxes, self.origin, self.scale))
+    bounding_boxes = property(_get_bounding_boxes,
+                              doc="The bounding box of each polygon, as a BBoxArray")
+
+    def _get_bounding_box(self):
+        return self.bounding_boxes.bounding_box
+    bounding_box = property(_get_bounding_box)
+
+    def points_inside(self, index, points):
+        """
+        points_inside(index, points)
+
+        computes whether the points are inside polygon number index
+
+        :param points: NX2 or NX3 array of the points to test
+
+        :returns: a boolean array the same length as points
+        """
+        if not -len(self) <= index < len(self):
+            raise IndexError
+        index = index % len(self)
+        start, end = self._IndexArray[index], self._IndexArray[index + 1]
+        return points_in_rings(self._PointsArray[start:end],
+                               (0, end - start),
+                               points,
+                               origin=self.origin,
+                               scale=self.scale)
+
+    def points_in_polygons(self, points, polygon_ids):
+        """
+        points_in_polygons(points, polygon_ids)
+
+        computes whether each point is inside a polygon -- point i is tested
+        against polygon polygon_ids[i] -- all in one compiled pass.
+
+        :param points: NX2 or NX3 array of the points to test
+        :param polygon_ids: array of N polygon indexes
+
+        :returns: a boolean array the same length as points
+        """
+        # each polygon is a geometry of one ring
+        return points_in_geometries(self._PointsArray,
+                                    self._IndexArray,
+                                    np.arange(len(self) + 1),
+                                    polygon_ids,
+                                    points,
+                                    origin=self.origin,
+                                    scale=self.scale)
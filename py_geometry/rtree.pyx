@@ -0,0 +1,269 @@
+"""
+A packed (static) R-tree spatial index of bounding boxes
+
+The tree is bulk-loaded with the Sort-Tile-Recursive (STR) algorithm:
+
+Leutenegger, Lopez and Edgington, "STR: A Simple and Efficient Algorithm
+for R-Tree Packing", 1997
+
+The bounding boxes are passed in as a (Nx2x2) array, in the same layout as
+used by ``bbox.from_BB_array``, and the queries return indexes into that array.
+
+The tree can not be changed once built -- build a new one if the boxes change.
+"""
+
+import cython
+import numpy as np
+cimport numpy as cnp
+
+from . import bbox
+
+
+def _str_order(boxes, node_capacity):
+    """
+    returns the order in which the boxes should be packed into nodes
+
+    The boxes are sorted by the x coordinate of their centers, cut into
+    vertical slices of about sqrt(N / node_capacity) nodes each, and each
+    slice is sorted by the y coordinate of the centers.
+    """
+    n = len(boxes)
+    centers = (boxes[:,0,:] + boxes[:,1,:]) / 2.0
+    num_nodes = -(-n // node_capacity) # ceiling division
+    num_slices = int(np.ceil(np.sqrt(num_nodes)))
+    slice_size = num_slices * node_capacity
+
+    slice_id = np.empty((n,), dtype=np.intp)
+    slice_id[np.argsort(centers[:,0], kind='mergesort')] = np.arange(n) // slice_size
+    # lexsort sorts by the last key first
+    return np.lexsort( (centers[:,1], slice_id) )
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef Py_ssize_t _search(double[:, :, ::1] boxes,
+                        cnp.int64_t[::1] children,
+                        cnp.int64_t[::1] counts,
+                        Py_ssize_t num_entries,
+                        Py_ssize_t root,
+                        double xmin, double ymin, double xmax, double ymax,
+                        cnp.int64_t[::1] stack,
+                        cnp.int64_t[::1] out,
+                        Py_ssize_t n) nogil:
+    """
+    finds all the entries that overlap the box (xmin, ymin, xmax, ymax)
+
+    The indexes are written into out, starting at out[n]
+
+    returns the new number of results, or -1 if out is not big enough.
+
+    A box with a NaN in it (a null BBox) doesn't overlap anything.
+    """
+    cdef Py_ssize_t top, node, child, end
+
+    if root < 0:
+        return n
+    if xmin != xmin or ymin != ymin or xmax != xmax or ymax != ymax:
+        return n # NaN
+    stack[0] = root
+    top = 1
+    while top > 0:
+        top -= 1
+        node = stack[top]
+        if ( boxes[node, 1, 0] < xmin or boxes[node, 0, 0] > xmax or
+             boxes[node, 1, 1] < ymin or boxes[node, 0, 1] > ymax ):
+            continue
+        if node < num_entries: # a leaf entry
+            if n == out.shape[0]:
+                return -1
+            out[n] = children[node]
+            n += 1
+        else:
+            end = children[node] + counts[node]
+            for child in range(children[node], end):
+                stack[top] = child
+                top += 1
+    return n
+
+
+cdef class PackedRTree:
+    """
+    A static R-tree of bounding boxes, bulk loaded with the STR algorithm.
+
+    Null (NaN) boxes are never found by a query. Infinite boxes overlap
+    everything.
+
+    All the queries return the indexes of the matching boxes, in order.
+    """
+    cdef readonly Py_ssize_t num_items
+    cdef readonly Py_ssize_t node_capacity
+    cdef readonly Py_ssize_t num_levels
+    cdef double[:, :, ::1] _boxes
+    cdef cnp.int64_t[::1] _children
+    cdef cnp.int64_t[::1] _counts
+    cdef Py_ssize_t _num_entries
+    cdef Py_ssize_t _root
+
+    def __init__(self, bboxes, node_capacity=16):
+        """
+        PackedRTree(bboxes, node_capacity=16)
+
+        :param bboxes: the bounding boxes to index
+        :type bboxes: Nx2x2 array of float64s (or something that can be turned into one)
+
+        :param node_capacity: maximum number of children of each node of the tree
+        :type node_capacity: integer >= 2
+        """
+        if node_capacity < 2:
+            raise ValueError("node_capacity must be at least 2")
+        bboxes = np.asarray(bboxes, dtype=np.float64).reshape(-1, 2, 2)
+        self.num_items = bboxes.shape[0]
+        self.node_capacity = node_capacity
+
+        # null boxes can't be found, so they aren't put in the tree at all
+        ids = np.nonzero( ~np.isnan(bboxes).reshape(-1, 4).any(1) )[0]
+        boxes = bboxes[ids]
+        order = _str_order(boxes, node_capacity)
+
+        # the tree is stored bottom up: level 0 are the boxes themselves,
+        # "children" is the index of the box for level 0, and the index of
+        # the first child for the nodes above.
+        all_boxes = [boxes[order]]
+        all_children = [ids[order].astype(np.int64)]
+        all_counts = [np.zeros((len(ids),), dtype=np.int64)]
+        level = all_boxes[0]
+        offset = 0
+        while len(level) > 1:
+            starts = np.arange(0, len(level), node_capacity)
+            counts = np.diff(np.r_[starts, len(level)])
+            parents = np.empty((len(starts), 2, 2), dtype=np.float64)
+            parents[:,0,:] = np.minimum.reduceat(level[:,0,:], starts, axis=0)
+            parents[:,1,:] = np.maximum.reduceat(level[:,1,:], starts, axis=0)
+            starts += offset
+            if len(parents) > 1:
+                order = _str_order(parents, node_capacity)
+                parents = parents[order]
+                starts = starts[order]
+                counts = counts[order]
+            offset += len(level)
+            all_boxes.append(parents)
+            all_children.append(starts.astype(np.int64))
+            all_counts.append(counts.astype(np.int64))
+            level = parents
+
+        self.num_levels = len(all_boxes)
+        self._num_entries = len(ids)
+        self._boxes = np.ascontiguousarray(np.concatenate(all_boxes))
+        self._children = np.concatenate(all_children)
+        self._counts = np.concatenate(all_counts)
+        self._root = self._boxes.shape[0] - 1
+
+    def __len__(self):
+        return self.num_items
+
+    property bounding_box:
+        """
+        The BBox of all the (non-null) boxes in the tree
+        """
+        def __get__(self):
+            if self._root < 0:
+                return bbox.null_BBox()
+            return bbox.BBox(np.asarray(self._boxes[self._root]))
+
+    def _new_stack(self):
+        # at most node_capacity nodes are pushed for each level
+        return np.empty((self.num_levels * self.node_capacity + 1,), dtype=np.int64)
+
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    def _query(self, const double[:, ::1] windows):
+        """
+        the guts of the queries: windows is a Nx4 array of
+        (xmin, ymin, xmax, ymax) to search for.
+        """
+        cdef Py_ssize_t i, n, m, num_windows
+        cdef cnp.int64_t[::1] stack = self._new_stack()
+        cdef cnp.ndarray[cnp.int64_t, ndim=1, mode="c"] offsets
+        cdef cnp.int64_t[::1] out
+
+        num_windows = windows.shape[0]
+        offsets = np.zeros((num_windows + 1,), dtype=np.int64)
+        result = np.empty((max(num_windows, 16),), dtype=np.int64)
+        out = result
+        n = 0
+        for i in range(num_windows):
+            while True:
+                with nogil:
+                    m = _search(self._boxes, self._children, self._counts,
+                                self._num_entries, self._root,
+                                windows[i, 0], windows[i, 1],
+                                windows[i, 2], windows[i, 3],
+                                stack, out, n)
+                if m >= 0:
+                    break
+                # out of room: make it bigger and try again
+                result = np.resize(result, (2 * result.shape[0],))
+                out = result
+            n = m
+            offsets[i + 1] = n
+        indexes = result[:n]
+        # put the results for each query in order
+        query_ids = np.repeat(np.arange(num_windows), np.diff(offsets))
+        indexes = indexes[np.lexsort( (indexes, query_ids) )]
+        return offsets, indexes
+
+    def query(self, BB):
+        """
+        query(BB)
+
+        :param BB: the bounding box to search for
+        :type BB: BBox object (or 2x2 ndarray)
+
+        :returns: array of the indexes of the boxes that overlap BB
+                  (touching counts as overlapping) -- empty for a null BBox
+        """
+        return self.query_boxes(BB)[1]
+
+    def query_point(self, point):
+        """
+        query_point(point)
+
+        :param point: any length-2 sequence (tuple, list, array)
+
+        :returns: array of the indexes of the boxes that contain the point
+                  (on the border counts as inside) -- empty if it has a NaN
+        """
+        return self.query_points( (point,) )[1]
+
+    def query_boxes(self, boxes):
+        """
+        query_boxes(boxes)
+
+        Finds the boxes in the tree that overlap each of the boxes passed in
+
+        :param boxes: the boxes to search for
+        :type boxes: Nx2x2 array of float64s (or something that can be turned into one)
+
+        :returns: (offsets, indexes) -- the indexes of the boxes that overlap
+                  boxes[i] are indexes[offsets[i]:offsets[i+1]]. Boxes with a
+                  NaN in them (null BBoxes) don't overlap anything.
+        """
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        return self._query(np.ascontiguousarray(boxes))
+
+    def query_points(self, points):
+        """
+        query_points(points)
+
+        Finds the boxes in the tree that contain each of the points passed in
+
+        :param points: the points to search for
+        :type points: Nx2 or Nx3 array of float64s -- the third coordinate is ignored
+
+        :returns: (offsets, indexes) -- the indexes of the boxes that contain
+                  points[i] are indexes[offsets[i]:offsets[i+1]]. Points with
+                  a NaN coordinate aren't in any of them.
+        """
+        points = np.asarray(points, dtype=np.float64)
+        points = points.reshape(-1, points.shape[-1])[:, :2]
+        return self._query(np.ascontiguousarray(np.c_[points, points]))
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+
+"""
+PolygonSets in shared memory, for use by more than one process
+
+The set is written into a named block of shared memory, in the same format
+as ``PolygonSet.save()``. Other processes can attach to the block by name,
+and get a PolygonSet whose points, indexes and bounding boxes are (read-only)
+views on the shared memory -- nothing is copied, or pickled.
+
+A SharedPolygonSet can be pickled -- only the name is, so it is cheap to
+pass to the workers in a ``multiprocessing.Pool``, and they attach to the
+same block when it is unpickled.
+
+``multiprocessing.shared_memory`` is used if it is there (Python 3.8+).
+Otherwise, the block is a file in /dev/shm (a memory filesystem on Linux),
+which is memory mapped.
+"""
+
+import mmap
+import os
+import uuid
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    shared_memory = None
+
+from .polygons import PolygonSet
+
+_SHM_DIR = "/dev/shm"
+
+
+class _MappedFile(object):
+    """
+    The parts of multiprocessing.shared_memory.SharedMemory that are used
+    here, for when it is not available: a memory-mapped file in /dev/shm
+    """
+    def __init__(self, name, create=False, size=0):
+        self.name = name
+        self._path = os.path.join(_SHM_DIR, name)
+        if create:
+            fd = os.open(self._path, os.O_CREAT | os.O_EXCL | os.O_RDWR, 0o600)
+        else:
+            fd = os.open(self._path, os.O_RDWR)
+        try:
+            if create:
+                os.ftruncate(fd, size)
+            self.buf = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        self.size = len(self.buf)
+
+    def close(self):
+        self.buf.close()
+
+    def unlink(self):
+        os.unlink(self._path)
+
+
+def _shared_block(name, create=False, size=0):
+    if shared_memory is not None:
+        return shared_memory.SharedMemory(name=name, create=create, size=size)
+    return _MappedFile(name, create, size)
+
+
+class SharedPolygonSet(object):
+    """
+    A PolygonSet in a block of shared memory.
+
+    Create it from a PolygonSet in one process::
+
+        shared = SharedPolygonSet(polygon_set)
+
+    and attach to it in others, with the name or by passing (pickling) the
+    SharedPolygonSet itself::
+
+        shared = SharedPolygonSet.attach(name)
+        polygon_set = shared.polygon_set
+
+    The process that created it should unlink() it when all the processes
+    are done with it -- a ``with`` block does that for you.
+    """
+    def __init__(self, polygon_set, name=None):
+        """
+        SharedPolygonSet(polygon_set, name=None)
+
+        :param polygon_set: the set to put in shared memory (it is copied)
+        :type polygon_set: PolygonSet
+
+        :param name: the name of the shared memory block. A unique one is
+                     made up if not given.
+        """
+        if name is None:
+            name = "py_geometry_%s" % uuid.uuid4().hex
+        self._block = _shared_block(name, create=True, size=max(polygon_set.file_size(), 1))
+        self.owner = True
+        polygon_set.write_buffer(self._block.buf)
+        self._polygon_set = None
+
+    @classmethod
+    def attach(cls, name):
+        """
+        SharedPolygonSet.attach(name)
+
+        Attaches to a SharedPolygonSet that was created by another process
+        """
+        self = cls.__new__(cls)
+        self._block = _shared_block(name)
+        self.owner = False
+        self._polygon_set = None
+        return self
+
+    def _get_name(self):
+        return self._block.name
+    name = property(_get_name)
+
+    def _get_polygon_set(self):
+        if self._polygon_set is None:
+            self._polygon_set = PolygonSet.from_buffer(self._block.buf)
+        return self._polygon_set
+    polygon_set = property(_get_polygon_set,
+                           doc="The PolygonSet, as read-only views on the shared memory")
+
+    def close(self):
+        """
+        Closes this process' access to the shared memory -- the polygon_set
+        can not be used after this.
+        """
+        self._polygon_set = None
+        self._block.close()
+
+    def unlink(self):
+        """
+        Frees the shared memory block, once all the processes have closed it.
+        Only call this once, usually from the process that created it.
+        """
+        self._block.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+        if self.owner:
+            self.unlink()
+
+    def __getstate__(self):
+        # only the name is pickled
+        return {'name': self.name}
+
+    def __setstate__(self, state):
+        self._block = _shared_block(state['name'])
+        self.owner = False
+        self._polygon_set = None
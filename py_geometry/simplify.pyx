@@ -0,0 +1,461 @@
+"""
+Simplification of the polygons in a PolygonSet
+
+Two algorithms are available:
+
+``"douglas-peucker"``: Douglas and Peucker, "Algorithms for the reduction of
+the number of points required to represent a digitized line or its
+caricature", 1973. Points are removed if they are within tolerance of the
+simplified line.
+
+``"visvalingam"``: Visvalingam and Whyatt, "Line generalisation by repeated
+elimination of points", 1993. The point that makes the smallest triangle with
+its neighbors is removed, over and over, until all the triangles are at
+least tolerance**2 in area.
+
+Each polygon is treated as a closed ring. The first and last points are
+always kept, and a polygon is never reduced to fewer than three distinct
+points -- though a very small one may end up with no area.
+
+All the work on the points is done without the GIL, so the polygons can be
+simplified by more than one thread at once.
+"""
+
+import cython
+import numpy as np
+cimport numpy as cnp
+from multiprocessing.pool import ThreadPool
+
+from py_geometry.line_crossings cimport _ring_intersections
+
+from .polygons import PolygonSet
+
+METHODS = {"douglas-peucker": 0,
+           "visvalingam": 1,
+           }
+
+# how many times the tolerance is halved when preserving topology, before
+# giving up and keeping the whole ring
+DEF MAX_RETRIES = 8
+
+
+cdef inline double _dist2_to_segment(double px, double py,
+                                     double ax, double ay,
+                                     double bx, double by) nogil:
+    """
+    the square of the distance from point p to the segment a-b
+    """
+    cdef double dx, dy, t, length2
+    dx = bx - ax
+    dy = by - ay
+    length2 = dx * dx + dy * dy
+    if length2 > 0.0:
+        t = ((px - ax) * dx + (py - ay) * dy) / length2
+        if t < 0.0:
+            t = 0.0
+        elif t > 1.0:
+            t = 1.0
+        ax = ax + t * dx
+        ay = ay + t * dy
+    return (px - ax) * (px - ax) + (py - ay) * (py - ay)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef inline double _triangle_area(const double[:, ::1] pts,
+                                  Py_ssize_t i, Py_ssize_t j, Py_ssize_t k) nogil:
+    cdef double area
+    area = ( (pts[j, 0] - pts[i, 0]) * (pts[k, 1] - pts[i, 1]) -
+             (pts[k, 0] - pts[i, 0]) * (pts[j, 1] - pts[i, 1]) ) / 2.0
+    return area if area >= 0.0 else -area
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef Py_ssize_t _min_points(const double[:, ::1] pts, Py_ssize_t start, Py_ssize_t stop) nogil:
+    # three distinct points -- four if the first is repeated at the end
+    if pts[start, 0] == pts[stop - 1, 0] and pts[start, 1] == pts[stop - 1, 1]:
+        return 4
+    return 3
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void _dp_chain(const double[:, ::1] pts, Py_ssize_t first, Py_ssize_t last,
+                    double tol2, cnp.uint8_t[::1] keep, cnp.int64_t[::1] stack) nogil:
+    """
+    Douglas-Peucker on the chain of points first to last (inclusive) -- the
+    end points are already marked to keep.
+    """
+    cdef Py_ssize_t top, i, j, k, far
+    cdef double d2, max_d2
+
+    stack[0] = first
+    stack[1] = last
+    top = 2
+    while top > 0:
+        top -= 2
+        i = stack[top]
+        j = stack[top + 1]
+        max_d2 = -1.0
+        far = -1
+        for k in range(i + 1, j):
+            d2 = _dist2_to_segment(pts[k, 0], pts[k, 1],
+                                   pts[i, 0], pts[i, 1],
+                                   pts[j, 0], pts[j, 1])
+            if d2 > max_d2:
+                max_d2 = d2
+                far = k
+        if far >= 0 and max_d2 > tol2:
+            keep[far] = 1
+            stack[top] = i
+            stack[top + 1] = far
+            stack[top + 2] = far
+            stack[top + 3] = j
+            top += 4
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void _douglas_peucker(const double[:, ::1] pts, Py_ssize_t start, Py_ssize_t stop,
+                           double tolerance, cnp.uint8_t[::1] keep,
+                           cnp.int64_t[::1] stack) nogil:
+    """
+    simplifies the ring pts[start:stop], setting keep for the points to keep
+
+    The ring is split at the point farthest from the first, and each half
+    simplified on its own.
+    """
+    cdef Py_ssize_t i, k, far, count
+    cdef double d2, max_d2
+
+    for i in range(start, stop):
+        keep[i] = 0
+    keep[start] = 1
+    keep[stop - 1] = 1
+    far = start
+    max_d2 = 0.0
+    for i in range(start + 1, stop - 1):
+        d2 = ( (pts[i, 0] - pts[start, 0]) * (pts[i, 0] - pts[start, 0]) +
+               (pts[i, 1] - pts[start, 1]) * (pts[i, 1] - pts[start, 1]) )
+        if d2 > max_d2:
+            max_d2 = d2
+            far = i
+    if far == start: # all the points are the same as the first
+        return
+    keep[far] = 1
+    _dp_chain(pts, start, far, tolerance * tolerance, keep, stack)
+    _dp_chain(pts, far, stop - 1, tolerance * tolerance, keep, stack)
+
+    count = 0
+    for i in range(start, stop):
+        count += keep[i]
+    if count < _min_points(pts, start, stop):
+        # collapsed -- keep the point farthest from the first to far line as well
+        max_d2 = -1.0
+        k = -1
+        for i in range(start + 1, stop - 1):
+            d2 = _dist2_to_segment(pts[i, 0], pts[i, 1],
+                                   pts[start, 0], pts[start, 1],
+                                   pts[far, 0], pts[far, 1])
+            if not keep[i] and d2 > max_d2:
+                max_d2 = d2
+                k = i
+        if k >= 0:
+            keep[k] = 1
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void _sift_down(cnp.int64_t[::1] heap, cnp.int64_t[::1] pos, double[::1] area,
+                     Py_ssize_t i, Py_ssize_t size) nogil:
+    cdef Py_ssize_t child, item
+    item = heap[i]
+    while True:
+        child = 2 * i + 1
+        if child >= size:
+            break
+        if child + 1 < size and area[heap[child + 1]] < area[heap[child]]:
+            child += 1
+        if area[heap[child]] >= area[item]:
+            break
+        heap[i] = heap[child]
+        pos[heap[i]] = i
+        i = child
+    heap[i] = item
+    pos[item] = i
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void _sift_up(cnp.int64_t[::1] heap, cnp.int64_t[::1] pos, double[::1] area,
+                   Py_ssize_t i) nogil:
+    cdef Py_ssize_t parent, item
+    item = heap[i]
+    while i > 0:
+        parent = (i - 1) // 2
+        if area[heap[parent]] <= area[item]:
+            break
+        heap[i] = heap[parent]
+        pos[heap[i]] = i
+        i = parent
+    heap[i] = item
+    pos[item] = i
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void _visvalingam(const double[:, ::1] pts, Py_ssize_t start, Py_ssize_t stop,
+                       double tolerance, cnp.uint8_t[::1] keep,
+                       cnp.int64_t[::1] prev, cnp.int64_t[::1] nxt,
+                       cnp.int64_t[::1] heap, cnp.int64_t[::1] pos,
+                       double[::1] area) nogil:
+    """
+    simplifies the ring pts[start:stop], setting keep for the points to keep
+
+    The scratch arrays are indexed by the position of the point in the ring.
+    """
+    cdef Py_ssize_t n, i, j, side, size, remaining, min_remaining
+    cdef double removed_area, min_area
+
+    n = stop - start
+    for i in range(start, stop):
+        keep[i] = 1
+    min_area = tolerance * tolerance
+    min_remaining = _min_points(pts, start, stop)
+    if n <= min_remaining:
+        return
+
+    size = 0
+    for i in range(1, n - 1):
+        prev[i] = i - 1
+        nxt[i] = i + 1
+        area[i] = _triangle_area(pts, start + i - 1, start + i, start + i + 1)
+        heap[size] = i
+        pos[i] = size
+        size += 1
+    for i in range(size // 2 - 1, -1, -1):
+        _sift_down(heap, pos, area, i, size)
+
+    remaining = n
+    while size > 0 and remaining > min_remaining:
+        i = heap[0]
+        removed_area = area[i]
+        if removed_area >= min_area:
+            break
+        size -= 1
+        if size > 0:
+            heap[0] = heap[size]
+            pos[heap[0]] = 0
+            _sift_down(heap, pos, area, 0, size)
+        keep[start + i] = 0
+        remaining -= 1
+        nxt[prev[i]] = nxt[i]
+        prev[nxt[i]] = prev[i]
+        # the neighbors get new triangles -- never smaller than the one
+        # just removed, so the points are removed in order
+        for side in range(2):
+            j = prev[i] if side == 0 else nxt[i]
+            if j == 0 or j == n - 1:
+                continue
+            area[j] = _triangle_area(pts, start + prev[j], start + j, start + nxt[j])
+            if area[j] < removed_area:
+                area[j] = removed_area
+            _sift_down(heap, pos, area, pos[j], size)
+            _sift_up(heap, pos, area, pos[j])
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef bint _self_intersects(const double[:, ::1] pts, Py_ssize_t start, Py_ssize_t stop,
+                           cnp.uint8_t[::1] keep, cnp.int64_t[::1] ring,
+                           cnp.int64_t[::1] edge, double[::1] lo,
+                           cnp.int64_t[::1] order, list found) nogil:
+    """
+    checks whether the ring of the kept points of pts[start:stop] intersects
+    itself, with line_crossings._ring_intersections -- the same check as
+    validation.self_intersections, so a repeated first point (a zero-length
+    closing edge) doesn't count.
+
+    ring, edge, lo and order are scratch space, at least stop - start long.
+    """
+    cdef Py_ssize_t m, i
+
+    m = 0
+    for i in range(start, stop):
+        if keep[i]:
+            ring[m] = i
+            m += 1
+    if m < 4:
+        return False
+    return _ring_intersections(pts, ring, m, edge, lo, order, True, found, 0, 0)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def _simplify_block(const double[:, ::1] points,
+                    const cnp.int64_t[::1] offsets,
+                    Py_ssize_t first,
+                    Py_ssize_t last,
+                    double tolerance,
+                    int method,
+                    bint preserve_topology,
+                    cnp.uint8_t[::1] keep):
+    """
+    simplifies polygons first to last (exclusive), setting keep for the
+    points to keep
+    """
+    cdef Py_ssize_t p, i, start, stop, n, retry
+    cdef double tol
+    cdef bint original_checked, original_crosses
+
+    n = 1
+    for p in range(first, last):
+        if offsets[p + 1] - offsets[p] > n:
+            n = offsets[p + 1] - offsets[p]
+    # scratch space, big enough for the biggest ring
+    cdef cnp.int64_t[::1] stack = np.empty((2 * n + 4,), dtype=np.int64)
+    cdef cnp.int64_t[::1] prev = np.empty((n,), dtype=np.int64)
+    cdef cnp.int64_t[::1] nxt = np.empty((n,), dtype=np.int64)
+    cdef cnp.int64_t[::1] heap = np.empty((n,), dtype=np.int64)
+    cdef cnp.int64_t[::1] pos = np.empty((n,), dtype=np.int64)
+    cdef double[::1] area = np.empty((n,), dtype=np.float64)
+    cdef double[::1] lo = np.empty((n,), dtype=np.float64)
+    cdef list found = []
+
+    with nogil:
+        for p in range(first, last):
+            start = offsets[p]
+            stop = offsets[p + 1]
+            if stop - start <= 3:
+                continue # keep everything
+            tol = tolerance
+            original_checked = False
+            for retry in range(MAX_RETRIES + 1):
+                if retry == MAX_RETRIES:
+                    for i in range(start, stop):
+                        keep[i] = 1
+                    break
+                if method == 0:
+                    _douglas_peucker(points, start, stop, tol, keep, stack)
+                else:
+                    _visvalingam(points, start, stop, tol, keep, prev, nxt, heap, pos, area)
+                if not preserve_topology:
+                    break
+                if not _self_intersects(points, start, stop, keep, stack, nxt, lo, prev, found):
+                    break
+                if not original_checked:
+                    # if the original crosses itself, there is no point trying
+                    for i in range(start, stop):
+                        heap[i - start] = keep[i]
+                        keep[i] = 1
+                    original_crosses = _self_intersects(points, start, stop, keep, stack, nxt, lo, prev, found)
+                    original_checked = True
+                    for i in range(start, stop):
+                        keep[i] = heap[i - start]
+                    if original_crosses:
+                        break
+                tol = tol / 2.0
+
+
+def simplify_points(points, tolerance, method="douglas-peucker", preserve_topology=False):
+    """
+    simplify_points(points, tolerance, method="douglas-peucker", preserve_topology=False)
+
+    Simplifies a single ring of points
+
+    :param points: the points of the ring
+    :type points: NX2 array of floats
+
+    :returns: the simplified points, as a new NX2 array of float64
+
+    See ``simplify`` for the other parameters
+    """
+    points = np.ascontiguousarray(points, dtype=np.float64).reshape(-1, 2)
+    keep = _simplify_flat(points, np.array( (0, len(points)), dtype=np.int64),
+                          tolerance, method, preserve_topology, None)
+    return points[keep]
+
+
+def _simplify_flat(points, offsets, tolerance, method, preserve_topology, threads):
+    """
+    returns a boolean array of the points to keep
+    """
+    try:
+        method = METHODS[method]
+    except KeyError:
+        raise ValueError("method must be one of: %s" % ", ".join(sorted(METHODS)))
+    if tolerance < 0:
+        raise ValueError("tolerance can not be negative")
+    num_polygons = len(offsets) - 1
+    keep = np.ones((len(points),), dtype=np.uint8)
+
+    if threads is None or threads < 2 or num_polygons < 2:
+        _simplify_block(points, offsets, 0, num_polygons,
+                        tolerance, method, preserve_topology, keep)
+    else:
+        # blocks with about the same number of points in each
+        num_blocks = min(threads * 4, num_polygons)
+        bounds = np.searchsorted(offsets, np.linspace(0, len(points), num_blocks + 1))
+        bounds[0] = 0
+        bounds[-1] = num_polygons
+        bounds = np.unique(bounds)
+
+        def run_block(i):
+            _simplify_block(points, offsets, bounds[i], bounds[i + 1],
+                            tolerance, method, preserve_topology, keep)
+
+        pool = ThreadPool(threads)
+        try:
+            pool.map(run_block, range(len(bounds) - 1))
+        finally:
+            pool.close()
+            pool.join()
+    return keep.view(np.bool_)
+
+
+def simplify(polygon_set, tolerance, method="douglas-peucker",
+             preserve_topology=False, threads=None):
+    """
+    simplify(polygon_set, tolerance, method="douglas-peucker",
+             preserve_topology=False, threads=None)
+
+    Simplifies all the polygons in a PolygonSet
+
+    :param polygon_set: the polygons to simplify
+    :type polygon_set: PolygonSet
+
+    :param tolerance: how far (in coordinate units) the simplified polygons
+                      may be from the originals. For "visvalingam", points
+                      making triangles of less than tolerance**2 in area are
+                      removed.
+
+    :param method: "douglas-peucker" or "visvalingam"
+
+    :param preserve_topology: If True, each simplified ring is checked for
+                              crossing itself. If it does, the ring is
+                              simplified again with half the tolerance (a
+                              few times), and then left as it was. Rings that
+                              cross themselves to begin with are simplified
+                              as usual.
+
+    :param threads: If given, the polygons are simplified by a pool of this
+                    many threads.
+
+    :returns: a new PolygonSet -- the metadata are the same objects as in
+              the original, and the metadata columns are copied.
+    """
+    points = np.ascontiguousarray(polygon_set._PointsArray, dtype=np.float64)
+    offsets = np.ascontiguousarray(polygon_set._IndexArray, dtype=np.int64)
+    keep = _simplify_flat(points, offsets, tolerance, method, preserve_topology, threads)
+    # the number of points kept before each point
+    kept = np.zeros((len(points) + 1,), dtype=np.int64)
+    np.cumsum(keep, out=kept[1:])
+    new_offsets = kept[offsets]
+    return PolygonSet.from_flat(polygon_set._PointsArray[keep],
+                                new_offsets,
+                                polygon_set.GetMetaData(),
+                                dtype=polygon_set.dtype,
+                                copy=False,
+                                columns=dict((name, column.copy())
+                                             for name, column in polygon_set.meta.items()))
@@ -0,0 +1,279 @@
+#!/usr/bin/env python
+
+"""
+A uniform grid spatial hash of points, bounding boxes or line segments
+
+The items are binned into the cells of a regular grid covering an extent
+(given as a BBox), and stored as compressed (CSR) cell lists: the items in
+cell c are ``cell_items[cell_offsets[c]:cell_offsets[c+1]]``
+
+For dense, fairly evenly distributed data, this is cheaper to build and query
+than a tree -- see ``rtree.PackedRTree`` for the alternative. The queries
+have the same API as the PackedRTree ones.
+
+All the work is done with numpy on whole arrays at once.
+"""
+
+import numpy as np
+
+from . import bbox
+
+
+class SpatialHash(object):
+    """
+    A uniform grid spatial hash of bounding boxes.
+
+    Each box is put in every cell it overlaps. Points are zero-size boxes,
+    and line segments are stored as their bounding boxes.
+
+    Boxes outside the extent are put in the cells on the edge of the grid, so
+    they are still found. Null (NaN) boxes are never found.
+
+    Usually created by the factory functions:
+
+        ``SpatialHash.from_points()``
+
+        ``SpatialHash.from_segments()``
+
+    or directly from an array of boxes.
+    """
+    def __init__(self, boxes, extent=None, cell_size=None):
+        """
+        SpatialHash(boxes, extent=None, cell_size=None)
+
+        :param boxes: the boxes to put in the grid
+        :type boxes: Nx2x2 array of float64s (the ``bbox.from_BB_array`` layout)
+
+        :param extent: the area covered by the grid. Defaults to the bounding
+                       box of all the boxes.
+        :type extent: BBox
+
+        :param cell_size: size of the grid cells: a number, or a (dx, dy)
+                          pair. If None, a size is picked so that there are
+                          about as many cells as boxes, but the cells are not
+                          much smaller than the average box.
+        """
+        self.boxes = np.asarray(boxes, np.float64).reshape(-1, 2, 2)
+        valid = ~np.isnan(self.boxes).reshape(-1, 4).any(1)
+        if extent is None:
+            extent = bbox.BBoxArray(self.boxes[valid]).bounding_box
+        extent = bbox.asBBox(extent)
+        if extent.is_null():
+            extent = bbox.BBox( ((0.0, 0.0), (0.0, 0.0)) )
+        if not np.isfinite(extent).all():
+            raise ValueError("the extent of the grid must be finite")
+        self.extent = extent
+
+        if cell_size is None:
+            cell_size = self._auto_cell_size(self.boxes[valid], extent)
+        # a scalar or a pair -- as a plain array, even if it was worked out
+        # from the (BBox) extent
+        cell_size = np.asarray(np.zeros((2,), np.float64) + cell_size, dtype=np.float64)
+        if (cell_size <= 0).any():
+            raise ValueError("cell_size must be positive")
+        self.cell_size = cell_size
+        self.shape = tuple( np.maximum(np.ceil( (extent[1] - extent[0]) / cell_size ), 1).astype(np.int64) )
+
+        ids = np.nonzero(valid)[0]
+        owner, cells = self._expand(self.boxes[ids])
+        order = np.argsort(cells, kind='mergesort')
+        self.cell_items = ids[owner[order]]
+        counts = np.bincount(cells, minlength=self.num_cells)
+        self.cell_offsets = np.r_[0, np.cumsum(counts)].astype(np.int64)
+
+    @classmethod
+    def from_points(cls, points, extent=None, cell_size=None):
+        """
+        SpatialHash.from_points(points, extent=None, cell_size=None)
+
+        :param points: the points to put in the grid
+        :type points: Nx2 or Nx3 array of floats -- the third coordinate is ignored
+        """
+        points = np.asarray(points, np.float64)
+        points = points.reshape(-1, points.shape[-1])[:, :2]
+        return cls(np.stack( (points, points), 1 ), extent, cell_size)
+
+    @classmethod
+    def from_segments(cls, points, segments, extent=None, cell_size=None):
+        """
+        SpatialHash.from_segments(points, segments, extent=None, cell_size=None)
+
+        Line segments are defined by indexing into an array of points, the same
+        way as ``line_crossings.multi_segment_cross``
+
+        :param points: Nx2 array of the end points of the segments
+        :param segments: Mx2 array of integer indexes into points
+
+        The items in the grid are the indexes of the segments.
+        """
+        points = np.asarray(points, np.float64).reshape(-1, 2)
+        segments = np.asarray(segments).reshape(-1, 2)
+        start = points[segments[:, 0]]
+        end = points[segments[:, 1]]
+        boxes = np.stack( (np.minimum(start, end), np.maximum(start, end)), 1 )
+        return cls(boxes, extent, cell_size)
+
+    @staticmethod
+    def _auto_cell_size(boxes, extent):
+        if len(boxes) == 0:
+            return 1.0
+        size = extent[1] - extent[0]
+        # about one box per cell
+        cell_size = np.sqrt(size.prod() / len(boxes))
+        # but not much smaller than the boxes
+        cell_size = max(cell_size, (boxes[:, 1, :] - boxes[:, 0, :]).mean())
+        if not cell_size > 0.0:
+            # all the same point, or all on a line
+            cell_size = size.max() / len(boxes) if size.max() > 0.0 else 1.0
+        return cell_size
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def _get_num_cells(self):
+        return int(self.shape[0] * self.shape[1])
+    num_cells = property(_get_num_cells)
+
+    def cell_ranges(self, boxes):
+        """
+        cell_ranges(boxes)
+
+        :returns: (ix0, iy0, ix1, iy1) the ranges of the cells (inclusive)
+                  covered by each box -- clipped to the grid. Boxes with a
+                  NaN in them (null BBoxes) cover no cells: ix1 < ix0.
+        """
+        boxes = np.asarray(boxes, np.float64).reshape(-1, 2, 2)
+        nan = np.isnan(boxes).reshape(-1, 4).any(1)
+        if nan.any():
+            boxes = boxes.copy()
+            boxes[nan] = 0.0
+        origin = np.asarray(self.extent[0])
+        upper = np.array(self.shape, np.float64) - 1
+        lo = np.clip(np.floor( (boxes[:, 0, :] - origin) / self.cell_size ), 0, upper).astype(np.int64)
+        hi = np.clip(np.floor( (boxes[:, 1, :] - origin) / self.cell_size ), 0, upper).astype(np.int64)
+        # so the null boxes have empty ranges
+        hi[nan] = lo[nan] - 1
+        return lo[:, 0], lo[:, 1], hi[:, 0], hi[:, 1]
+
+    def _expand(self, boxes):
+        """
+        returns (owner, cells): the index of the box and the cell, for every
+        cell covered by every box.
+        """
+        ix0, iy0, ix1, iy1 = self.cell_ranges(boxes)
+        width = ix1 - ix0 + 1
+        counts = width * (iy1 - iy0 + 1)
+        owner = np.repeat(np.arange(len(counts)), counts)
+        local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        width = width[owner]
+        cells = (iy0[owner] + local // width) * self.shape[0] + (ix0[owner] + local % width)
+        return owner, cells
+
+    def _overlap(self, items, query_boxes):
+        # the exact box overlap test for each candidate
+        boxes = self.boxes[items]
+        return ( (boxes[:, 1, 0] >= query_boxes[:, 0, 0]) & (boxes[:, 0, 0] <= query_boxes[:, 1, 0]) &
+                 (boxes[:, 1, 1] >= query_boxes[:, 0, 1]) & (boxes[:, 0, 1] <= query_boxes[:, 1, 1]) )
+
+    def _to_csr(self, query_ids, items, num_queries):
+        # removes the duplicates (items in more than one cell), and sorts
+        n = max(len(self.boxes), 1)
+        keys = np.unique(query_ids * n + items)
+        query_ids = keys // n
+        indexes = keys % n
+        offsets = np.r_[0, np.cumsum(np.bincount(query_ids, minlength=num_queries))]
+        return offsets.astype(np.int64), indexes.astype(np.int64)
+
+    def query_boxes(self, boxes):
+        """
+        query_boxes(boxes)
+
+        Finds the items that overlap each of the boxes passed in
+
+        :param boxes: the boxes to search for
+        :type boxes: Nx2x2 array of float64s (or something that can be turned into one)
+
+        :returns: (offsets, indexes) -- the indexes of the items that overlap
+                  boxes[i] are indexes[offsets[i]:offsets[i+1]], in order.
+                  Boxes with a NaN in them (null BBoxes) don't overlap anything.
+        """
+        boxes = np.asarray(boxes, np.float64).reshape(-1, 2, 2)
+        query_ids, cells = self._expand(boxes)
+        counts = np.diff(self.cell_offsets)[cells]
+        local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        items = self.cell_items[np.repeat(self.cell_offsets[cells], counts) + local]
+        query_ids = np.repeat(query_ids, counts)
+        keep = self._overlap(items, boxes[query_ids])
+        return self._to_csr(query_ids[keep], items[keep], len(boxes))
+
+    def query_points(self, points):
+        """
+        query_points(points)
+
+        Finds the items that contain each of the points passed in
+
+        :param points: the points to search for
+        :type points: Nx2 or Nx3 array of float64s -- the third coordinate is ignored
+
+        :returns: (offsets, indexes) -- the indexes of the items that contain
+                  points[i] are indexes[offsets[i]:offsets[i+1]], in order.
+                  Points with a NaN coordinate aren't in any of them.
+        """
+        points = np.asarray(points, np.float64)
+        points = points.reshape(-1, points.shape[-1])[:, :2]
+        return self.query_boxes(np.stack( (points, points), 1 ))
+
+    def query_radius(self, points, radius):
+        """
+        query_radius(points, radius)
+
+        Finds the items that are near each of the points passed in: those
+        within radius in both x and y (i.e. inside the square centered on the point).
+
+        :returns: (offsets, indexes) -- as for query_points
+        """
+        points = np.asarray(points, np.float64)
+        points = points.reshape(-1, points.shape[-1])[:, :2]
+        return self.query_boxes(np.stack( (points - radius, points + radius), 1 ))
+
+    def query(self, BB):
+        """
+        query(BB)
+
+        :returns: array of the indexes of the items that overlap BB
+        """
+        return self.query_boxes(BB)[1]
+
+    def query_point(self, point):
+        """
+        query_point(point)
+
+        :returns: array of the indexes of the items that contain the point
+        """
+        return self.query_points( (point,) )[1]
+
+    def candidate_pairs(self):
+        """
+        candidate_pairs()
+
+        Finds all the pairs of items whose boxes overlap -- for instance, the
+        pairs of line segments that might cross.
+
+        :returns: (index1, index2) -- arrays of the indexes of the pairs, with
+                  index1 < index2, sorted by index1, then index2.
+        """
+        counts = np.diff(self.cell_offsets)
+        entries = np.arange(len(self.cell_items))
+        entry_cells = np.repeat(np.arange(self.num_cells), counts)
+        # pair each entry with the ones after it in the same cell
+        num_pairs = counts[entry_cells] - (entries - self.cell_offsets[entry_cells]) - 1
+        first = np.repeat(entries, num_pairs)
+        second = first + 1 + np.arange(num_pairs.sum()) - np.repeat(np.cumsum(num_pairs) - num_pairs, num_pairs)
+        items1 = self.cell_items[first]
+        items2 = self.cell_items[second]
+        keep = self._overlap(items1, self.boxes[items2])
+        index1 = np.minimum(items1[keep], items2[keep])
+        index2 = np.maximum(items1[keep], items2[keep])
+        n = max(len(self.boxes), 1)
+        keys = np.unique(index1 * n + index2)
+        return (keys // n).astype(np.int64), (keys % n).astype(np.int64)
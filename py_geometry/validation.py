@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+
+"""
+validation module, part of the geometry package
+
+Checks of the rings in a PolygonSet for self-intersections -- all the rings
+at once.
+
+Each polygon is treated as a closed ring: edge i runs from point i to point
+i+1, and the last edge back to the first point. Zero-length edges (repeated
+points, including a first point repeated at the end) are skipped.
+
+A ring intersects itself if two of its edges cross, touch or overlap --
+except that neighboring edges share an end point, so they only count if
+they overlap (the ring turns right back on itself).
+
+The edges of each ring are swept in order of their minimum coordinate along
+the axis the ring is longest in, and only the pairs that overlap along that
+axis (and then in the other) are tested -- with
+``line_crossings.c_segment_intersect``, or ``c_adjacent_overlap`` for
+neighboring edges. It's all compiled code, without the GIL.
+
+That is about O(n log n) for typical rings, where each edge is short
+compared to the ring. The worst case is still O(n**2): when a lot of edges
+span most of the ring along the sweep axis (a zigzag of long edges, for
+instance), they all overlap each other along it, and every pair is tested.
+"""
+
+import numpy as np
+
+from .line_crossings import ring_self_intersections
+
+
+def self_intersections(polygon_set):
+    """
+    self_intersections(polygon_set)
+
+    Finds all the pairs of edges that intersect, in every ring in a PolygonSet
+
+    :param polygon_set: the rings to check
+    :type polygon_set: PolygonSet
+
+    :returns: (polygon_ids, edges1, edges2) -- arrays with the index of the
+              polygon, and the (index in the polygon of the) two edges, for
+              every pair of edges that intersect -- with edges1 < edges2,
+              sorted by polygon, then edges1, then edges2.
+
+    Edge i of a polygon runs from point i to point i+1 (or back to the first
+    point, for the last one).
+    """
+    found = ring_self_intersections(np.ascontiguousarray(polygon_set._PointsArray, dtype=np.float64),
+                                    np.ascontiguousarray(polygon_set._IndexArray, dtype=np.int64))
+    found = np.array(found, dtype=np.int64).reshape(-1, 3)
+    found = found[np.lexsort( (found[:, 2], found[:, 1], found[:, 0]) )]
+    return found[:, 0], found[:, 1], found[:, 2]
+
+
+def simple_rings(polygon_set):
+    """
+    simple_rings(polygon_set)
+
+    Checks every ring in a PolygonSet for self-intersections
+
+    :returns: a boolean array, True for the rings that don't intersect
+              themselves (see ``self_intersections``)
+    """
+    simple = np.ones((len(polygon_set),), dtype=np.bool_)
+    simple[self_intersections(polygon_set)[0]] = False
+    return simple
@@ -19,6 +19,21 @@ ext_modules = cythonize([Extension("py_geometry.cy_point_in_polygon",
                          Extension("py_geometry.line_crossings",
                                    sources=["py_geometry/line_crossings.pyx",],
                                    include_dirs=[numpy.get_include()]),
+                         Extension("py_geometry.cy_bbox",
+                                   sources=["py_geometry/cy_bbox.pyx",],
+                                   include_dirs=[numpy.get_include()]),
+                         Extension("py_geometry.rtree",
+                                   sources=["py_geometry/rtree.pyx",],
+                                   include_dirs=[numpy.get_include()]),
+                         Extension("py_geometry.clip",
+                                   sources=["py_geometry/clip.pyx",],
+                                   include_dirs=[numpy.get_include()]),
+                         Extension("py_geometry.simplify",
+                                   sources=["py_geometry/simplify.pyx",],
+                                   include_dirs=[numpy.get_include()]),
+                         Extension("py_geometry.hull",
+                                   sources=["py_geometry/hull.pyx",],
+                                   include_dirs=[numpy.get_include()]),
                         ])
 
 
@@ -340,6 +340,22 @@ class testpoint_inside(unittest.TestCase):
         P = (-1, -10.0)
         self.failUnless(B.point_inside(P))
 
+class testpoints_inside(unittest.TestCase):
+    B = BBox( ( (5, 10),(15, 25) ) )
+    points = np.array( ( (10, 20), (5, 10), (4, 15), (10, 26) ), np.float64 )
+
+    def testPoints(self):
+        result = self.B.points_inside(self.points)
+        self.assertTrue(np.array_equal(result, (True, True, False, False)))
+
+    def testPoints3d(self):
+        points = np.c_[self.points, np.zeros((4,))]
+        result = self.B.points_inside(points)
+        self.assertTrue(np.array_equal(result, (True, True, False, False)))
+
+    def testSinglePoint(self):
+        self.assertTrue(np.array_equal(self.B.points_inside((10, 20)), (True,)))
+
 class test_from_points(unittest.TestCase):
 
     def testCreate(self):
@@ -570,5 +586,251 @@ class test_as_poly(unittest.TestCase):
         self.failUnless ( np.array_equal(self.B.as_poly(), self.corners ) )
         
 
+class testBBoxAccumulator(unittest.TestCase):
+    points = np.array( ( (1, 2), (5, -3), (np.nan, 20), (-4, 6), (3, np.nan) ),
+                       np.float64 )
+
+    def testEmpty(self):
+        acc = BBoxAccumulator()
+        self.assertTrue(acc.is_null())
+        self.assertTrue(acc.bbox.is_null())
+
+    def testOneChunk(self):
+        acc = BBoxAccumulator(self.points)
+        self.assertTrue(acc.bbox == BBox( ((-4, -3), (5, 6)) ))
+
+    def testChunks(self):
+        acc = BBoxAccumulator()
+        acc.add_chunks(self.points[i:i+2] for i in range(0, 5, 2))
+        self.assertTrue(acc.bbox == BBox( ((-4, -3), (5, 6)) ))
+
+    def testChunkSize(self):
+        acc = BBoxAccumulator()
+        acc.add(self.points.astype(np.float32), chunk_size=2)
+        self.assertTrue(acc.bbox == BBox( ((-4, -3), (5, 6)) ))
+
+    def testAllNaN(self):
+        acc = BBoxAccumulator(np.zeros((3, 2)) * np.nan)
+        self.assertTrue(acc.bbox.is_null())
+
+    def testPartlyNaN(self):
+        # a point with one NaN coordinate doesn't extend the other one
+        acc = BBoxAccumulator( ((1, 2), (np.nan, 50), (-30, np.nan)) )
+        self.assertTrue(acc.bbox == BBox( ((1, 2), (1, 2)) ))
+        acc = BBoxAccumulator( ((np.nan, 5),) )
+        self.assertTrue(acc.bbox.is_null())
+
+    def testBBoxIsCopy(self):
+        acc = BBoxAccumulator(self.points[:2])
+        BB = acc.bbox
+        acc.add( ((100, 100),) )
+        self.assertTrue(BB == BBox( ((1, -3), (5, 2)) ))
+
+    def testMerge(self):
+        acc1 = BBoxAccumulator(self.points[:2])
+        acc2 = BBoxAccumulator(self.points[2:])
+        acc3 = BBoxAccumulator()
+        acc1.merge(acc2)
+        acc1.merge(acc3)
+        self.assertTrue(acc1.bbox == BBox( ((-4, -3), (5, 6)) ))
+
+    def testMergeBBox(self):
+        acc = BBoxAccumulator()
+        acc.merge(BBox( ((0, 0), (1, 1)) ))
+        acc.merge(null_BBox())
+        self.assertTrue(acc.bbox == BBox( ((0, 0), (1, 1)) ))
+
+    def testPickle(self):
+        import pickle
+        acc = pickle.loads(pickle.dumps(BBoxAccumulator(self.points)))
+        self.assertTrue(acc.bbox == BBox( ((-4, -3), (5, 6)) ))
+
+    def testFromChunks(self):
+        BB = from_chunks( (self.points[:3], self.points[3:]) )
+        self.assertTrue(BB == BBox( ((-4, -3), (5, 6)) ))
+
+
+class testBBoxArray(unittest.TestCase):
+    BBarray = np.array( ( ((0, 0), (10, 10)),
+                          ((5, 5), (15, 15)),
+                          ((20, 20), (30, 30)),
+                          ((np.nan, np.nan), (np.nan, np.nan)),
+                          ((-np.inf, -np.inf), (np.inf, np.inf)),
+                        ),
+                        dtype=np.float64)
+
+    def setUp(self):
+        self.BA = BBoxArray(self.BBarray)
+
+    def testCreate(self):
+        self.assertTrue(isinstance(self.BA, BBoxArray))
+        self.assertTrue(self.BA.shape == (5, 2, 2))
+
+    def testCreateSingle(self):
+        BA = BBoxArray( ((0, 0), (5, 5)) )
+        self.assertTrue(BA.shape == (1, 2, 2))
+
+    def testMinMax(self):
+        self.assertRaises(ValueError, BBoxArray, ( ((0, 0), (5, 5)),
+                                                   ((0, 0), (-1, 5)) ) )
+
+    def testAsBBoxArrayView(self):
+        A = self.BBarray.copy()
+        BA = asBBoxArray(A)
+        A[0, 0, 0] = -10
+        self.assertTrue(BA[0, 0, 0] == -10)
+
+    def testIndex(self):
+        self.assertTrue(isinstance(self.BA[1], BBox))
+        self.assertTrue(self.BA[1] == BBox( ((5, 5), (15, 15)) ))
+
+    def testSlice(self):
+        self.assertTrue(isinstance(self.BA[1:3], BBoxArray))
+
+    def testOverlaps(self):
+        result = self.BA.overlaps( ((8, 8), (12, 12)) )
+        self.assertTrue(np.array_equal(result, [True, True, False, False, True]))
+
+    def testOverlapsTouch(self):
+        result = self.BA.overlaps( ((30, 30), (40, 40)) )
+        self.assertTrue(np.array_equal(result, [False, False, True, False, True]))
+
+    def testOverlapsInf(self):
+        result = self.BA.overlaps(inf_BBox())
+        self.assertTrue(result.all())
+
+    def testOverlapsElementwise(self):
+        result = self.BA[:3].overlaps( ( ((1, 1), (2, 2)),
+                                         ((1, 1), (2, 2)),
+                                         ((1, 1), (2, 2)) ) )
+        self.assertTrue(np.array_equal(result, [True, False, False]))
+
+    def testOverlapsSameAsBBox(self):
+        BB = BBox( ((4, 4), (6, 25)) )
+        result = self.BA.overlaps(BB)
+        for i in range(len(self.BA)):
+            self.assertTrue(result[i] == self.BA[i].overlaps(BB))
+
+    def testInside(self):
+        result = self.BA.inside( ((6, 6), (9, 9)) )
+        self.assertTrue(np.array_equal(result, [True, True, False, False, True]))
+
+    def testWithin(self):
+        result = self.BA.within( ((-1, -1), (16, 16)) )
+        self.assertTrue(np.array_equal(result, [True, True, False, False, False]))
+
+    def testPointInside(self):
+        result = self.BA.point_inside( (10, 10) )
+        self.assertTrue(np.array_equal(result, [True, True, False, False, True]))
+
+    def testIsNull(self):
+        self.assertTrue(np.array_equal(self.BA.is_null(), [False, False, False, True, False]))
+
+    def testIsInf(self):
+        self.assertTrue(np.array_equal(self.BA.is_inf(), [False, False, False, False, True]))
+
+    def testMerge(self):
+        self.BA.merge( ((-5, 2), (12, 12)) )
+        self.assertTrue(self.BA[0] == BBox( ((-5, 0), (12, 12)) ))
+        self.assertTrue(self.BA[2] == BBox( ((-5, 2), (30, 30)) ))
+        self.assertTrue(self.BA[3] == BBox( ((-5, 2), (12, 12)) ))
+        self.assertTrue(self.BA[4] == inf_BBox())
+
+    def testMergeNull(self):
+        self.BA.merge(null_BBox())
+        self.assertTrue(np.array_equal(self.BA[:3], self.BBarray[:3]))
+        self.assertTrue(self.BA[3].is_null())
+
+    def testBoundingBox(self):
+        BA = BBoxArray(self.BBarray[:4])
+        self.assertTrue(BA.bounding_box == BBox( ((0, 0), (30, 30)) ))
+
+    def testBoundingBoxEmpty(self):
+        BA = BBoxArray(np.zeros((0, 2, 2)))
+        self.assertTrue(BA.bounding_box.is_null())
+
+    def testSides(self):
+        BA = self.BA[:3]
+        self.assertTrue(np.array_equal(BA.Left, [0, 5, 20]))
+        self.assertTrue(np.array_equal(BA.Top, [10, 15, 30]))
+        self.assertTrue(np.array_equal(BA.Width, [10, 10, 10]))
+        self.assertTrue(np.array_equal(BA.Center, [(5, 5), (10, 10), (25, 25)]))
+
+
+class testScalarBBox(unittest.TestCase):
+    B = ScalarBBox(5, 10, 15, 25)
+
+    def testCreate(self):
+        self.assertTrue(self.B.Left == 5.0 and self.B.Bottom == 10.0)
+        self.assertTrue(self.B.Right == 15.0 and self.B.Top == 25.0)
+
+    def testMinMax(self):
+        self.assertRaises(ValueError, ScalarBBox, 0, 0, -1, 6)
+
+    def testAsScalarBBox(self):
+        C = asScalarBBox( ((5, 10), (15, 25)) )
+        self.assertTrue(C == self.B)
+        self.assertTrue(asScalarBBox(C) is C)
+
+    def testAsBBox(self):
+        C = self.B.as_BBox()
+        self.assertTrue(isinstance(C, BBox))
+        self.assertTrue(C == BBox( ((5, 10), (15, 25)) ))
+
+    def testToArray(self):
+        self.assertTrue(np.array_equal(np.asarray(self.B), ((5, 10), (15, 25))))
+        self.assertTrue(self.B[1, 0] == 15.0)
+
+    def testOverlaps(self):
+        self.assertTrue(self.B.overlaps(ScalarBBox(0, 12, 10, 32)))
+        self.assertTrue(self.B.overlaps(ScalarBBox(15, 25, 20, 30))) # touching
+        self.assertFalse(self.B.overlaps(ScalarBBox(-10, 5, 8.5, 9.2)))
+
+    def testOverlapsBBox(self):
+        self.assertTrue(self.B.overlaps(BBox( ((0, 12), (10, 32)) )))
+        self.assertTrue(BBox( ((0, 12), (10, 32)) ).overlaps(self.B))
+
+    def testOverlapsNullInf(self):
+        null = asScalarBBox(null_BBox())
+        inf = asScalarBBox(inf_BBox())
+        self.assertFalse(self.B.overlaps(null))
+        self.assertTrue(self.B.overlaps(inf))
+        self.assertTrue(inf.overlaps(null))
+        self.assertTrue(null.overlaps(inf))
+
+    def testInside(self):
+        self.assertTrue(self.B.inside(ScalarBBox(6, 11, 15, 20)))
+        self.assertFalse(self.B.inside(ScalarBBox(4, 11, 15, 20)))
+
+    def testPointInside(self):
+        self.assertTrue(self.B.point_inside( (15, 25) ))
+        self.assertFalse(self.B.point_inside( (4, 20) ))
+
+    def testMerge(self):
+        C = ScalarBBox(0, 0, 10, 10)
+        C.merge(self.B)
+        self.assertTrue(C == ScalarBBox(0, 0, 15, 25))
+
+    def testMergeNull(self):
+        C = asScalarBBox(null_BBox())
+        self.assertTrue(C.is_null())
+        C.merge(self.B)
+        self.assertTrue(C == self.B)
+        C.merge(null_BBox())
+        self.assertTrue(C == self.B)
+
+    def testNullEquals(self):
+        self.assertTrue(asScalarBBox(null_BBox()) == null_BBox())
+        self.assertTrue(asScalarBBox(null_BBox()) != self.B)
+
+    def testSizes(self):
+        self.assertTrue(self.B.Width == 10.0)
+        self.assertTrue(self.B.Height == 15.0)
+        self.assertTrue(self.B.Center == (10.0, 17.5))
+
+    def testAsPoly(self):
+        self.assertTrue(np.array_equal(self.B.as_poly(), self.B.as_BBox().as_poly()))
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+
+"""
+Tests of reading and writing BNA files
+
+Designed to be run with py.test
+
+"""
+
+import io
+
+import pytest
+
+import numpy as np
+
+from py_geometry.polygons import PolygonSet
+from py_geometry.bna import iter_bna, read_bna, write_bna
+
+SAMPLE = u'''"Another Name","1", 4
+-81.531753540039,31.134635925293
+-81.531150817871,31.134830474854
+-81.530662536621,31.134492874146
+-81.531753540039,31.134635925293
+"A third 'name'","6", 5
+-81.522369384766,31.122062683106
+-81.522109985352,31.121908187866
+-81.522010803223,31.121685028076
+-81.522254943848,31.121658325195
+-81.522369384766,31.122062683106
+
+"8223","1", -3
+-89.384231567383,30.226940155029
+-89.383659362793,30.226806640625
+-89.382865905762,30.226882934570
+'''
+
+
+@pytest.fixture
+def sample_file(tmpdir):
+    filename = str(tmpdir.join("sample.bna"))
+    with io.open(filename, 'w') as outfile:
+        outfile.write(SAMPLE)
+    return filename
+
+
+def test_read(sample_file):
+    set = read_bna(sample_file)
+    assert len(set) == 3
+    assert set.total_num_points == 12
+    assert set[0].metadata == ("Another Name", "1")
+    assert set[1].metadata == ("A third 'name'", "6")
+    assert np.array_equal(set[1][1], (-81.522109985352, 31.121908187866))
+    # polylines (negative number of points) are read the same way
+    assert len(set[2]) == 3
+    assert np.array_equal(set.meta['polyline'], (False, False, True))
+
+
+def test_iter_chunks(sample_file):
+    chunks = list(iter_bna(sample_file, chunk_size=2))
+    assert [len(chunk) for chunk in chunks] == [2, 1]
+    assert chunks[1][0].metadata == ("8223", "1")
+
+
+def test_read_into_set(sample_file):
+    set = PolygonSet()
+    set.append( ((1, 2), (3, 4)), "first")
+    set.reserve(20, 4)
+    result = read_bna(sample_file, set, chunk_size=1)
+    assert result is set
+    assert len(set) == 4
+    assert set[0].metadata == "first"
+    assert np.array_equal(set[3][0], (-89.384231567383, 30.226940155029))
+
+
+def test_open_file(sample_file):
+    with io.open(sample_file) as infile:
+        set = read_bna(infile)
+    assert len(set) == 3
+
+
+def test_missing_points(tmpdir):
+    filename = str(tmpdir.join("bad.bna"))
+    with io.open(filename, 'w') as outfile:
+        outfile.write(u'"a","b", 3\n1.0,2.0\n3.0,4.0\n')
+    with pytest.raises(ValueError):
+        read_bna(filename)
+
+
+@pytest.mark.parametrize("points", [u'1,2,3\n4\n',   # the right number, on the wrong lines
+                                    u'1,2\n3 4\n',    # no comma
+                                    u'1,2\n3,\n',     # too few
+                                    u'1,2\n3,4,5\n',  # too many
+                                    ])
+def test_bad_coordinates(tmpdir, points):
+    filename = str(tmpdir.join("bad.bna"))
+    with io.open(filename, 'w') as outfile:
+        outfile.write(u'"a","b", 2\n' + points)
+    with pytest.raises(ValueError):
+        read_bna(filename)
+
+
+def headers(filename):
+    with io.open(filename) as infile:
+        return [line for line in infile if line.startswith('"')]
+
+
+def test_round_trip(sample_file, tmpdir):
+    set = read_bna(sample_file)
+    filename = str(tmpdir.join("out.bna"))
+    write_bna(filename, set)
+    set2 = read_bna(filename)
+    assert np.array_equal(set2._PointsArray, set._PointsArray)
+    assert np.array_equal(set2._IndexArray, set._IndexArray)
+    assert set2.GetMetaData() == set.GetMetaData()
+    # the record types too
+    assert np.array_equal(set2.meta['polyline'], set.meta['polyline'])
+    assert [int(line.rpartition(',')[2]) for line in headers(filename)] == [4, 5, -3]
+
+
+def test_write_polyline_override(sample_file, tmpdir):
+    set = read_bna(sample_file)
+    filename = str(tmpdir.join("out.bna"))
+    write_bna(filename, set, polyline=False)
+    assert not read_bna(filename).meta['polyline'].any()
+    write_bna(filename, set, polyline=True)
+    assert read_bna(filename).meta['polyline'].all()
+
+
+def test_write_names(tmpdir):
+    set = PolygonSet.from_arrays([((1, 2), (3, 4), (5, 6))] * 3,
+                                 metadata=[None, "single", ("a", "b")])
+    filename = str(tmpdir.join("out.bna"))
+    write_bna(filename, set, polyline=True)
+    assert headers(filename) == [u'"", -3\n', u'"single", -3\n', u'"a","b", -3\n']
+    # no polyline column: all polygons
+    write_bna(filename, set)
+    assert headers(filename) == [u'"", 3\n', u'"single", 3\n', u'"a","b", 3\n']
+
+
+def test_write_chunks(sample_file, tmpdir):
+    filename = str(tmpdir.join("out.bna"))
+    write_bna(filename, iter_bna(sample_file, chunk_size=1), chunk_size=1)
+    set = read_bna(filename)
+    assert len(set) == 3
+    assert np.array_equal(set.meta['polyline'], (False, False, True))
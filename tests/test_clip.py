@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+
+"""
+Tests of clipping PolygonSets to a bounding box
+
+Designed to be run with py.test
+
+"""
+
+import pytest
+
+import numpy as np
+
+from py_geometry.polygons import PolygonSet
+from py_geometry.bbox import BBox
+from py_geometry.clip import clip_to_bbox
+
+box = BBox( ((0, 0), (10, 10)) )
+
+square = np.array( ((2, 2), (4, 2), (4, 4), (2, 4)), dtype=np.float64)
+
+
+def test_inside():
+    set = PolygonSet.from_arrays([square, square + 5], metadata=["a", "b"])
+    result = clip_to_bbox(set, box)
+    assert np.array_equal(result._PointsArray, set._PointsArray)
+    assert np.array_equal(result._IndexArray, set._IndexArray)
+    assert result.GetMetaData() == ["a", "b"]
+    # it's a copy
+    assert not np.shares_memory(result._PointsArray, set._PointsArray)
+
+
+def test_outside():
+    set = PolygonSet.from_arrays([square + 20, square, square - 20], metadata=["a", "b", "c"])
+    result = clip_to_bbox(set, box)
+    assert len(result) == 1
+    assert np.array_equal(result[0], square)
+    assert result.GetMetaData() == ["b"]
+
+
+def test_keep_empty():
+    set = PolygonSet.from_arrays([square + 20, square, np.zeros((0, 2))])
+    result = clip_to_bbox(set, box, drop_empty=False)
+    assert len(result) == 3
+    assert len(result[0]) == 0
+    assert np.array_equal(result[1], square)
+    assert len(result[2]) == 0
+
+
+def test_corner():
+    set = PolygonSet.from_arrays([square + 7])
+    result = clip_to_bbox(set, box)
+    assert len(result) == 1
+    assert len(result[0]) == 4
+    assert result[0].bounding_box == ((9, 9), (10, 10))
+    assert result.areas()[0] == 1.0
+
+
+def test_closed_ring():
+    ring = np.r_[square, square[:1]] - 3
+    result = clip_to_bbox(PolygonSet.from_arrays([ring]), box)
+    assert np.array_equal(result[0][0], result[0][-1])
+    assert result.areas()[0] == 1.0
+
+
+def test_cover():
+    # a polygon bigger than the box is clipped to the box
+    set = PolygonSet.from_arrays([((-5, -5), (20, -5), (20, 20), (-5, 20))])
+    result = clip_to_bbox(set, box)
+    assert result.areas()[0] == 100.0
+    assert result.bounding_box == box
+
+
+def test_triangle():
+    tri = np.array( ((-5, -5), (15, 0), (0, 15)) )
+    result = clip_to_bbox(PolygonSet.from_arrays([tri]), box)
+    assert result.bounding_box == box
+    assert len(result[0]) == 5
+    # the box, less the corner cut off by the long side
+    assert np.allclose(result.areas()[0], 100.0 - 0.5 * 5 * 5)
+
+
+def test_many():
+    np.random.seed(0)
+    rings = []
+    for i in range(500):
+        theta = np.sort(np.random.uniform(0, 2 * np.pi, 20))
+        r = np.random.uniform(1, 3, 20)
+        rings.append(np.c_[r * np.cos(theta), r * np.sin(theta)] + np.random.uniform(-5, 15, 2))
+    set = PolygonSet.from_arrays(rings, metadata=list(range(500)))
+    result = clip_to_bbox(set, box)
+    assert result.bounding_box.Left >= 0 and result.bounding_box.Right <= 10
+    assert result.bounding_box.Bottom >= 0 and result.bounding_box.Top <= 10
+    # clipping doesn't make anything bigger
+    areas = set.areas()
+    kept = result.GetMetaData()
+    assert (result.areas() <= areas[kept] + 1e-9).all()
+    # those inside aren't changed
+    for i, poly in zip(kept, result):
+        if box.inside(set[i].bounding_box):
+            assert np.array_equal(poly, set[i])
+    # and clipping again does nothing
+    again = clip_to_bbox(result, box)
+    assert np.allclose(again.areas(), result.areas())
+
+
+def test_float32():
+    set = PolygonSet.from_arrays([square + 7], dtype=np.float32)
+    result = clip_to_bbox(set, box)
+    assert result.dtype == np.float32
+    assert result[0].dtype == np.float32
+
+
+def test_columns():
+    set = PolygonSet.from_arrays([square + 20, square, square + 7],
+                                 columns={'type': [1, 2, 3]})
+    result = clip_to_bbox(set, box)
+    assert np.array_equal(result.meta['type'], (2, 3))
+
+
+def test_readonly():
+    points = np.r_[square + 20, square, square + 7]
+    offsets = np.array( (0, 4, 8, 12), dtype=np.int64)
+    points.flags.writeable = False
+    offsets.flags.writeable = False
+    set = PolygonSet.from_flat(points, offsets, copy=False)
+    result = clip_to_bbox(set, box)
+    assert len(result) == 2
+    assert np.array_equal(result[0], square)
+    assert result.areas()[1] == 1.0
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+
+"""
+Tests of the cython bounding box code
+
+Designed to be run with py.test
+
+"""
+
+import pytest
+
+import numpy as np
+
+from py_geometry.cy_bbox import points_in_bbox, overlapping_pairs, iter_overlapping_pairs
+from py_geometry.bbox import BBox, BBoxArray
+
+
+bb = BBox( ((5, 10), (15, 25)) )
+
+points = np.array( ( (10, 20, 0),  # inside
+                     ( 5, 10, 0),  # on the corner
+                     (15, 15, 0),  # on the right
+                     ( 4, 15, 0),  # left
+                     (16, 15, 0),  # right
+                     (10,  9, 0),  # below
+                     (10, 26, 0),  # above
+                     ), dtype=np.float64)
+
+expected = np.array( (True, True, True, False, False, False, False) )
+
+
+def test_points_in_bbox_3d():
+    result = points_in_bbox(bb, points)
+    assert result.dtype == np.bool_
+    assert np.array_equal(result, expected)
+
+def test_points_in_bbox_2d():
+    assert np.array_equal(points_in_bbox(bb, points[:, :2].copy()), expected)
+
+def test_points_in_bbox_noncontiguous():
+    assert np.array_equal(points_in_bbox(bb, points[::2, :2]), expected[::2])
+
+def test_points_in_bbox_readonly():
+    readonly = points.copy()
+    readonly.flags.writeable = False
+    assert np.array_equal(points_in_bbox(bb, readonly), expected)
+
+def test_points_in_bbox_tuple_bb():
+    assert np.array_equal(points_in_bbox( ((5, 10), (15, 25)), points), expected)
+
+def test_points_in_bbox_empty():
+    assert len(points_in_bbox(bb, np.zeros((0, 2)))) == 0
+
+def test_points_in_bbox_1d():
+    with pytest.raises(ValueError):
+        points_in_bbox(bb, np.zeros((4, 1)))
+
+def test_points_in_null_bbox():
+    null = BBox( ((np.nan, np.nan), (np.nan, np.nan)) )
+    assert not points_in_bbox(null, points).any()
+
+def test_same_as_point_inside():
+    np.random.seed(0)
+    pts = np.random.rand(1000, 2) * 30
+    result = points_in_bbox(bb, pts)
+    for point, inside in zip(pts, result):
+        assert bb.point_inside(point) == inside
+
+
+## the sweep and prune join
+
+def random_boxes(n, seed):
+    np.random.seed(seed)
+    lower = np.random.rand(n, 2) * 100
+    return np.stack( (lower, lower + np.random.rand(n, 2) * 8), 1 )
+
+def brute_force_pairs(boxes1, boxes2):
+    BA = BBoxArray(boxes1)
+    return sorted( (i, j) for j in range(len(boxes2))
+                          for i in np.nonzero(BA.overlaps(boxes2[j]))[0] )
+
+boxes1 = np.array( ( ((0, 0), (10, 10)),
+                     ((5, 5), (15, 15)),
+                     ((20, 20), (30, 30)),
+                     ((np.nan, np.nan), (np.nan, np.nan)),
+                     ), dtype=np.float64)
+
+boxes2 = np.array( ( ((12, 12), (20, 20)), # touches boxes1[2]
+                     ((-5, -5), (1, 1)),
+                     ((40, 0), (50, 50)),
+                     ), dtype=np.float64)
+
+
+def test_overlapping_pairs():
+    index1, index2 = overlapping_pairs(boxes1, boxes2)
+    assert list(zip(index1, index2)) == [(0, 1), (1, 0), (2, 0)]
+
+def test_overlapping_pairs_self():
+    index1, index2 = overlapping_pairs(boxes1)
+    assert list(zip(index1, index2)) == [(0, 1)]
+
+def test_overlapping_pairs_empty():
+    index1, index2 = overlapping_pairs(np.zeros((0, 2, 2)), boxes2)
+    assert len(index1) == len(index2) == 0
+
+def test_overlapping_pairs_random():
+    b1 = random_boxes(500, 0)
+    b2 = random_boxes(300, 1)
+    b2[0] = b1[5] # same xmin
+    index1, index2 = overlapping_pairs(b1, b2)
+    assert list(zip(index1, index2)) == brute_force_pairs(b1, b2)
+
+def test_overlapping_pairs_self_random():
+    b1 = random_boxes(500, 2)
+    index1, index2 = overlapping_pairs(b1)
+    expected = [(i, j) for (i, j) in brute_force_pairs(b1, b1) if i < j]
+    assert list(zip(index1, index2)) == expected
+
+@pytest.mark.parametrize("boxes2", (None, random_boxes(100, 4)))
+def test_iter_overlapping_pairs(boxes2):
+    b1 = random_boxes(200, 3)
+    expected = list(zip(*overlapping_pairs(b1, boxes2)))
+    chunks = list(iter_overlapping_pairs(b1, boxes2, chunk_size=5))
+    assert max(len(c[0]) for c in chunks) == 5
+    pairs = zip(np.concatenate([c[0] for c in chunks]),
+                np.concatenate([c[1] for c in chunks]))
+    assert sorted(pairs) == expected
+
+def test_iter_overlapping_pairs_bad_chunk():
+    with pytest.raises(ValueError):
+        list(iter_overlapping_pairs(boxes1, chunk_size=0))
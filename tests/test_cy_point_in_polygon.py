@@ -15,6 +15,7 @@ import numpy as np
 
 
 from py_geometry.cy_point_in_polygon import point_in_poly, points_in_poly
+from py_geometry.cy_point_in_polygon import points_in_rings, points_in_geometries
 
 
 poly1_ccw = np.array(( ( -5, -2),
@@ -275,3 +276,65 @@ def test_points_in_poly_array():
                           result )
 
 
+
+
+## multi-ring polygons
+
+outer = np.array(((0, 0), (10, 0), (10, 10), (0, 10)), dtype=np.float64)
+hole = np.array(((2, 2), (2, 8), (8, 8), (8, 2)), dtype=np.float64)
+island = np.array(((4, 4), (6, 4), (6, 6), (4, 6)), dtype=np.float64)
+rings_vertices = np.r_[outer, hole, island]
+rings_offsets = np.array((0, 4, 8, 12))
+
+
+def test_points_in_rings_hole():
+    points = ((1, 1), (3, 3), (5, 5), (11, 5))
+    result = points_in_rings(rings_vertices[:8], rings_offsets[:3], points)
+    assert np.array_equal(result, (True, False, False, False))
+
+
+def test_points_in_rings_island():
+    points = ((1, 1), (3, 3), (5, 5), (11, 5))
+    result = points_in_rings(rings_vertices, rings_offsets, points)
+    assert np.array_equal(result, (True, False, True, False))
+
+
+def test_points_in_rings_origin():
+    # no (0,0) separators, so a ring around the origin works
+    vertices = outer - 5
+    result = points_in_rings(vertices, (0, 4), ((0, 0, 0), (1, 0, 0)))
+    assert result.all()
+
+
+def test_points_in_rings_empty_ring():
+    vertices = np.r_[outer, hole]
+    result = points_in_rings(vertices, (0, 4, 4, 8), ((1, 1), (3, 3)))
+    assert np.array_equal(result, (True, False))
+
+
+def test_points_in_geometries():
+    # geometry 0 is the square with a hole, 1 is the island on its own
+    geometry_offsets = (0, 2, 3)
+    points = ((1, 1), (5, 5), (5, 5), (1, 1))
+    result = points_in_geometries(rings_vertices, rings_offsets, geometry_offsets,
+                                  (0, 0, 1, 1), points)
+    assert np.array_equal(result, (True, False, True, False))
+
+
+def test_points_in_geometries_bad_ids():
+    with pytest.raises(ValueError):
+        points_in_geometries(rings_vertices, rings_offsets, (0, 2, 3), (0, 1), ((1, 1),))
+    with pytest.raises(IndexError):
+        points_in_geometries(rings_vertices, rings_offsets, (0, 2, 3), (2,), ((1, 1),))
+
+
+def test_points_in_rings_readonly():
+    vertices = rings_vertices.copy()
+    offsets = rings_offsets.astype(np.int64)
+    points = np.array(((1, 1), (3, 3), (5, 5), (11, 5)), dtype=np.float64)
+    for arr in (vertices, offsets, points):
+        arr.flags.writeable = False
+    assert np.array_equal(points_in_rings(vertices, offsets, points), (True, False, True, False))
+    quantized = vertices.astype(np.int32)
+    quantized.flags.writeable = False
+    assert np.array_equal(points_in_rings(quantized, offsets, points), (True, False, True, False))
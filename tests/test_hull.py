@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+
+"""
+Tests of the convex hulls of PolygonSets
+
+Designed to be run with py.test
+
+"""
+
+import pytest
+
+import numpy as np
+
+from py_geometry.polygons import PolygonSet
+from py_geometry.hull import convex_hulls, convex_hulls_flat, convex_hull_points
+from py_geometry.cy_point_in_polygon import points_in_rings
+
+square = np.array(((0, 0), (10, 0), (10, 10), (0, 10)), dtype=np.float64)
+notched = np.array(((0, 0), (10, 0), (10, 10), (5, 2), (0, 10)), dtype=np.float64)
+
+
+def test_square():
+    # already convex, and counter-clockwise from the lower left
+    assert np.array_equal(convex_hull_points(square), square)
+
+
+def test_clockwise():
+    assert np.array_equal(convex_hull_points(square[::-1]), square)
+
+
+def test_notch():
+    assert np.array_equal(convex_hull_points(notched),
+                          ((0, 0), (10, 0), (10, 10), (0, 10)))
+
+
+def test_collinear_and_repeated():
+    points = ((0, 0), (5, 0), (10, 0), (10, 10), (10, 10), (0, 10), (0, 0))
+    assert np.array_equal(convex_hull_points(points), square)
+
+
+def test_degenerate():
+    assert len(convex_hull_points(np.zeros((0, 2)))) == 0
+    assert np.array_equal(convex_hull_points(((1, 2), (1, 2))), ((1, 2),))
+    assert np.array_equal(convex_hull_points(((3, 4), (1, 2))), ((1, 2), (3, 4)))
+    assert np.array_equal(convex_hull_points(((0, 0), (1, 1), (2, 2))), ((0, 0), (2, 2)))
+
+
+def test_flat():
+    points = np.r_[notched, square + 20]
+    hull_points, hull_offsets = convex_hulls_flat(points, (0, 5, 5, 9))
+    assert np.array_equal(hull_offsets, (0, 4, 4, 8))
+    assert np.array_equal(hull_points[:4], square)
+    assert np.array_equal(hull_points[4:], square + 20)
+
+
+def test_readonly():
+    points = np.r_[notched, square + 20]
+    offsets = np.array((0, 5, 9), dtype=np.int64)
+    points.flags.writeable = False
+    offsets.flags.writeable = False
+    hull_points, hull_offsets = convex_hulls_flat(points, offsets)
+    assert np.array_equal(hull_offsets, (0, 4, 8))
+    assert np.array_equal(hull_points, np.r_[square, square + 20])
+
+
+def test_bad_offsets():
+    with pytest.raises(ValueError):
+        convex_hulls_flat(square, (0, 3))
+
+
+def test_polygon_set():
+    set = PolygonSet.from_arrays([notched, square + 20, np.zeros((0, 2))],
+                                 metadata=["a", "b", "c"],
+                                 columns={'id': [1, 2, 3]})
+    hulls = convex_hulls(set)
+    assert len(hulls) == 3
+    assert np.array_equal(hulls[0], square)
+    assert len(hulls[2]) == 0
+    assert hulls.GetMetaData() == ["a", "b", "c"]
+    assert np.array_equal(hulls.meta['id'], (1, 2, 3))
+    assert np.array_equal(hulls.areas(), (100, 100, 0))
+
+
+def test_float32():
+    set = PolygonSet.from_arrays([notched], dtype=np.float32)
+    hulls = convex_hulls(set)
+    assert hulls.dtype == np.float32
+    assert np.array_equal(hulls[0], square)
+
+
+def test_random():
+    np.random.seed(2)
+    rings = [np.random.uniform(-10, 10, (n, 2)) for n in np.random.randint(3, 100, 200)]
+    hulls = convex_hulls(PolygonSet.from_arrays(rings))
+    for ring, hull in zip(rings, hulls):
+        # counter-clockwise, and convex: every turn is to the left
+        edges = np.roll(hull, -1, axis=0) - hull
+        turns = edges[:, 0] * np.roll(edges, -1, axis=0)[:, 1] - edges[:, 1] * np.roll(edges, -1, axis=0)[:, 0]
+        assert (turns > 0).all()
+        # all the points of the ring are inside, or on the hull
+        inside = points_in_rings(hull, (0, len(hull)), ring)
+        on_hull = (ring[:, None, :] == hull[None, :, :]).all(axis=2).any(axis=1)
+        assert (inside | on_hull).all()
@@ -15,6 +15,7 @@ import numpy as np
 
 
 from py_geometry.line_crossings import cross_product, side_of_line, segment_cross, multi_segment_cross
+from py_geometry.line_crossings import ring_self_intersections
 
 
 def test_cross_product1():
@@ -177,6 +178,27 @@ def test_multi_segment_cross_share_point():
     assert crosses == []
                         
 
+
+
+def test_ring_self_intersections_collinear():
+    # c_segment_cross says collinear segments always cross
+    assert segment_cross( ((0, 0), (1, 0)), ((2, 0), (3, 0)) )
+    # but the first and third edges of this ring don't meet
+    points = np.array( ( (0, 0), (1, 0), (1, 1), (2, 1), (2, 0), (3, 0), (3, 3), (0, 3) ),
+                       dtype=np.float64)
+    assert ring_self_intersections(points, np.array( (0, 8), dtype=np.int64)) == []
+
+
+def test_ring_self_intersections():
+    bowtie = np.array( ( (0, 0), (10, 10), (10, 0), (0, 10) ), dtype=np.float64)
+    # a spike -- turns right back along the same line
+    spike = np.array( ( (0, 0), (10, 0), (10, 15), (10, 12), (0, 10) ), dtype=np.float64)
+    points = np.r_[bowtie, spike]
+    found = ring_self_intersections(points, np.array( (0, 4, 9), dtype=np.int64))
+    # (the end of the spike is on edge 1, so edge 3 touches it too)
+    assert sorted(found) == [(0, 0, 2), (1, 1, 2), (1, 1, 3)]
+
+
 # def test_as_mv_2x2_double():
 #     mv = as_mv_2x2_double( ( (1,2), (3,4) ) )
 
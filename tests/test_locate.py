@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+
+"""
+Tests of locating points in a PolygonSet
+
+Designed to be run with py.test
+
+"""
+
+import pytest
+
+import numpy as np
+
+from py_geometry.polygons import PolygonSet
+from py_geometry.locate import locate_points
+from py_geometry.spatial_hash import SpatialHash
+from py_geometry.cy_point_in_polygon import points_in_poly, points_in_candidates
+
+square = np.array(((0, 0), (10, 0), (10, 10), (0, 10)), dtype=np.float64)
+triangle = np.array(((0, 0), (10, 0), (0, 10)), dtype=np.float64)
+
+
+def sample_set():
+    # the second square overlaps the first, the triangle is inside the first
+    return PolygonSet.from_arrays([square, square + 5, triangle + 20, triangle, np.zeros((0, 2))])
+
+
+points = np.array(((1, 1), (7, 7), (12, 12), (28, 28), (21, 21), (8, 1), (-1, -1)), dtype=np.float64)
+
+
+def test_first_match():
+    result = locate_points(sample_set(), points)
+    assert result.dtype == np.int64
+    assert np.array_equal(result, (0, 0, 1, -1, 2, 0, -1))
+
+
+def test_all_matches():
+    offsets, indexes = locate_points(sample_set(), points, all_matches=True)
+    assert np.array_equal(offsets, (0, 2, 4, 5, 5, 6, 8, 8))
+    assert np.array_equal(indexes, (0, 3, 0, 1, 1, 2, 0, 3))
+
+
+def test_3d_points():
+    points3 = np.c_[points, np.zeros(len(points))]
+    assert np.array_equal(locate_points(sample_set(), points3), (0, 0, 1, -1, 2, 0, -1))
+
+
+def test_no_points():
+    assert len(locate_points(sample_set(), np.zeros((0, 2)))) == 0
+    offsets, indexes = locate_points(sample_set(), np.zeros((0, 2)), all_matches=True)
+    assert np.array_equal(offsets, (0,))
+    assert len(indexes) == 0
+
+
+def test_empty_set():
+    assert np.array_equal(locate_points(PolygonSet(), points), [-1] * len(points))
+
+
+def test_spatial_hash_index():
+    set = sample_set()
+    index = SpatialHash(set.bounding_boxes)
+    assert np.array_equal(locate_points(set, points, index=index), (0, 0, 1, -1, 2, 0, -1))
+
+
+@pytest.mark.parametrize("use_hash", [False, True])
+def test_non_finite_points(use_hash):
+    set = sample_set()
+    index = SpatialHash(set.bounding_boxes) if use_hash else None
+    bad = np.r_[points[:2], ((np.nan, 5), (5, np.inf), (np.nan, np.nan)), points[2:]]
+    assert np.array_equal(locate_points(set, bad, index=index),
+                          (0, 0, -1, -1, -1, 1, -1, 2, 0, -1))
+    offsets, indexes = locate_points(set, bad, all_matches=True, index=index)
+    assert np.array_equal(offsets, (0, 2, 4, 4, 4, 4, 5, 5, 6, 8, 8))
+    assert np.array_equal(indexes, (0, 3, 0, 1, 1, 2, 0, 3))
+
+
+def test_readonly():
+    set = sample_set()
+    vertices = set._PointsArray.copy()
+    offsets = set._IndexArray.astype(np.int64)
+    vertices.flags.writeable = False
+    offsets.flags.writeable = False
+    readonly = PolygonSet.from_flat(vertices, offsets, copy=False)
+    query = points.copy()
+    query.flags.writeable = False
+    assert np.array_equal(locate_points(readonly, query), (0, 0, 1, -1, 2, 0, -1))
+
+
+def test_float32():
+    set = PolygonSet.from_arrays([square, triangle + 20], dtype=np.float32)
+    assert np.array_equal(locate_points(set, points), (0, 0, -1, -1, 1, 0, -1))
+
+
+def test_same_as_points_in_poly():
+    np.random.seed(3)
+    rings = []
+    for i in range(200):
+        theta = np.sort(np.random.uniform(0, 2 * np.pi, 20))
+        r = np.random.uniform(1, 3, 20)
+        rings.append(np.c_[r * np.cos(theta), r * np.sin(theta)] + np.random.uniform(0, 50, 2))
+    set = PolygonSet.from_arrays(rings)
+    cloud = np.random.uniform(-5, 55, (5000, 2))
+    offsets, indexes = locate_points(set, cloud, all_matches=True)
+    cloud3 = np.c_[cloud, np.zeros(len(cloud))]
+    for i, ring in enumerate(rings):
+        expected = points_in_poly(np.ascontiguousarray(ring), cloud3)
+        found = np.zeros(len(cloud), dtype=bool)
+        point_ids = np.repeat(np.arange(len(cloud)), np.diff(offsets))
+        found[point_ids[indexes == i]] = True
+        assert np.array_equal(found, expected)
+    first = locate_points(set, cloud)
+    has_match = np.diff(offsets) > 0
+    assert np.array_equal(first[has_match], indexes[offsets[:-1][has_match]])
+    assert (first[~has_match] == -1).all()
+
+
+def test_bad_candidates():
+    with pytest.raises(ValueError):
+        points_in_candidates(square, (0, 4), ((1, 1),), (0, 1, 2), (0, 0))
+    with pytest.raises(IndexError):
+        points_in_candidates(square, (0, 4), ((1, 1),), (0, 1), (1,))
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+
+"""
+Tests of the MultiPolygonSet: geometries made up of more than one ring
+
+Designed to be run with py.test
+
+"""
+
+import pytest
+
+import numpy as np
+
+from py_geometry.polygons import PolygonSet
+from py_geometry.multipolygons import MultiPolygonSet
+
+outer = np.array(((0, 0), (10, 0), (10, 10), (0, 10)), dtype=np.float64)
+hole = np.array(((2, 2), (2, 8), (8, 8), (8, 2)), dtype=np.float64)
+island = np.array(((4, 4), (6, 4), (6, 6), (4, 6)), dtype=np.float64)
+
+
+def sample_set():
+    return MultiPolygonSet.from_polygons([[outer, hole, island],
+                                          [outer + 20],
+                                          [outer + 40, outer + 60]],
+                                         metadata=["lake", "square", "pair"])
+
+
+def test_empty():
+    mps = MultiPolygonSet()
+    assert len(mps) == 0
+    assert len(mps.rings) == 0
+
+
+def test_from_polygons():
+    mps = sample_set()
+    assert len(mps) == 3
+    assert len(mps.rings) == 6
+    assert np.array_equal(mps.geometry_offsets, (0, 3, 4, 6))
+    assert mps.GetMetaData() == ["lake", "square", "pair"]
+
+
+def test_getitem():
+    mps = sample_set()
+    geometry = mps[0]
+    assert isinstance(geometry, PolygonSet)
+    assert len(geometry) == 3
+    assert np.array_equal(geometry[1], hole)
+    assert np.array_equal(mps[-1][0], outer + 40)
+    with pytest.raises(IndexError):
+        mps[3]
+
+
+def test_iter():
+    assert [len(geometry) for geometry in sample_set()] == [3, 1, 2]
+
+
+def test_bad_offsets():
+    rings = PolygonSet.from_arrays([outer, hole])
+    with pytest.raises(ValueError):
+        MultiPolygonSet(rings, (0, 1))
+    with pytest.raises(ValueError):
+        MultiPolygonSet(rings, (0, 2), metadata=["a", "b"])
+
+
+def test_append():
+    mps = MultiPolygonSet()
+    mps.append([outer, hole], metadata="a")
+    mps.append([], metadata="empty")
+    mps.append(PolygonSet.from_arrays([island]))
+    assert len(mps) == 3
+    assert np.array_equal(mps.geometry_offsets, (0, 2, 2, 3))
+    assert len(mps[1]) == 0
+    assert mps.GetMetaData() == ["a", "empty", None]
+
+
+def test_bounding_boxes():
+    mps = sample_set()
+    mps.append([])
+    boxes = mps.bounding_boxes
+    assert boxes[0] == ((0, 0), (10, 10))
+    assert boxes[1] == ((20, 20), (30, 30))
+    assert boxes[2] == ((40, 40), (70, 70))
+    assert np.isnan(boxes[3]).all()
+    assert mps.bounding_box == ((0, 0), (70, 70))
+
+
+def test_points_inside():
+    mps = sample_set()
+    points = ((1, 1), (3, 3), (5, 5), (25, 25))
+    assert np.array_equal(mps.points_inside(0, points), (True, False, True, False))
+    assert np.array_equal(mps.points_inside(1, points), (False, False, False, True))
+
+
+def test_points_in_geometries():
+    mps = sample_set()
+    points = ((3, 3), (25, 25), (65, 65), (55, 55))
+    result = mps.points_in_geometries(points, (0, 1, 2, 2))
+    assert np.array_equal(result, (False, True, True, False))
@@ -7,7 +7,13 @@ designed to be run with nose
 ## test in_place
 import sys
 
+import pytest
+
 from py_geometry.polygons import Polygon, PolygonSet
+from py_geometry.locate import locate_points
+from py_geometry.simplify import simplify
+from py_geometry.clip import clip_to_bbox
+from py_geometry.hull import convex_hulls
 
 import numpy as np
 
@@ -103,6 +109,566 @@ class Test_PolygonSet:
         print set[0].dtype
         assert set[0].dtype == np.float32
 
+    def test_append_many(self):
+        set = PolygonSet()
+        polys = [p1 + i for i in range(100)]
+        for poly in polys:
+            set.append(poly, metadata={"i": len(set)})
+        assert len(set) == 100
+        assert set.total_num_points == 400
+        for i, poly in enumerate(polys):
+            assert np.array_equal(set[i], poly)
+            assert set[i].metadata == {"i": i}
+
+    def test_append_amortized(self):
+        # the buffers should grow geometrically, not one polygon at a time
+        set = PolygonSet()
+        buffers = []
+        for i in range(1000):
+            set.append(p1)
+            if set._points_buffer is not (buffers[-1] if buffers else None):
+                buffers.append(set._points_buffer)
+        assert len(buffers) < 20
+        assert len(set._points_buffer) < 2 * set.total_num_points
+
+    def test_reserve(self):
+        set = PolygonSet()
+        set.reserve(400, 100)
+        buffer = set._points_buffer
+        for i in range(100):
+            set.append(p1)
+        assert set._points_buffer is buffer
+        assert set.GetPointsData()[0].shape == (400, 2)
+
+    def test_extend(self):
+        set = PolygonSet()
+        set.append(p1, "one")
+        set.bounding_boxes
+        set.extend(PolygonSet.from_arrays([p2, p1], metadata=["two", "three"]))
+        set.extend([p2])
+        assert len(set) == 4
+        assert np.array_equal(set[1], p2)
+        assert np.array_equal(set[2], p1)
+        assert np.array_equal(set[3], p2)
+        assert set.GetMetaData() == ["one", "two", "three", None]
+        assert np.array_equal(set.bounding_boxes[3], (p2.min(0), p2.max(0)))
+
+    def test_trim(self):
+        set = PolygonSet()
+        set.reserve(1000, 100)
+        set.append(p1)
+        set.append(p2)
+        set.trim()
+        assert len(set._points_buffer) == 8
+        assert len(set._index_buffer) == 3
+        assert np.array_equal(set[1], p2)
+        set.append(p1)
+        assert np.array_equal(set[2], p1)
+
+    def test_init_data(self):
+        set = PolygonSet( (np.r_[p1, p2], (0, 4, 8), [{"name": "p1"}, None]) )
+        assert np.array_equal(set[1], p2)
+        assert set[0].metadata == {"name": "p1"}
+        set.append(p1, {"name": "p3"})
+        assert set[2].metadata == {"name": "p3"}
+
+    def test_from_flat(self):
+        set = PolygonSet.from_flat(np.r_[p1, p2, p1], (0, 4, 8, 12),
+                                   metadata=["a", "b", "c"])
+        assert len(set) == 3
+        assert np.array_equal(set[1], p2)
+        assert set[2].metadata == "c"
+        assert set.GetMetaData() == ["a", "b", "c"]
+
+    def test_from_flat_no_copy(self):
+        points = np.r_[p1, p2].astype(np.float64)
+        set = PolygonSet.from_flat(points, (0, 4, 8), copy=False)
+        points[0] = (-1, -1)
+        assert tuple(set[0][0]) == (-1, -1)
+
+    def test_from_flat_bad_offsets(self):
+        points = np.r_[p1, p2]
+        with pytest.raises(ValueError):
+            PolygonSet.from_flat(points, (0, 4, 7))
+        with pytest.raises(ValueError):
+            PolygonSet.from_flat(points, (1, 4, 8))
+        with pytest.raises(ValueError):
+            PolygonSet.from_flat(points, (0, 6, 4, 8))
+        with pytest.raises(ValueError):
+            PolygonSet.from_flat(points, (0, 4, 8), metadata=[None])
+
+    def test_from_arrays(self):
+        set = PolygonSet.from_arrays([p1, p2, [(1, 1), (2, 2), (3, 1)]],
+                                     dtype=np.float32)
+        assert len(set) == 3
+        assert set.total_num_points == 11
+        assert set[2].dtype == np.float32
+        assert np.array_equal(set[2], [(1, 1), (2, 2), (3, 1)])
+        assert set.GetMetaData() == [None, None, None]
+        set.append(p1)
+        assert np.array_equal(set[3], p1)
+
+    def test_from_arrays_generator(self):
+        set = PolygonSet.from_arrays(p1 * i for i in range(1, 4))
+        assert len(set) == 3
+        assert set.total_num_points == 12
+        assert np.array_equal(set[2], p1 * 3)
+        polys = (Polygon(p1 * i, metadata=i) for i in range(3))
+        assert PolygonSet.from_arrays(polys).GetMetaData() == [0, 1, 2]
+
+    def test_from_arrays_empty(self):
+        set = PolygonSet.from_arrays([])
+        assert len(set) == 0
+        assert set.total_num_points == 0
+
+    def test_from_polygons(self):
+        polys = (Polygon(p1 * i, metadata={"i": i}) for i in range(5))
+        set = PolygonSet.from_polygons(polys)
+        assert len(set) == 5
+        assert np.array_equal(set[3], p1 * 3)
+        assert set[3].metadata == {"i": 3}
+
+    def test_slice(self):
+        set = PolygonSet.from_arrays([p1 + i for i in range(10)],
+                                     metadata=list(range(10)))
+        sub = set[2:5]
+        assert isinstance(sub, PolygonSet)
+        assert len(sub) == 3
+        assert np.array_equal(sub[0], p1 + 2)
+        assert sub.GetMetaData() == [2, 3, 4]
+        # zero copy
+        assert np.shares_memory(sub._PointsArray, set._PointsArray)
+        assert len(set[8:20]) == 2
+        assert len(set[5:2]) == 0
+        assert np.array_equal(set[-2:][1], p1 + 9)
+
+    def test_slice_append(self):
+        set = PolygonSet.from_arrays([p1, p2, p1])
+        sub = set[:2]
+        sub.append(p2)
+        assert np.array_equal(sub[2], p2)
+        assert np.array_equal(set[2], p1)
+
+    def test_slice_read_only(self):
+        set = PolygonSet.from_arrays([p1, p2, p1])
+        set.bounding_boxes # cached
+        sub = set[1:3]
+        with pytest.raises(ValueError):
+            sub[0][0] = (100, 100)
+        # transforming it makes a copy, and leaves the parent alone
+        sub.TransformData(lambda block: block * 2, chunk_size=2)
+        assert not np.shares_memory(sub._PointsArray, set._PointsArray)
+        assert sub.bounding_boxes[0] == ((10, 20), (70, 80))
+        assert set.bounding_boxes[1] == ((5, 10), (35, 40))
+        # the parent can still be changed, and a copy of the slice
+        set[1][0] = (0, 0)
+        copy = sub.Copy()
+        copy[0][0] = (1, 1)
+        assert np.array_equal(copy[0][0], (1, 1))
+
+    def test_slice_parent_changed(self):
+        square = np.array([[2, 2], [3, 2], [3, 3], [2, 3]], dtype=np.float64)
+        set = PolygonSet.from_arrays([p1, square])
+        set.bounding_boxes # cached before the slice is taken
+        sub = set[1:]
+        # in place, through the parent
+        set.TransformData(lambda block: block + 10, chunk_size=3)
+        assert np.array_equal(sub[0], square + 10)
+        assert set.bounding_boxes[1] == ((12, 12), (13, 13))
+        assert sub.bounding_boxes[0] == ((12, 12), (13, 13))
+
+    def test_slice_columns_read_only(self):
+        set = PolygonSet.from_arrays([p1, p2, p1], columns={'t': [1, 2, 3]})
+        sub = set[1:]
+        with pytest.raises(ValueError):
+            sub.meta['t'][0] = 99
+        assert np.array_equal(set.meta['t'], (1, 2, 3))
+        # a whole new column is fine, and appending copies
+        sub.meta['t'] = (5, 6)
+        sub.append(p2, columns={'t': 7})
+        assert np.array_equal(sub.meta['t'], (5, 6, 7))
+        assert np.array_equal(set.meta['t'], (1, 2, 3))
+        sub = set[:2]
+        sub.append(p2, columns={'t': 7})
+        assert np.array_equal(set.meta['t'], (1, 2, 3))
+        # nothing, or empty polygons, don't write to the views either
+        sub = set[1:]
+        sub.extend([])
+        sub.append(np.zeros((0, 2)), columns={'t': 9})
+        assert np.array_equal(sub.meta['t'], (2, 3, 9))
+        assert len(sub[2]) == 0
+
+    def test_slice_step(self):
+        set = PolygonSet.from_arrays([p1 + i for i in range(10)])
+        sub = set[::3]
+        assert len(sub) == 4
+        assert np.array_equal(sub[3], p1 + 9)
+        assert not np.shares_memory(sub._PointsArray, set._PointsArray)
+
+    def test_take(self):
+        set = PolygonSet.from_arrays([p1 + i for i in range(10)] + [np.zeros((0, 2))],
+                                     metadata=list(range(11)))
+        set.bounding_boxes
+        sub = set.take([7, 10, 0, -2, 7])
+        assert len(sub) == 5
+        assert sub.total_num_points == 16
+        assert np.array_equal(sub[0], p1 + 7)
+        assert len(sub[1]) == 0
+        assert np.array_equal(sub[2], p1)
+        assert np.array_equal(sub[3], p1 + 9)
+        assert sub.GetMetaData() == [7, 10, 0, 9, 7]
+        assert np.allclose(sub.bounding_boxes, sub._compute_bounding_boxes(), equal_nan=True)
+        sub[0][0] = (-1, -1)
+        assert tuple(set[7][0]) == (8, 9)
+
+    def test_take_mask(self):
+        set = PolygonSet.from_arrays([p1 + i for i in range(10)])
+        sub = set[set.bounding_boxes.Left > 5]
+        assert len(sub) == 5
+        assert np.array_equal(sub[0], p1 + 5)
+        assert len(set.take(np.zeros((10,), np.bool_))) == 0
+
+    def test_take_bad_index(self):
+        set = PolygonSet.from_arrays([p1, p2])
+        with pytest.raises(IndexError):
+            set.take([0, 2])
+        with pytest.raises(IndexError):
+            set.take([-3])
+        with pytest.raises(IndexError):
+            set[np.ones((3,), np.bool_)]
+
+    def test_index_is_view(self):
+        set = PolygonSet.from_arrays([p1, p2])
+        poly = set[1]
+        poly[0] = (-1, -1)
+        assert tuple(set[1][0]) == (-1, -1)
+
+    def test_index_copy(self):
+        set = PolygonSet.from_arrays([p1, p2], metadata=[{"a": 1}, {"b": 2}])
+        poly = set[1].copy()
+        poly[0] = (-1, -1)
+        poly.metadata["b"] = 3
+        assert isinstance(poly, Polygon)
+        assert np.array_equal(set[1], p2)
+        assert set[1].metadata == {"b": 2}
+
+    def test_index_negative(self):
+        set = PolygonSet.from_arrays([p1, p2])
+        assert np.array_equal(set[-1], p2)
+        assert np.array_equal(set[-2], p1)
+        with pytest.raises(IndexError):
+            set[-3]
+        with pytest.raises(IndexError):
+            set[2]
+
+    def test_iter(self):
+        set = PolygonSet.from_arrays([p1, p2, p1], metadata=["a", "b", "c"])
+        polys = list(set)
+        assert len(polys) == 3
+        assert np.array_equal(polys[1], p2)
+        assert polys[2].metadata == "c"
+        polys[0][0] = (-1, -1)
+        assert tuple(set[0][0]) == (-1, -1)
+
+    def test_bounding_boxes(self):
+        set = PolygonSet.from_arrays([p1, np.zeros((0, 2)), p2, p1[::-1]])
+        boxes = set.bounding_boxes
+        assert boxes.shape == (4, 2, 2)
+        assert boxes[0] == ((1, 2), (7, 8))
+        assert boxes[1].is_null()
+        assert boxes[2] == ((5, 10), (35, 40))
+        assert boxes[3] == ((1, 2), (7, 8))
+
+    def test_bounding_boxes_empty_last(self):
+        set = PolygonSet.from_arrays([p1, np.zeros((0, 2))])
+        assert set.bounding_boxes[0] == ((1, 2), (7, 8))
+        assert set.bounding_boxes[1].is_null()
+
+    def test_bounding_boxes_cached(self):
+        set = PolygonSet.from_arrays([p1, p2])
+        set.bounding_boxes
+        buffer = set._bbox_buffer
+        set.bounding_boxes
+        assert set._bbox_buffer is buffer
+        with pytest.raises(ValueError):
+            set.bounding_boxes[0, 0, 0] = 5
+
+    def test_bounding_boxes_append(self):
+        set = PolygonSet()
+        set.append(p1)
+        set.bounding_boxes
+        for i in range(10):
+            set.append(p2 + i)
+        set.append(np.zeros((0, 2)))
+        assert len(set.bounding_boxes) == 12
+        assert set.bounding_boxes[10] == ((14, 19), (44, 49))
+        assert set.bounding_boxes[11].is_null()
+        assert np.allclose(set.bounding_boxes, set._compute_bounding_boxes(), equal_nan=True)
+
+    def test_bounding_boxes_transform(self):
+        set = PolygonSet.from_arrays([p1, p2])
+        set.bounding_boxes
+        set.TransformData(lambda points: points * 2)
+        assert set.bounding_boxes[0] == ((2, 4), (14, 16))
+
+    def test_transform_chunked(self):
+        set = PolygonSet.from_arrays([p1, p2, p1])
+        points = set._PointsArray
+        calls = []
+        def shift(block, dx, dy=0):
+            calls.append(len(block))
+            return block + (dx, dy)
+        set.bounding_boxes
+        set.TransformData(shift, args=(1,), kwargs={'dy': 2}, chunk_size=5)
+        assert calls == [5, 5, 2]
+        assert np.shares_memory(set._PointsArray, points) # in place
+        assert np.array_equal(set[1], p2 + (1, 2))
+        assert set.bounding_boxes[2] == ((2, 4), (8, 10))
+
+    def test_transform_threads(self):
+        set = PolygonSet.from_arrays([np.random.rand(1000, 2) for i in range(10)])
+        expected = set._PointsArray * 3.0
+        set.TransformData(np.multiply, args=(3.0,), threads=4, chunk_size=700)
+        assert np.array_equal(set._PointsArray, expected)
+        set.TransformData(np.multiply, args=(2.0,), threads=3)
+        assert np.array_equal(set._PointsArray, expected * 2)
+
+    def test_transform_out(self):
+        set = PolygonSet.from_arrays([p1, p2])
+        original = set._PointsArray.copy()
+        out = np.zeros_like(original)
+        set.TransformData(np.negative, out=out)
+        assert set._points_buffer is out
+        assert np.array_equal(out, -original)
+        assert np.array_equal(set[1], -p2)
+        with pytest.raises(ValueError):
+            set.TransformData(np.negative, out=np.zeros((3, 2)))
+
+    def test_transform_chunked_wrong_size(self):
+        set = PolygonSet.from_arrays([p1, p2])
+        with pytest.raises(ValueError):
+            set.TransformData(lambda block: block[:1], chunk_size=3)
+
+    def test_bounding_boxes_set_points_data(self):
+        set = PolygonSet.from_arrays([p1, p2])
+        set.bounding_boxes
+        set.SetPointsData( (p2, (0, 4)) )
+        assert len(set.bounding_boxes) == 1
+        assert set.bounding_boxes[0] == ((5, 10), (35, 40))
+        assert set.GetMetaData() == [None]
+
+    def test_bounding_box_empty_set(self):
+        assert PolygonSet().bounding_box.is_null()
+
+    def metrics_set(self):
+        square = np.array( ( (0, 0), (2, 0), (2, 2), (0, 2) ), dtype=np.float64)
+        return PolygonSet.from_arrays( [square,
+                                        square[::-1], # clockwise
+                                        np.r_[square, square[:1]], # closed
+                                        np.zeros((0, 2)),
+                                        [(0, 0), (2, 2), (4, 4)], # no area
+                                        square * 3 + 1000,
+                                        ] )
+
+    def test_signed_areas(self):
+        assert np.array_equal(self.metrics_set().signed_areas(),
+                              [4, -4, 4, 0, 0, 36])
+
+    def test_areas(self):
+        assert np.array_equal(self.metrics_set().areas(),
+                              [4, 4, 4, 0, 0, 36])
+
+    def test_perimeters(self):
+        assert np.allclose(self.metrics_set().perimeters(),
+                           [8, 8, 8, 0, 4 * np.sqrt(8), 24])
+
+    def test_centroids(self):
+        centroids = self.metrics_set().centroids()
+        assert np.array_equal(centroids[[0, 1, 2, 4, 5]],
+                              [(1, 1), (1, 1), (1, 1), (2, 2), (1003, 1003)])
+        assert np.isnan(centroids[3]).all()
+
+    def test_centroids_closed_line(self):
+        set = PolygonSet.from_arrays( [[(0, 0), (3, 3), (0, 0)]] )
+        assert np.array_equal(set.centroids(), [(1.5, 1.5)])
+
+    def test_metrics_match_polygons(self):
+        np.random.seed(0)
+        set = PolygonSet.from_arrays([np.random.rand(n, 2) for n in range(3, 20)])
+        for poly, area in zip(set, set.signed_areas()):
+            x, y = poly[:, 0], poly[:, 1]
+            expected = (np.dot(x, np.roll(y, -1)) - np.dot(np.roll(x, -1), y)) / 2.0
+            assert np.allclose(area, expected)
+
+    def test_metrics_empty_set(self):
+        set = PolygonSet()
+        assert len(set.signed_areas()) == 0
+        assert set.centroids().shape == (0, 2)
+
+    def test_save_open(self, tmpdir):
+        filename = str(tmpdir.join("test.pgs"))
+        set = PolygonSet.from_arrays([p1, np.zeros((0, 2)), p2],
+                                     metadata=[{"name": "p1"}, None, [1, 2]])
+        set.save(filename)
+        for mmap in (True, False):
+            set2 = PolygonSet.open(filename, mmap=mmap)
+            assert len(set2) == 3
+            assert np.array_equal(set2._PointsArray, set._PointsArray)
+            assert np.array_equal(set2._IndexArray, set._IndexArray)
+            assert np.allclose(set2.bounding_boxes, set.bounding_boxes, equal_nan=True)
+            assert set2.GetMetaData() == [{"name": "p1"}, None, [1, 2]]
+            assert np.array_equal(set2[2], p2)
+
+    def test_open_is_mmapped(self, tmpdir):
+        filename = str(tmpdir.join("test.pgs"))
+        PolygonSet.from_arrays([p1, p2]).save(filename)
+        set = PolygonSet.open(filename)
+        assert not set._PointsArray.flags.owndata
+        with pytest.raises(ValueError): # read-only mapping
+            set[0][0] = (1, 1)
+
+    def test_open_kernels(self, tmpdir):
+        # the compiled code works on the read-only mapping
+        filename = str(tmpdir.join("test.pgs"))
+        square = np.array([[0, 0], [1, 0], [2, 0], [2, 2], [0, 2]], dtype=np.float64)
+        set = PolygonSet.from_arrays([square, square + 5])
+        set.save(filename)
+        set2 = PolygonSet.open(filename, mode='r')
+        assert not set2._PointsArray.flags.writeable
+        points = [(1, 1), (6, 6), (4, 4)]
+        assert np.array_equal(locate_points(set2, points), (0, 1, -1))
+        assert np.array_equal(simplify(set2, 0.1)._PointsArray,
+                              simplify(set, 0.1)._PointsArray)
+        assert np.array_equal(clip_to_bbox(set2, ((1, 1), (6, 6)))._PointsArray,
+                              clip_to_bbox(set, ((1, 1), (6, 6)))._PointsArray)
+        assert np.array_equal(convex_hulls(set2)._PointsArray,
+                              convex_hulls(set)._PointsArray)
+
+    def test_open_append(self, tmpdir):
+        filename = str(tmpdir.join("test.pgs"))
+        PolygonSet.from_arrays([p1]).save(filename)
+        set = PolygonSet.open(filename)
+        set.append(p2, metadata="p2")
+        assert np.array_equal(set[1], p2)
+        assert set.bounding_boxes[1] == ((5, 10), (35, 40))
+
+    def test_save_open_empty(self, tmpdir):
+        filename = str(tmpdir.join("test.pgs"))
+        PolygonSet().save(filename)
+        set = PolygonSet.open(filename)
+        assert len(set) == 0
+
+    def test_open_not_polygonset(self, tmpdir):
+        filename = tmpdir.join("test.txt")
+        filename.write("this is not a PolygonSet file")
+        with pytest.raises(ValueError):
+            PolygonSet.open(str(filename))
+
+    def test_meta_columns(self):
+        set = PolygonSet.from_arrays([p1, p2, p1 + 1],
+                                     columns={'type': [1, 2, 2], 'depth': [1.5, 2.5, 3.5]})
+        assert sorted(set.meta) == ['depth', 'type']
+        assert 'type' in set.meta
+        assert np.array_equal(set.meta['type'], (1, 2, 2))
+        set.meta['flag'] = True
+        assert set.meta['flag'].dtype == np.bool_
+        assert set.meta['flag'].all()
+        del set.meta['flag']
+        assert len(set.meta) == 2
+        with pytest.raises(ValueError):
+            set.meta['bad'] = [1, 2]
+
+    def test_meta_structured(self):
+        columns = np.zeros((2,), dtype=[('type', np.int32), ('depth', np.float32)])
+        columns['type'] = (3, 4)
+        set = PolygonSet.from_flat(np.r_[p1, p2], (0, 4, 8), columns=columns)
+        assert set.meta['type'].dtype == np.int32
+        assert np.array_equal(set.meta['type'], (3, 4))
+
+    def test_meta_append(self):
+        set = PolygonSet()
+        set.meta['type'] = np.zeros((0,), np.int16)
+        for i in range(100):
+            set.append(p1, columns={'type': i})
+        set.append(p2)
+        assert len(set.meta['type']) == 101
+        assert set.meta['type'].dtype == np.int16
+        assert np.array_equal(set.meta['type'], list(range(100)) + [0])
+        set.append(p2, columns={'depth': 2.0})
+        assert np.isnan(set.meta['depth'][:101]).all()
+        assert set.meta['depth'][101] == 2.0
+        set.trim()
+        assert len(set._columns['type']) == 102
+
+    def test_meta_extend(self):
+        set = PolygonSet.from_arrays([p1], columns={'type': [1]})
+        set.extend(PolygonSet.from_arrays([p2, p2], columns={'type': [2, 3]}))
+        set.extend([p1])
+        assert np.array_equal(set.meta['type'], (1, 2, 3, 0))
+
+    def test_meta_extend_self(self):
+        set = PolygonSet.from_arrays([p1, p2], metadata=["a", "b"],
+                                     columns={'type': [1, 2], 'depth': [1.5, 2.5]})
+        set.extend(set)
+        assert len(set) == 4
+        assert np.array_equal(set[2], p1)
+        assert np.array_equal(set[3], p2)
+        assert set.GetMetaData() == ["a", "b", "a", "b"]
+        assert np.array_equal(set.meta['type'], (1, 2, 1, 2))
+        assert np.array_equal(set.meta['depth'], (1.5, 2.5, 1.5, 2.5))
+        # and once it has room to spare, so nothing is re-allocated
+        set.reserve(100, 20)
+        set.extend(set)
+        assert len(set) == 8
+        assert np.array_equal(set[7], p2)
+        assert np.array_equal(set.meta['type'], (1, 2) * 4)
+
+    def test_meta_widen_string(self):
+        set = PolygonSet()
+        set.meta['name'] = np.zeros((0,), 'U1')
+        set.append(p1, columns={'name': u'a'})
+        set.append(p2, columns={'name': u'longname'})
+        assert list(set.meta['name']) == [u'a', u'longname']
+        # a new column, from a longer string
+        set.append(p1, columns={'label': u'a label'})
+        assert set.meta['label'][2] == u'a label'
+        set.extend(PolygonSet.from_arrays([p1], columns={'name': [u'even longer']}))
+        assert set.meta['name'][3] == u'even longer'
+
+    def test_meta_widen_number(self):
+        set = PolygonSet.from_arrays([p1], columns={'type': np.array([1], np.int16)})
+        set.append(p2, columns={'type': 2})
+        assert set.meta['type'].dtype == np.int16 # it fits
+        set.append(p2, columns={'type': 2.5})
+        assert set.meta['type'].dtype.kind == 'f'
+        assert np.array_equal(set.meta['type'], (1, 2, 2.5))
+        set.extend(PolygonSet.from_arrays([p1], columns={'type': [1e10]}))
+        assert set.meta['type'][3] == 1e10
+
+    def test_where(self):
+        set = PolygonSet.from_arrays([p1 + i for i in range(10)],
+                                     metadata=list(range(10)),
+                                     columns={'type': np.arange(10) % 3})
+        sub = set.where(set.meta['type'] == 2)
+        assert len(sub) == 3
+        assert sub.GetMetaData() == [2, 5, 8]
+        assert np.array_equal(sub.meta['type'], (2, 2, 2))
+        assert np.array_equal(sub[1], p1 + 5)
+        with pytest.raises(ValueError):
+            set.where([2, 5])
+
+    def test_meta_slice_take_copy(self):
+        set = PolygonSet.from_arrays([p1 + i for i in range(10)],
+                                     columns={'type': np.arange(10)})
+        assert np.array_equal(set[2:4].meta['type'], (2, 3))
+        assert np.array_equal(set.take([7, 1]).meta['type'], (7, 1))
+        cp = set.Copy()
+        cp.meta['type'][0] = 100
+        assert set.meta['type'][0] == 0
+        assert np.array_equal(cp.meta['type'][1:], np.arange(1, 10))
+        # a set without any columns
+        assert len(PolygonSet.from_arrays([p1]).Copy().meta) == 0
+
     #def test_pop(self):
     
 
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+
+"""
+Tests of the quantized (int32) storage of PolygonSets
+
+Designed to be run with py.test
+
+"""
+
+import pytest
+
+import numpy as np
+
+from py_geometry.polygons import PolygonSet
+from py_geometry.quantized import QuantizedPolygonSet, quantize, dequantize
+from py_geometry.line_crossings import multi_segment_cross
+from py_geometry.cy_point_in_polygon import points_in_rings
+
+square = np.array(((0, 0), (10, 0), (10, 10), (0, 10)), dtype=np.float64)
+triangle = np.array(((20, 20), (30, 20), (25, 30)), dtype=np.float64)
+
+
+def sample_set():
+    return PolygonSet.from_arrays([square, triangle, np.zeros((0, 2))],
+                                  metadata=["a", "b", "c"])
+
+
+def test_quantize_round_trip():
+    points = np.random.uniform(-180, 180, (100, 2))
+    values = quantize(points, (0, 0), 1e-6)
+    assert values.dtype == np.int32
+    assert np.allclose(dequantize(values, (0, 0), 1e-6), points, rtol=0, atol=5e-7)
+
+
+def test_quantize_out_of_range():
+    with pytest.raises(ValueError):
+        quantize(((0, 0), (1e4, 0)), (0, 0), 1e-6)
+
+
+def test_from_polygon_set():
+    qset = QuantizedPolygonSet.from_polygon_set(sample_set())
+    assert len(qset) == 3
+    assert qset._PointsArray.dtype == np.int32
+    assert qset.GetMetaData() == ["a", "b", "c"]
+    assert np.allclose(qset[0], square)
+    assert np.allclose(qset[-2], triangle)
+    assert qset[1].metadata == "b"
+    assert len(qset[2]) == 0
+    with pytest.raises(IndexError):
+        qset[3]
+
+
+def test_full_range():
+    # the default scale uses the whole int32 range
+    qset = QuantizedPolygonSet.from_polygon_set(sample_set())
+    assert np.abs(qset._PointsArray).max() > 2**30
+
+
+def test_nbytes():
+    set = PolygonSet.from_arrays([np.random.uniform(0, 1, (1000, 2))])
+    qset = QuantizedPolygonSet.from_polygon_set(set)
+    assert qset._PointsArray.nbytes == set._PointsArray.nbytes // 2
+
+
+def test_given_scale():
+    qset = QuantizedPolygonSet.from_polygon_set(sample_set(), scale=0.5, origin=(0, 0))
+    assert qset.origin == (0.0, 0.0)
+    assert np.array_equal(qset._PointsArray[:4], square * 2)
+    with pytest.raises(ValueError):
+        QuantizedPolygonSet.from_polygon_set(sample_set(), scale=1e-9, origin=(0, 0))
+
+
+def test_to_polygon_set():
+    set = sample_set()
+    set2 = QuantizedPolygonSet.from_polygon_set(set).to_polygon_set()
+    assert np.allclose(set2._PointsArray, set._PointsArray)
+    assert np.array_equal(set2._IndexArray, set._IndexArray)
+    assert set2.GetMetaData() == ["a", "b", "c"]
+
+
+def test_bounding_boxes():
+    qset = QuantizedPolygonSet.from_polygon_set(sample_set(), scale=0.5)
+    boxes = qset.bounding_boxes
+    assert boxes[0] == ((0, 0), (10, 10))
+    assert boxes[1] == ((20, 20), (30, 30))
+    assert np.isnan(boxes[2]).all()
+    assert qset.bounding_box == ((0, 0), (30, 30))
+
+
+def test_points_inside():
+    qset = QuantizedPolygonSet.from_polygon_set(sample_set())
+    points = ((5, 5), (11, 5), (25, 25), (0.001, 9.999))
+    assert np.array_equal(qset.points_inside(0, points), (True, False, False, True))
+    assert np.array_equal(qset.points_inside(1, points), (False, False, True, False))
+    with pytest.raises(IndexError):
+        qset.points_inside(3, points)
+
+
+def test_points_in_polygons():
+    qset = QuantizedPolygonSet.from_polygon_set(sample_set())
+    points = ((5, 5), (5, 5), (25, 25), (5, 5))
+    result = qset.points_in_polygons(points, (0, 1, 1, 2))
+    assert np.array_equal(result, (True, False, True, False))
+
+
+def test_same_as_float():
+    np.random.seed(1)
+    theta = np.sort(np.random.uniform(0, 2 * np.pi, 50))
+    r = np.random.uniform(1, 3, 50)
+    ring = np.c_[r * np.cos(theta), r * np.sin(theta)]
+    qset = QuantizedPolygonSet.from_polygon_set(PolygonSet.from_arrays([ring]))
+    points = np.random.uniform(-3, 3, (1000, 2))
+    assert np.array_equal(qset.points_inside(0, points),
+                          points_in_rings(ring, (0, 50), points))
+
+
+def test_multi_segment_cross_int32():
+    points = np.array(((3, 5), (2, 2), (5, 2), (1, 4)), dtype=np.int32)
+    segments = np.array(((0, 1), (2, 3)), dtype=np.int32)
+    assert multi_segment_cross(points, segments) == [(0, 1)]
+
+
+def test_multi_segment_cross_readonly():
+    points = np.array(((3, 5), (2, 2), (5, 2), (1, 4)), dtype=np.int32)
+    segments = np.array(((0, 1), (2, 3)), dtype=np.int32)
+    points.flags.writeable = False
+    segments.flags.writeable = False
+    assert multi_segment_cross(points, segments) == [(0, 1)]
+    assert multi_segment_cross(points.astype(np.float64), segments) == [(0, 1)]
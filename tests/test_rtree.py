@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+
+"""
+Tests of the packed R-tree spatial index
+
+Designed to be run with py.test
+
+"""
+
+import pytest
+
+import numpy as np
+
+from py_geometry.rtree import PackedRTree
+from py_geometry.bbox import BBoxArray, null_BBox
+
+
+def random_boxes(n, seed=0):
+    np.random.seed(seed)
+    lower = np.random.rand(n, 2) * 100
+    upper = lower + np.random.rand(n, 2) * 5
+    return np.stack( (lower, upper), 1 )
+
+boxes = np.array( ( ((0, 0), (10, 10)),
+                    ((5, 5), (15, 15)),
+                    ((20, 20), (30, 30)),
+                    ((np.nan, np.nan), (np.nan, np.nan)),
+                    ), dtype=np.float64)
+
+
+def test_create():
+    tree = PackedRTree(boxes)
+    assert len(tree) == 4
+
+def test_bad_capacity():
+    with pytest.raises(ValueError):
+        PackedRTree(boxes, node_capacity=1)
+
+def test_bounding_box():
+    tree = PackedRTree(boxes)
+    assert tree.bounding_box == ( (0, 0), (30, 30) )
+
+def test_empty():
+    tree = PackedRTree(np.zeros((0, 2, 2)))
+    assert len(tree) == 0
+    assert tree.bounding_box == null_BBox()
+    assert len(tree.query( ((0, 0), (10, 10)) )) == 0
+
+def test_query():
+    tree = PackedRTree(boxes)
+    assert list(tree.query( ((8, 8), (12, 12)) )) == [0, 1]
+    assert list(tree.query( ((30, 30), (40, 40)) )) == [2]  # touching
+    assert list(tree.query( ((40, 40), (50, 50)) )) == []
+
+def test_query_point():
+    tree = PackedRTree(boxes)
+    assert list(tree.query_point( (10, 10) )) == [0, 1]
+    assert list(tree.query_point( (25, 21) )) == [2]
+    assert list(tree.query_point( (16, 16) )) == []
+
+def test_query_inf():
+    tree = PackedRTree(boxes)
+    assert list(tree.query( ((-np.inf, -np.inf), (np.inf, np.inf)) )) == [0, 1, 2]
+
+def test_query_nan():
+    tree = PackedRTree(boxes)
+    assert list(tree.query(null_BBox())) == []
+    assert list(tree.query( ((np.nan, 0), (30, 30)) )) == []
+    assert list(tree.query_point( (np.nan, 10) )) == []
+    offsets, indexes = tree.query_points( ((10, 10), (np.nan, np.nan), (25, 21)) )
+    assert list(offsets) == [0, 2, 2, 3]
+    assert list(indexes) == [0, 1, 2]
+
+def test_query_readonly():
+    tree = PackedRTree(boxes)
+    points = np.array( ((10, 10), (25, 21)), dtype=np.float64)
+    points.flags.writeable = False
+    query = np.c_[points, points]
+    query.flags.writeable = False
+    assert list(tree.query_boxes(query)[1]) == [0, 1, 2]
+
+def test_infinite_box():
+    tree = PackedRTree( ( ((0, 0), (1, 1)),
+                          ((-np.inf, -np.inf), (np.inf, np.inf)) ) )
+    assert list(tree.query_point( (100, 100) )) == [1]
+
+@pytest.mark.parametrize("node_capacity", (2, 4, 16))
+def test_query_boxes(node_capacity):
+    """
+    the tree should find the same boxes as a brute-force search
+    """
+    data = random_boxes(2000)
+    BA = BBoxArray(data)
+    tree = PackedRTree(data, node_capacity)
+
+    queries = random_boxes(100, seed=1) * [[1, 1], [1.5, 1.5]]
+    offsets, indexes = tree.query_boxes(queries)
+    assert len(offsets) == 101
+    for i, query in enumerate(queries):
+        expected = np.nonzero(BA.overlaps(query))[0]
+        assert np.array_equal(indexes[offsets[i]:offsets[i+1]], expected)
+
+def test_query_points():
+    data = random_boxes(2000)
+    BA = BBoxArray(data)
+    tree = PackedRTree(data)
+
+    points = np.random.rand(100, 3) * 100 # third coordinate ignored
+    offsets, indexes = tree.query_points(points)
+    for i, point in enumerate(points):
+        expected = np.nonzero(BA.point_inside(point))[0]
+        assert np.array_equal(indexes[offsets[i]:offsets[i+1]], expected)
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+
+"""
+Tests of PolygonSets in shared memory
+
+Designed to be run with py.test
+
+"""
+
+import os
+import pickle
+import multiprocessing
+
+import pytest
+
+import numpy as np
+
+from py_geometry.polygons import PolygonSet
+from py_geometry import shared
+from py_geometry.shared import SharedPolygonSet
+from py_geometry.locate import locate_points
+from py_geometry.simplify import simplify
+from py_geometry.clip import clip_to_bbox
+from py_geometry.hull import convex_hulls
+from py_geometry.validation import simple_rings
+
+pytestmark = pytest.mark.skipif(shared.shared_memory is None and not os.path.isdir(shared._SHM_DIR),
+                                reason="no shared memory available")
+
+p1 = np.array([[1,2],[3,4],[5,6],[7,8]], dtype=np.float64)
+p2 = p1 * 5
+
+
+def sample_set():
+    return PolygonSet.from_arrays([p1, p2, p1 + 10], metadata=["a", None, {"b": 1}])
+
+
+def test_buffer_round_trip():
+    set = sample_set()
+    buffer = bytearray(set.file_size())
+    set.write_buffer(buffer)
+    set2 = PolygonSet.from_buffer(buffer)
+    assert np.array_equal(set2._PointsArray, set._PointsArray)
+    assert np.array_equal(set2._IndexArray, set._IndexArray)
+    assert set2.GetMetaData() == set.GetMetaData()
+    assert set2.bounding_boxes[1] == ((5, 10), (35, 40))
+    # views, not copies
+    assert not set2._PointsArray.flags.writeable
+    buffer[-1:] = b" " # after the metadata is read
+    assert np.shares_memory(set2._PointsArray, np.frombuffer(buffer, dtype=np.uint8))
+
+
+def test_buffer_too_small():
+    set = sample_set()
+    with pytest.raises(ValueError):
+        set.write_buffer(bytearray(set.file_size() - 1))
+
+
+def test_buffer_empty_set():
+    set = PolygonSet()
+    buffer = bytearray(set.file_size())
+    set.write_buffer(buffer)
+    assert len(PolygonSet.from_buffer(buffer)) == 0
+
+
+def test_not_a_buffer():
+    with pytest.raises(ValueError):
+        PolygonSet.from_buffer(bytearray(200))
+
+
+def test_attach():
+    with SharedPolygonSet(sample_set()) as shared_set:
+        other = SharedPolygonSet.attach(shared_set.name)
+        set = other.polygon_set
+        assert np.array_equal(set[1], p2)
+        assert set.GetMetaData() == ["a", None, {"b": 1}]
+        del set
+        other.close()
+
+
+def test_kernels_on_attached():
+    # the attached arrays are read-only -- the compiled code has to take them
+    square = np.array( ((0, 0), (1, 0), (2, 0), (2, 2), (0, 2), (0, 0)), dtype=np.float64)
+    set = PolygonSet.from_arrays([square, square + 5, square * 3 + 10])
+    with SharedPolygonSet(set) as shared_set:
+        other = SharedPolygonSet.attach(shared_set.name)
+        attached = other.polygon_set
+        assert not attached._PointsArray.flags.writeable
+        points = ((1, 1), (6, 6), (15, 15), (30, 30))
+        assert np.array_equal(locate_points(attached, points), locate_points(set, points))
+        assert np.array_equal(simplify(attached, 0.1, preserve_topology=True)._PointsArray,
+                              simplify(set, 0.1, preserve_topology=True)._PointsArray)
+        box = ((1, 1), (12, 12))
+        assert np.array_equal(clip_to_bbox(attached, box)._PointsArray,
+                              clip_to_bbox(set, box)._PointsArray)
+        assert np.array_equal(convex_hulls(attached)._PointsArray,
+                              convex_hulls(set)._PointsArray)
+        assert simple_rings(attached).all()
+        del attached
+        other.close()
+
+
+def test_pickle():
+    with SharedPolygonSet(sample_set()) as shared_set:
+        other = pickle.loads(pickle.dumps(shared_set))
+        assert other.name == shared_set.name
+        assert not other.owner
+        assert np.array_equal(other.polygon_set[2], p1 + 10)
+        other.close()
+
+
+def test_unlink():
+    shared_set = SharedPolygonSet(sample_set())
+    name = shared_set.name
+    shared_set.close()
+    shared_set.unlink()
+    with pytest.raises(OSError):
+        SharedPolygonSet.attach(name)
+
+
+def worker_area(args):
+    shared_set, index = args
+    return shared_set.polygon_set.areas()[index]
+
+
+def test_pool():
+    set = PolygonSet.from_arrays([p1 * i + ((0, 0), (1, 0), (1, 1), (0, 1)) for i in range(8)])
+    with SharedPolygonSet(set) as shared_set:
+        pool = multiprocessing.Pool(2)
+        try:
+            areas = pool.map(worker_area, [(shared_set, i) for i in range(len(set))])
+        finally:
+            pool.close()
+            pool.join()
+    assert np.allclose(areas, set.areas())
@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+
+"""
+Tests of the polygon simplification
+
+Designed to be run with py.test
+
+"""
+
+import pytest
+
+import numpy as np
+
+from py_geometry.polygons import PolygonSet
+from py_geometry.line_crossings import segment_cross
+from py_geometry.simplify import simplify, simplify_points
+
+METHODS = ["douglas-peucker", "visvalingam"]
+
+# a square with extra points along the sides
+square = np.array( ((0, 0), (1, 0), (2, 0), (2, 1), (2, 2),
+                    (1, 2), (0, 2), (0, 1), (0, 0)), dtype=np.float64)
+corners = square[[0, 2, 4, 6, 8]]
+
+
+def noisy_rings(num, seed=0):
+    np.random.seed(seed)
+    rings = []
+    for i in range(num):
+        n = np.random.randint(10, 60)
+        theta = np.sort(np.random.uniform(0, 2 * np.pi, n))
+        r = np.random.uniform(0.3, 1.0, n)
+        rings.append(np.c_[r * np.cos(theta), r * np.sin(theta)] + i)
+    return rings
+
+
+def crosses_itself(ring):
+    # brute force, with the closing segment -- a repeated first point
+    # at the end is dropped, so it isn't a zero-length segment
+    if len(ring) > 1 and np.array_equal(ring[0], ring[-1]):
+        ring = ring[:-1]
+    segments = list(zip(ring, np.roll(ring, -1, axis=0)))
+    n = len(segments)
+    for i in range(n):
+        for j in range(i + 2, n):
+            if i == 0 and j == n - 1:
+                continue
+            if segment_cross(segments[i], segments[j]):
+                return True
+    return False
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_square(method):
+    result = simplify_points(square, 0.1, method)
+    assert np.array_equal(result, corners)
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_zero_tolerance(method):
+    ring = noisy_rings(1)[0]
+    assert np.array_equal(simplify_points(ring, 0.0, method), ring)
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_keeps_three_points(method):
+    ring = np.array( ((0, 0), (1, 0), (1, 0.01), (0.5, 0.02), (0, 0.01)) )
+    result = simplify_points(ring, 10.0, method)
+    assert len(result) == 3
+    closed = np.r_[ring, ring[:1]]
+    assert len(simplify_points(closed, 10.0, method)) == 4
+
+
+def test_douglas_peucker_tolerance():
+    # a point 0.5 off the line is kept for a smaller tolerance only
+    line = np.array( ((0, 0), (5, 0.5), (10, 0), (10, 10), (0, 10)) )
+    assert len(simplify_points(line, 0.4)) == 5
+    assert len(simplify_points(line, 0.6)) == 4
+
+
+def test_visvalingam_tolerance():
+    # the triangle at (5, 0.5) has an area of 2.5
+    line = np.array( ((0, 0), (5, 0.5), (10, 0), (10, 10), (0, 10)) )
+    assert len(simplify_points(line, 1.5, "visvalingam")) == 5
+    assert len(simplify_points(line, 1.6, "visvalingam")) == 4
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_set(method):
+    set = PolygonSet.from_arrays([square, np.zeros((0, 2)), square[:3] * 2] + noisy_rings(20),
+                                 metadata=list(range(23)))
+    result = simplify(set, 0.1, method)
+    assert len(result) == 23
+    assert result.GetMetaData() == list(range(23))
+    assert np.array_equal(result[0], corners)
+    assert len(result[1]) == 0
+    assert np.array_equal(result[2], square[:3] * 2)
+    assert result.total_num_points < set.total_num_points
+    for i in range(3, 23):
+        assert np.array_equal(result[i], simplify_points(set[i], 0.1, method))
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_threads(method):
+    set = PolygonSet.from_arrays(noisy_rings(200))
+    result = simplify(set, 0.2, method)
+    threaded = simplify(set, 0.2, method, threads=4)
+    assert np.array_equal(threaded._IndexArray, result._IndexArray)
+    assert np.array_equal(threaded._PointsArray, result._PointsArray)
+
+
+def test_float32():
+    set = PolygonSet.from_arrays([square], dtype=np.float32)
+    result = simplify(set, 0.1)
+    assert result.dtype == np.float32
+    assert np.array_equal(result[0], corners)
+
+
+# a box with a notch that reaches down past the straight line along the
+# bottom -- but not past the points along the bottom
+notched = np.array( ((0, 0), (2, -0.4), (5, -0.5), (8, -0.4), (10, 0),
+                     (10, 10), (6, 10), (5, -0.2), (4, 9), (0, 9)) )
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_preserve_topology(method):
+    assert not crosses_itself(notched)
+    plain = simplify_points(notched, 2.0, method)
+    assert crosses_itself(plain)
+    preserved = simplify_points(notched, 2.0, method, preserve_topology=True)
+    assert not crosses_itself(preserved)
+    assert len(preserved) < len(notched)
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_preserve_topology_closed(method):
+    # the same ring, with the first point repeated at the end
+    closed = np.r_[notched, notched[:1]]
+    assert crosses_itself(simplify_points(closed, 2.0, method))
+    preserved = simplify_points(closed, 2.0, method, preserve_topology=True)
+    assert not crosses_itself(preserved)
+    assert len(preserved) < len(closed)
+
+
+def test_preserve_topology_readonly():
+    points = notched.copy()
+    points.flags.writeable = False
+    assert np.array_equal(simplify_points(points, 2.0, preserve_topology=True),
+                          simplify_points(notched, 2.0, preserve_topology=True))
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_preserve_topology_set(method):
+    rings = noisy_rings(50, seed=1) + [notched]
+    set = PolygonSet.from_arrays(rings)
+    preserved = simplify(set, 2.0, method, preserve_topology=True, threads=2)
+    for i in range(len(set)):
+        if not crosses_itself(rings[i]):
+            assert not crosses_itself(preserved[i])
+    assert preserved.total_num_points < set.total_num_points
+
+
+def test_preserve_topology_crossed():
+    # a figure 8 crosses itself to start with, so it is simplified as usual
+    ring = np.array( ((0, 0), (1, 0.01), (2, 0), (2, 1), (0, -1), (-0.01, -0.5)) )
+    assert crosses_itself(ring)
+    assert np.array_equal(simplify_points(ring, 0.1, preserve_topology=True),
+                          simplify_points(ring, 0.1))
+
+
+def test_bad_method():
+    with pytest.raises(ValueError):
+        simplify_points(square, 0.1, "not-a-method")
+    with pytest.raises(ValueError):
+        simplify_points(square, -1.0)
+
+
+def test_columns():
+    set = PolygonSet.from_arrays([square, square * 2], columns={'type': [1, 2]})
+    result = simplify(set, 0.1)
+    assert np.array_equal(result.meta['type'], (1, 2))
+    result.meta['type'][0] = 5
+    assert set.meta['type'][0] == 1
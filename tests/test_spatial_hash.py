@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+
+"""
+Tests of the uniform grid spatial hash
+
+Designed to be run with py.test
+
+"""
+
+import pytest
+
+import numpy as np
+
+from py_geometry.spatial_hash import SpatialHash
+from py_geometry.bbox import BBox, BBoxArray
+from py_geometry.cy_bbox import overlapping_pairs
+
+
+def random_boxes(n, seed=0):
+    np.random.seed(seed)
+    lower = np.random.rand(n, 2) * 100
+    return np.stack( (lower, lower + np.random.rand(n, 2) * 4), 1 )
+
+boxes = np.array( ( ((0, 0), (10, 10)),
+                    ((5, 5), (15, 15)),
+                    ((20, 20), (30, 30)),
+                    ((np.nan, np.nan), (np.nan, np.nan)),
+                    ), dtype=np.float64)
+
+
+def test_create():
+    grid = SpatialHash(boxes, cell_size=5)
+    assert len(grid) == 4
+    assert grid.extent == BBox( ((0, 0), (30, 30)) )
+    assert grid.shape == (6, 6)
+    assert len(grid.cell_offsets) == 37
+
+def test_cell_size_pair():
+    grid = SpatialHash(boxes, cell_size=(10, 3))
+    assert grid.shape == (3, 10)
+
+def test_bad_cell_size():
+    with pytest.raises(ValueError):
+        SpatialHash(boxes, cell_size=0)
+
+def test_auto_cell_size():
+    grid = SpatialHash(random_boxes(1000))
+    assert 10 < grid.shape[0] < 100
+    # a plain array, not a BBox
+    assert type(grid.cell_size) is np.ndarray
+    assert grid.cell_size.shape == (2,)
+
+def test_empty():
+    grid = SpatialHash(np.zeros((0, 2, 2)))
+    assert len(grid.query_point( (0, 0) )) == 0
+
+def test_all_same_point():
+    grid = SpatialHash.from_points( [(1, 1), (1, 1), (1, 1)] )
+    assert list(grid.query_point( (1, 1) )) == [0, 1, 2]
+
+def test_query():
+    grid = SpatialHash(boxes, cell_size=4)
+    assert list(grid.query( ((8, 8), (12, 12)) )) == [0, 1]
+    assert list(grid.query( ((30, 30), (40, 40)) )) == [2]
+    assert list(grid.query( ((16, 16), (18, 18)) )) == []
+
+def test_query_point():
+    grid = SpatialHash(boxes, cell_size=4)
+    assert list(grid.query_point( (10, 10) )) == [0, 1]
+
+def test_query_nan():
+    grid = SpatialHash(boxes, cell_size=4)
+    assert list(grid.query( ((np.nan, np.nan), (np.nan, np.nan)) )) == []
+    assert list(grid.query( ((8, np.nan), (12, 12)) )) == []
+    assert list(grid.query_point( (np.nan, 10) )) == []
+    offsets, indexes = grid.query_points( ((10, 10), (np.nan, np.nan), (25, 25)) )
+    assert list(offsets) == [0, 2, 2, 3]
+    assert list(indexes) == [0, 1, 2]
+
+def test_query_inf():
+    grid = SpatialHash(boxes, cell_size=4)
+    assert list(grid.query( ((-np.inf, -np.inf), (np.inf, np.inf)) )) == [0, 1, 2]
+    assert list(grid.query_point( (np.inf, 10) )) == []
+
+def test_outside_extent():
+    grid = SpatialHash(boxes, extent=( (0, 0), (12, 12) ), cell_size=4)
+    assert list(grid.query_point( (25, 25) )) == [2]
+
+def test_query_radius():
+    grid = SpatialHash.from_points( [(0, 0), (1, 1), (5, 5)], cell_size=1 )
+    offsets, indexes = grid.query_radius( [(0.5, 0.5), (4, 4)], 1.0)
+    assert list(offsets) == [0, 2, 3]
+    assert list(indexes) == [0, 1, 2]
+
+@pytest.mark.parametrize("cell_size", (None, 0.5, 20))
+def test_query_boxes(cell_size):
+    data = random_boxes(1000)
+    BA = BBoxArray(data)
+    grid = SpatialHash(data, cell_size=cell_size)
+
+    queries = random_boxes(50, seed=1) * [[1, 1], [2, 2]]
+    offsets, indexes = grid.query_boxes(queries)
+    for i, query in enumerate(queries):
+        expected = np.nonzero(BA.overlaps(query))[0]
+        assert np.array_equal(indexes[offsets[i]:offsets[i+1]], expected)
+
+def test_query_points():
+    data = random_boxes(1000)
+    BA = BBoxArray(data)
+    grid = SpatialHash(data)
+
+    points = np.random.rand(100, 3) * 100
+    offsets, indexes = grid.query_points(points)
+    for i, point in enumerate(points):
+        expected = np.nonzero(BA.point_inside(point))[0]
+        assert np.array_equal(indexes[offsets[i]:offsets[i+1]], expected)
+
+def test_candidate_pairs():
+    data = random_boxes(1000)
+    index1, index2 = SpatialHash(data).candidate_pairs()
+    expected1, expected2 = overlapping_pairs(data)
+    assert np.array_equal(index1, expected1)
+    assert np.array_equal(index2, expected2)
+
+def test_from_segments():
+    points = np.array( ( (0, 0), (10, 10), (10, 0), (0, 10), (20, 20), (30, 20) ),
+                       dtype=np.float64)
+    segments = np.array( ( (0, 1), (2, 3), (4, 5) ), dtype=np.int32)
+    grid = SpatialHash.from_segments(points, segments, cell_size=5)
+    index1, index2 = grid.candidate_pairs()
+    assert list(zip(index1, index2)) == [(0, 1)]
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+
+"""
+Tests of the self-intersection checks of the rings in a PolygonSet
+
+Designed to be run with py.test
+
+"""
+
+import numpy as np
+
+from py_geometry.polygons import PolygonSet
+from py_geometry.validation import self_intersections, simple_rings
+
+square = np.array(((0, 0), (10, 0), (10, 10), (0, 10)), dtype=np.float64)
+bowtie = np.array(((0, 0), (10, 10), (10, 0), (0, 10)), dtype=np.float64)
+
+
+def test_simple():
+    set = PolygonSet.from_arrays([square, square[::-1] + 20])
+    ids, edges1, edges2 = self_intersections(set)
+    assert len(ids) == 0
+    assert simple_rings(set).all()
+
+
+def test_bowtie():
+    set = PolygonSet.from_arrays([square, bowtie])
+    ids, edges1, edges2 = self_intersections(set)
+    assert np.array_equal(ids, (1,))
+    assert np.array_equal(edges1, (0,))
+    assert np.array_equal(edges2, (2,))
+    assert np.array_equal(simple_rings(set), (True, False))
+
+
+def test_repeated_points():
+    # a closed ring, and a repeated point, are fine
+    ring = np.array(((0, 0), (10, 0), (10, 0), (10, 10), (0, 10), (0, 0)), dtype=np.float64)
+    assert simple_rings(PolygonSet.from_arrays([ring])).all()
+
+
+def test_collinear_edges():
+    # the first and third edges are on the same line, but don't meet
+    ring = np.array(((0, 0), (4, 0), (4, 2), (6, 2), (6, 0), (10, 0), (10, 10), (0, 10)),
+                    dtype=np.float64)
+    assert simple_rings(PolygonSet.from_arrays([ring])).all()
+
+
+def test_spike():
+    # goes out, and right back along the same line
+    ring = np.array(((0, 0), (10, 0), (10, 15), (10, 12), (0, 10)), dtype=np.float64)
+    ids, edges1, edges2 = self_intersections(PolygonSet.from_arrays([ring]))
+    # the overlapping neighbors, and the edge that starts on edge 1
+    assert np.array_equal(ids, (0, 0))
+    assert np.array_equal(edges1, (1, 1))
+    assert np.array_equal(edges2, (2, 3))
+
+
+def test_touching():
+    # a figure eight, touching at a vertex
+    ring = np.array(((0, 0), (5, 5), (10, 0), (10, 10), (5, 5), (0, 10)), dtype=np.float64)
+    assert not simple_rings(PolygonSet.from_arrays([ring]))[0]
+
+
+def test_other_rings_ignored():
+    # the rings cross each other, but not themselves
+    set = PolygonSet.from_arrays([square, square + 5])
+    assert simple_rings(set).all()
+
+
+def test_empty():
+    assert len(simple_rings(PolygonSet())) == 0
+    set = PolygonSet.from_arrays([np.zeros((0, 2)), square[:1], square])
+    assert simple_rings(set).all()
+
+
+def test_big_ring():
+    # a star with lots of points, with one edge moved to cross its neighbors
+    n = 20000
+    theta = np.linspace(0, 2 * np.pi, n, endpoint=False)
+    r = np.where(np.arange(n) % 2, 1.0, 1.1)
+    ring = np.c_[r * np.cos(theta), r * np.sin(theta)]
+    set = PolygonSet.from_arrays([ring])
+    assert simple_rings(set).all()
+    ring[100] = ring[105]
+    ids, edges1, edges2 = self_intersections(PolygonSet.from_arrays([ring]))
+    assert len(ids) > 0
+    assert ((edges1 >= 99) & (edges1 <= 106)).all()
+
+
+def tall_strip(n):
+    # a long, thin north-south strip -- all the edges overlap in x
+    np.random.seed(4)
+    y = np.linspace(0, 1000, n // 2)
+    x = np.random.uniform(0, 0.4, n // 2)
+    return np.r_[np.c_[x, y], np.c_[x[::-1] + 1, y[::-1]]]
+
+
+def test_tall_thin_ring():
+    ring = tall_strip(100000)
+    assert simple_rings(PolygonSet.from_arrays([ring])).all()
+    # a pinch in the middle
+    ring[25000, 0] = 2.0
+    ids, edges1, edges2 = self_intersections(PolygonSet.from_arrays([ring]))
+    assert len(ids) > 0
+    assert ((edges1 == 24999) | (edges1 == 25000)).all()
+
+
+def test_readonly():
+    set = PolygonSet.from_arrays([square, bowtie])
+    set._PointsArray.flags.writeable = False
+    set._IndexArray.flags.writeable = False
+    assert np.array_equal(simple_rings(set), (True, False))